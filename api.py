@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import progress
+import storage
+import store
+from cli import CliError, connect
+from models import migrate_projects
+
+# --- 읽기 전용 JSON API (다른 부서 도구용) ---
+# 앱 옆에서 따로 띄우는 가벼운 HTTP 서버. 앱과 같은 공유 저장소(store.SharedStore)로 DB 한 벌을 들고
+# POLL_SECONDS마다 시트 리비전을 확인해 바뀐 교재만 갱신한다.
+#   GET /api/health                          리비전, 교재 수
+#   GET /api/projects[?year=&series=]        교재 목록 (기본 정보 + 진행률)
+#   GET /api/projects/<id>                   교재 기본 정보 + 진행률
+#   GET /api/projects/<id>/schedule          일정 전체
+#   GET /api/projects/<id>/milestones        주요(🔴) 일정
+#   GET /api/projects/<id>/participants      집필자/검토자 (이름/소속/역할만 - 연락처/계좌 등 제외)
+# [ETag] 응답마다 그 응답이 쓰는 필드의 digest로 ETag를 만든다 (예: 일정 응답은 schedule_data digest만).
+# If-None-Match가 같으면 본문 없이 304 -> 바뀐 게 없으면 폴링 비용이 거의 없음.
+# 같은 ETag의 본문은 LRU 캐시에 보관해 다시 직렬화하지 않는다.
+# 실행: python -m api --port 8600            (구글 시트, EBS_SHEETS_BACKEND=fake 이면 가짜 시트)
+#       python -m api --db book_project_data.pkl
+POLL_SECONDS = float(os.environ.get("EBS_POLL_SECONDS", 30))
+CACHE_SIZE = 512
+CRITICAL = "🔴"
+HEADER_FIELDS = ("id", "year", "level", "subject", "series", "title")
+PERSON_FIELDS = {"name": "이름", "school": "학교급", "affiliation": "소속", "subject": "과목", "role": "역할", "review_role": "검토차수"}
+# 응답 종류 -> 쓰는 필드 (ETag 계산 범위)
+VIEW_FIELDS = {
+    "project": HEADER_FIELDS + ("target_date_val", "created_at", "schedule_data", "dev_data"),
+    "schedule": ("schedule_data",),
+    "milestones": ("schedule_data",),
+    "participants": ("author_list", "reviewer_list"),
+}
+
+
+# --- JSON 변환 ---
+def _default(o):
+    if isinstance(o, (datetime, pd.Timestamp)): return o.isoformat()
+    if isinstance(o, date): return o.isoformat()
+    if hasattr(o, "item"): return o.item()  # numpy 스칼라
+    return str(o)
+
+def _rows(df):
+    if df is None or df.empty: return []
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+def _day(value):
+    if value is None or pd.isna(value): return None
+    return pd.Timestamp(value).date().isoformat()
+
+def header(p, today=None, digests=None):
+    m = progress.metrics(p, today, digests)
+    out = {k: p[k] for k in HEADER_FIELDS}
+    out.update({
+        "target_date": _day(p.get('target_date_val')), "created_at": _day(p.get('created_at')),
+        "progress": {"percent": m["percent"], "completed": m["completed"], "total": m["total"], "stage": m["stage"],
+                     "overdue": len(m["overdue"]), "impending": m["impending"]},
+    })
+    return out
+
+def schedule(p):
+    return {"id": p['id'], "schedule": _rows(p.get('schedule_data'))}
+
+def milestones(p):
+    sch = p.get('schedule_data')
+    rows = [] if sch is None or sch.empty else _rows(sch[sch['구분'].astype(str).str.startswith(CRITICAL)])
+    return {"id": p['id'], "milestones": [
+        {"name": str(r['구분']).replace(f"{CRITICAL} ", ""), "start": _day(r.get('시작일')), "end": _day(r.get('종료일'))} for r in rows
+    ]}
+
+def participants(p):
+    def people(lst): return [{k: (x.get(ko) or "") for k, ko in PERSON_FIELDS.items()} for x in lst or []]
+    return {"id": p['id'], "authors": people(p.get('author_list')), "reviewers": people(p.get('reviewer_list'))}
+
+
+# --- ETag ---
+def _tag(*parts):
+    return '"' + hashlib.sha1("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()[:20] + '"'
+
+def project_etag(kind, pid, digests, today=None):
+    # 진행률은 날짜에 따라 바뀌므로 project 응답은 날짜도 포함
+    return _tag(kind, pid, *(digests.get(f) for f in VIEW_FIELDS[kind]), today if kind == "project" else "")
+
+def matches(if_none_match, etag):
+    # If-None-Match: "a", W/"b" 또는 * (약한 비교)
+    if not if_none_match: return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+# --- 서버 상태 ---
+class Api:
+    def __init__(self, loader, connect=None, poll_seconds=POLL_SECONDS, verbose=False):
+        self.store = store.SharedStore(loader)
+        self.lease = self.store.acquire()  # 서버가 떠 있는 동안 스냅샷 유지
+        self.connect = connect
+        self.poll_seconds = poll_seconds
+        self.verbose = verbose
+        self._cache = OrderedDict()  # (경로, ETag) -> 본문 바이트
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "cache_hits": 0, "rendered": 0}
+
+    def snapshot(self):
+        if self.connect is not None: self.store.poll_remote(self.connect, self.poll_seconds)
+        return self.store.snapshot()
+
+    def _count(self, key):
+        with self._lock: self.stats[key] += 1
+
+    def _body(self, key, build):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return hit
+        body = json.dumps(build(), ensure_ascii=False, default=_default).encode("utf-8")
+        with self._lock:
+            self.stats["rendered"] += 1
+            self._cache[key] = body
+            while len(self._cache) > CACHE_SIZE: self._cache.popitem(last=False)
+        return body
+
+    def resolve(self, path, query):
+        # 반환: (상태 코드, ETag, 본문을 만드는 함수) - ETag는 본문을 만들기 전에 digest만으로 계산
+        snap = self.snapshot()
+        today = datetime.now().date()
+        parts = [x for x in path.split("/") if x]
+        if parts[:1] != ["api"]: return 404, None, lambda: {"error": "not found"}
+        parts = parts[1:]
+        if parts == ["health"]:
+            return 200, None, lambda: {"rev": snap.rev, "stamp": snap.stamp, "source": snap.source, "projects": len(snap.projects),
+                                       "stats": dict(self.stats)}
+        if parts == ["projects"]:
+            year, series = query.get("year", [None])[0], query.get("series", [None])[0]
+            books = [p for p in snap.projects
+                     if (not year or str(p['year']) == year) and (not series or series in str(p['series']))]
+            etag = _tag("projects", year, series, *(project_etag("project", p['id'], snap.digests[p['id']], today) for p in books))
+            return 200, etag, lambda: {"rev": snap.rev, "projects": [header(p, today, snap.digests[p['id']]) for p in books]}
+        if parts[:1] == ["projects"] and len(parts) in (2, 3):
+            p = snap.index.get(parts[1])
+            if p is None: return 404, None, lambda: {"error": f"교재 없음: {parts[1]}"}
+            kind = parts[2] if len(parts) == 3 else "project"
+            views = {"project": lambda: header(p, today, snap.digests[p['id']]), "schedule": lambda: schedule(p),
+                     "milestones": lambda: milestones(p), "participants": lambda: participants(p)}
+            if kind not in views: return 404, None, lambda: {"error": "not found"}
+            return 200, project_etag(kind, p['id'], snap.digests[p['id']], today), views[kind]
+        return 404, None, lambda: {"error": "not found"}
+
+    def handle(self, path, query, if_none_match=None):
+        # 반환: (상태 코드, 헤더, 본문 바이트)
+        self._count("requests")
+        status, etag, build = self.resolve(path, query)
+        headers = {"Cache-Control": "no-cache"}
+        if etag:
+            headers["ETag"] = etag
+            if matches(if_none_match, etag):
+                self._count("not_modified")
+                return 304, headers, b""
+        body = self._body((path, repr(sorted(query.items())), etag), build) if etag else \
+            json.dumps(build(), ensure_ascii=False, default=_default).encode("utf-8")
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        return status, headers, body
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: 폴링 클라이언트의 연결 재사용
+
+        def _serve(self, send_body):
+            url = urlsplit(self.path)
+            try:
+                status, headers, body = api.handle(url.path, parse_qs(url.query), self.headers.get("If-None-Match"))
+            except Exception as e:
+                status, headers, body = 500, {"Content-Type": "application/json; charset=utf-8"}, \
+                    json.dumps({"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            for k, v in headers.items(): self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body and body: self.wfile.write(body)
+
+        def do_GET(self):
+            self._serve(True)
+
+        def do_HEAD(self):
+            self._serve(False)
+
+        def log_message(self, fmt, *args):
+            if api.verbose: super().log_message(fmt, *args)
+
+    return Handler
+
+
+# --- 불러오기 ---
+def local_loader(db):
+    def load():
+        with open(db, "rb") as f: return migrate_projects(pickle.load(f)), {}, "local"
+    return load
+
+def sheet_loader():
+    def load():
+        sheet = connect()
+        meta = storage.read_meta(sheet)
+        return migrate_projects(storage.read_projects(sheet, meta)), meta, "sheet"
+    return load
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api", description="EBS 교재 읽기 전용 JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--db", help="구글 시트 대신 로컬 DB(pickle) 파일")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="시트 리비전 확인 주기(초)")
+    parser.add_argument("--verbose", action="store_true", help="요청 로그 출력")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.db:
+            api = Api(local_loader(args.db), verbose=args.verbose)
+        else:
+            connect()  # 인증 파일 확인
+            api = Api(sheet_loader(), connect, args.poll, args.verbose)
+        snap = api.store.snapshot()
+    except (CliError, OSError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 1
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    print(f"교재 {len(snap.projects)}권 (rev {snap.rev}) - http://{args.host}:{server.server_port}/api/projects")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
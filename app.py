@@ -1,15 +1,35 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
 from datetime import datetime, timedelta
-import re 
 import uuid 
 import io 
 import os
 import pickle
-import base64
-import hashlib
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import zipfile
+
+from core import (
+    normalize_string, clean_korean_date,
+    get_schedule_date, get_notifications, create_ics_file, ensure_data_types,
+    recalculate_dates, create_initial_schedule,
+    auto_assign_reviewers,
+)
+from models import Person, ContractStatus, migrate_projects, new_project
+import profiling
+import storage
+import concurrency
+import fake_sheets
+import quota
+import store
+import history
+import export
+import contracts
+import ledger
+import settlement
+import edits
+import progress
+import timeline
+import archive
 
 # --- 1. 페이지 기본 설정 ---
 st.set_page_config(
@@ -18,85 +38,93 @@ st.set_page_config(
     layout="wide"
 )
 
+# [Profiling] opt-in 계측: EBS_PROFILE=1 또는 ?profile=1
+profiler = profiling.begin(profiling.env_enabled() or st.query_params.get("profile") == "1", label="rerun")
+
 # --- 2. 구글 시트 연동 설정 ---
 SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-SHEET_NAME = "EBS_Book_DB" 
+SHEET_NAME = "EBS_Book_DB"
+REMOTE_POLL_SECONDS = float(os.environ.get("EBS_POLL_SECONDS", 30))  # 다른 서버의 저장 확인 주기
 
 def get_db_connection():
+    # [Quota] 모든 시트 요청은 프로세스 공용 스케줄러(속도 제한/재시도/읽기 합치기)를 거침 (quota.py)
+    # [Offline] EBS_SHEETS_BACKEND=fake 이면 프로세스 내 가짜 시트 사용 (부하 테스트/벤치마크)
+    if os.environ.get("EBS_SHEETS_BACKEND") == "fake":
+        return quota.wrap(fake_sheets.get_worksheet(SHEET_NAME))
     try:
-        if os.path.exists("service_account.json"):
+        has_file = os.path.exists("service_account.json")
+        if not has_file and "gcp_service_account" not in st.secrets: return None
+        # [Startup] 구글 시트 라이브러리는 실제로 연결할 때만 로드 (첫 화면 import 비용 절감)
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        if has_file:
             creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", SCOPE)
-        elif "gcp_service_account" in st.secrets:
+        else:
             creds_dict = dict(st.secrets["gcp_service_account"])
             creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
-        else:
-            return None
         
         client = gspread.authorize(creds)
         sheet = client.open(SHEET_NAME).sheet1
-        return sheet
+        return quota.wrap(sheet)
     except Exception as e:
         return None
 
-def load_data_from_sheet():
+def load_projects():
+    # 공유 저장소 loader: 구글 시트 -> 로컬 백업 파일 순, 구버전 데이터는 여기서 한 번만 마이그레이션
+    meta = {}
     sheet = get_db_connection()
     if sheet:
         try:
-            col_values = sheet.col_values(1)
-            if col_values:
-                full_b64_str = "".join(col_values)
-                binary_data = base64.b64decode(full_b64_str)
-                return pickle.loads(binary_data)
+            meta = storage.read_meta(sheet)
+            data = storage.read_projects(sheet, meta)
+            if data: return migrate_projects(data), meta, "sheet"
         except Exception as e:
             pass
-    return []
-
-def save_data_to_sheet(data):
+    if os.path.exists("book_project_data.pkl"):
+        try:
+            # 로컬 백업은 시트 리비전과 무관 -> 시트 메타를 쓰지 않음 (저장 시 시트 내용과 병합)
+            with open("book_project_data.pkl", 'rb') as f:
+                return migrate_projects(pickle.load(f)), {}, "local"
+        except: pass
+    return [], meta, None
+
+# [Shared Store] 프로세스 전체에서 DB 한 벌만 메모리에 유지, 세션은 수정한 교재만 복사 (store.py)
+@st.cache_resource
+def get_shared_store():
+    return store.SharedStore(load_projects)
+
+@st.cache_resource
+def get_history():
+    return history.HistoryStore()
+
+# [Concurrency] 리비전 비교 후 저장, 원격 변경이 있으면 교재별 3-way 병합 (concurrency.save_projects)
+def save_data_to_sheet(view):
     sheet = get_db_connection()
     if sheet:
         try:
-            binary_data = pickle.dumps(data)
-            b64_str = base64.b64encode(binary_data).decode('utf-8')
-            chunk_size = 45000
-            chunks = [b64_str[i:i+chunk_size] for i in range(0, len(b64_str), chunk_size)]
-            sheet.clear()
-            update_values = [[chunk] for chunk in chunks]
-            sheet.update(range_name=f'A1:A{len(chunks)}', values=update_values)
-            return True
+            return concurrency.save_projects(sheet, view.to_list(), view.snapshot.stamp, view.snapshot.digests)
         except Exception as e:
             st.error(f"저장 실패: {e}")
-            return False
-    return False
+            return None
+    return None
 
 # --- 3. 데이터 초기화 ---
+shared_store = get_shared_store()
 if 'projects' not in st.session_state:
     with st.spinner("☁️ 구글 시트에서 데이터를 불러오는 중..."):
-        loaded_data = load_data_from_sheet()
-        if loaded_data:
-            st.session_state['projects'] = loaded_data
-            st.toast("☁️ 클라우드에서 데이터를 성공적으로 불러왔습니다.")
-        else:
-            st.session_state['projects'] = []
-            if os.path.exists("book_project_data.pkl"):
-                 try:
-                    with open("book_project_data.pkl", 'rb') as f:
-                        st.session_state['projects'] = pickle.load(f)
-                    st.toast("📂 로컬 백업 파일에서 데이터를 불러왔습니다.")
-                 except: pass
-
-# 데이터 정합성 검사 및 복구
-for p in st.session_state['projects']:
-    if 'created_at' not in p: p['created_at'] = datetime.now()
-    if 'settlement_overrides' not in p: p['settlement_overrides'] = {} 
-    
-    if p.get('author_list') is None: p['author_list'] = []
-    if p.get('reviewer_list') is None: p['reviewer_list'] = []
-    if p.get('partner_list') is None: p['partner_list'] = []
-    
-    if 'settlement_list' not in p or p['settlement_list'] is None:
-        p['settlement_list'] = []
-        
-    if 'contract_status' not in p: p['contract_status'] = {}
+        st.session_state['store_lease'] = shared_store.acquire()
+        snap = shared_store.snapshot()
+        st.session_state['projects'] = store.ProjectView(snap)
+        if snap.source == "sheet": st.toast("☁️ 클라우드에서 데이터를 성공적으로 불러왔습니다.")
+        elif snap.source == "local": st.toast("📂 로컬 백업 파일에서 데이터를 불러왔습니다.")
+else:
+    # [Change Feed] 다른 세션(또는 다른 서버)의 저장분 중 바뀐 교재만 골라 반영, 내 수정 사항은 유지
+    shared_store.poll_remote(get_db_connection, REMOTE_POLL_SECONDS)
+    latest, changed = shared_store.changes_since(st.session_state['projects'].snapshot)
+    if latest is not None and latest is not st.session_state['projects'].snapshot:
+        refresh_conflicts = st.session_state['projects'].refresh(latest, changed)
+        if changed: st.toast(f"🔔 다른 사용자가 저장한 교재 {len(changed)}권을 최신 내용으로 반영했습니다.")
+        if refresh_conflicts: st.session_state['save_conflicts'] = st.session_state.get('save_conflicts', []) + refresh_conflicts
 
 if 'current_project_id' not in st.session_state:
     st.session_state['current_project_id'] = None 
@@ -105,315 +133,23 @@ if 'selected_overview_id' not in st.session_state:
 if 'view_all_mode' not in st.session_state:
     st.session_state['view_all_mode'] = False
 
-def normalize_string(s):
-    return str(s).replace(" ", "").strip()
-
-def clean_korean_date(date_str):
-    if pd.isna(date_str): return None
-    s = str(date_str)
-    s = re.sub(r'\s*\(.*?\)', '', s)
-    return s.strip()
-
-# [Safe Convert Helper]
-def safe_to_numeric(series):
-    return pd.to_numeric(series.astype(str).str.replace(',', ''), errors='coerce').fillna(0)
-
-# [Helper] 정산 내역 정렬 순서 함수
-def get_sort_rank(content_str):
-    s = normalize_string(str(content_str))
-    if "1차" in s: return 1
-    if "2차" in s: return 2
-    if "3차" in s: return 3
-    if "편집" in s: return 4
-    if "감수" in s: return 5
-    return 99 
-
-DEFAULT_CHECKLIST = [
-    {"구분": "결과보고서", "내용": "결과보고서 작성", "완료": False},
-    {"구분": "결과보고서", "내용": "집필자 성과 평가 작성", "완료": False},
-    {"구분": "결과보고서", "내용": "검토자 역량 평가", "완료": False},
-    {"구분": "약정서(집필자)", "내용": "집필약정서", "완료": False},
-    {"구분": "약정서(집필자)", "내용": "보안서약서", "완료": False},
-    {"구분": "약정서(집필자)", "내용": "수의계약체결제한여부확인서", "완료": False},
-    {"구분": "약정서(집필자)", "내용": "청렴계약이행서약서", "완료": False},
-    {"구분": "약정서(검토자)", "내용": "검토약정서", "완료": False},
-    {"구분": "약정서(검토자)", "내용": "보안서약서", "완료": False},
-    {"구분": "약정서(검토자)", "내용": "수의계약체결제한여부확인서", "완료": False},
-    {"구분": "약정서(검토자)", "내용": "청렴계약이행서약서", "완료": False},
-    {"구분": "회의록", "내용": "제작관련업체 사전협의회(인쇄협의체) 회의록", "완료": False},
-    {"구분": "회의록", "내용": "편집대행서 최종 점검 체크리스트", "완료": False},
-]
-
-for p in st.session_state['projects']:
-    new_auth_std = pd.DataFrame([
-        {"구분": "쪽당", "원고료": 35000, "검토료": 14000},
-        {"구분": "문항당", "원고료": 3000, "검토료": 1500}
-    ])
-
-    keys_defaults = {
-        "author_list": [], "reviewer_list": [], "partner_list": [], "issues": [],
-        "dev_data": pd.DataFrame(columns=["단원명", "집필자", "집필완료", "검토완료", "피드백완료", "디자인완료", "비고"]),
-        "planning_data": pd.DataFrame(), "schedule_data": pd.DataFrame(),
-        "book_specs": {"format": "", "colors_main": ["1도"], "colors_sol": "1도", "is_ebook": False, "is_answer_view": False, "is_answer_pdf": False},
-        "report_checklist": pd.DataFrame(DEFAULT_CHECKLIST), 
-        "author_standards": new_auth_std, 
-        "review_standards": pd.DataFrame([
-            {"구분": "1차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "2차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "3차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "편집검토", "단가(쪽)": 6000, "단가(문항)": 500}
-        ]),
-        "penalties": {},
-        "target_date_val": datetime.today(),
-        "created_at": datetime.now(),
-        "settlement_list": [],
-        "contract_status": {}
-    }
-    
-    for key, default_val in keys_defaults.items():
-        if key not in p: 
-            p[key] = default_val
-        elif key == "author_standards":
-            current_std = p['author_standards']
-            if '원고료_단가(쪽)' in current_std.columns: 
-                old_row = current_std.iloc[0]
-                p['author_standards'] = pd.DataFrame([
-                    {"구분": "쪽당", "원고료": old_row.get('원고료_단가(쪽)', 35000), "검토료": old_row.get('검토료_단가(쪽)', 14000)},
-                    {"구분": "문항당", "원고료": old_row.get('원고료_단가(문항)', 3000), "검토료": old_row.get('검토료_단가(문항)', 1500)}
-                ])
-            elif '원고료_단가' in current_std.columns:
-                old_row = current_std.iloc[0]
-                p['author_standards'] = pd.DataFrame([
-                    {"구분": "쪽당", "원고료": old_row.get('원고료_단가', 35000), "검토료": old_row.get('검토료_단가', 14000)},
-                    {"구분": "문항당", "원고료": 3000, "검토료": 1500}
-                ])
-
-    if 'report_checklist' in p:
-        if len(p['report_checklist']) < 3:
-            p['report_checklist'] = pd.DataFrame(DEFAULT_CHECKLIST)
-            
-    rev_std = p['review_standards']
-    if '단가(문항)' not in rev_std.columns:
-        rev_std['단가(문항)'] = 1000
-        if '단가' in rev_std.columns: rev_std.rename(columns={'단가': '단가(쪽)'}, inplace=True)
-        p['review_standards'] = rev_std
-
-    if 'dev_data' in p:
-        if p['dev_data'].empty:
-             p['dev_data'] = pd.DataFrame(columns=["단원명", "집필자", "집필완료", "검토완료", "피드백완료", "디자인완료", "비고"])
-        else:
-            new_cols = {c: normalize_string(c) for c in p['dev_data'].columns}
-            p['dev_data'] = p['dev_data'].rename(columns=new_cols)
-            rename_map = {"1차검토자": "1차외부검토", "2차검토자": "2차외부검토", "3차검토자": "3차외부검토"}
-            p['dev_data'] = p['dev_data'].rename(columns=rename_map)
-            bool_cols = ["집필완료", "검토완료", "피드백완료", "디자인완료"]
-            for col in bool_cols:
-                if col not in p['dev_data'].columns: p['dev_data'][col] = False
-                else: p['dev_data'][col] = p['dev_data'][col].astype(bool)
-
-    active_roles = set(["1차외부검토", "2차외부검토", "3차외부검토", "편집검토"]) 
-    if 'reviewer_list' in p:
-        for r in p['reviewer_list']:
-            role = r.get('검토차수')
-            if role: active_roles.add(normalize_string(role))
-
-    rev_std = p['review_standards']
-    rev_std['구분_clean'] = rev_std['구분'].apply(normalize_string)
-    existing_std = set(rev_std['구분_clean'].tolist())
-    new_std_rows = []
-    for role in active_roles:
-        if role not in existing_std: new_std_rows.append({"구분": role, "단가(쪽)": 0, "단가(문항)": 0})
-    if new_std_rows:
-        p['review_standards'] = pd.concat([rev_std.drop(columns=['구분_clean']), pd.DataFrame(new_std_rows)], ignore_index=True)
-    elif '구분_clean' in rev_std.columns:
-        p['review_standards'] = rev_std.drop(columns=['구분_clean'])
-
-    if 'dev_data' in p:
-        current_cols = p['dev_data'].columns
-        for role in active_roles:
-            if role not in current_cols: p['dev_data'][role] = "-"
-
-# --- 4. 유틸리티 함수 ---
-def get_day_name(date_obj):
-    if pd.isnull(date_obj): return ""
-    try: return ["(월)", "(화)", "(수)", "(목)", "(금)", "(토)", "(일)"][date_obj.weekday()]
-    except: return ""
-
-def validate_email(email): return "@" in str(email)
-
-# [Fixed] NaT handling
-def get_schedule_date(project, keyword="플루토"):
-    df = project.get('schedule_data', pd.DataFrame())
-    if df.empty: return None
-    mask = df['구분'].astype(str).str.contains(keyword, na=False)
-    if mask.any():
-        try:
-            date_val = df.loc[mask, '종료일'].values[-1]
-            dt = pd.to_datetime(date_val, errors='coerce')
-            if pd.isna(dt): return None
-            return dt
-        except: return None
-    return None
-
-def get_notifications():
-    notifications = []
-    today = datetime.now().date()
-    alert_window = 3 
-    for p in st.session_state['projects']:
-        sch = p.get('schedule_data')
-        if sch is not None and not sch.empty:
-            for _, row in sch.iterrows():
-                try:
-                    end_date = pd.to_datetime(row['종료일']).date()
-                    if pd.notnull(end_date):
-                        days_left = (end_date - today).days
-                        if 0 <= days_left <= alert_window:
-                            notifications.append({
-                                "project": f"[{p['series']}] {p['title']}",
-                                "task": row['구분'],
-                                "date": end_date,
-                                "d_day": days_left
-                            })
-                except: continue
-    return notifications
-
-def create_ics_file(df, project_title):
-    ics_content = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//EBS 교재개발 관리 프로그램//Streamlit App//KO",
-        "X-WR-CALNAME:EBS " + project_title + " 개발 일정"
-    ]
-    for _, row in df.iterrows():
-        if pd.isnull(row['시작일']) or pd.isnull(row['종료일']): continue
-        try:
-            start_date = row['시작일'].strftime('%Y%m%d')
-            end_date = (pd.to_datetime(row['종료일']).date() + timedelta(days=1)).strftime('%Y%m%d')
-            ics_content.extend([
-                "BEGIN:VEVENT",
-                f"UID:{uuid.uuid4()}@ebs.co.kr",
-                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}",
-                f"DTSTART;VALUE=DATE:{start_date}",
-                f"DTEND;VALUE=DATE:{end_date}",
-                f"SUMMARY:{row['구분']}",
-                f"DESCRIPTION:{row['비고']}",
-                "END:VEVENT"
-            ])
-        except: continue
-    ics_content.append("END:VCALENDAR")
-    return "\n".join(ics_content).encode('utf-8')
-
-# --- 5. 데이터 안전장치 함수 ---
-def ensure_data_types(df):
-    df = df.copy()
-    df = df.reset_index(drop=True)
-    df["시작일"] = pd.to_datetime(df["시작일"], errors='coerce').dt.date
-    df["종료일"] = pd.to_datetime(df["종료일"], errors='coerce').dt.date
-    df["소요 일수"] = pd.to_numeric(df["소요 일수"], errors='coerce').fillna(0).astype(int)
-    df["선택"] = df["선택"].astype(bool)
-    df["독립 일정"] = df["독립 일정"].astype(bool)
-    return df
-
-# --- 6. 핵심 로직 (일정) ---
-def recalculate_dates(df, target_date_obj):
-    df["시작일"] = pd.to_datetime(df["시작일"])
-    df["종료일"] = pd.to_datetime(df["종료일"])
-    
-    anchor_mask = df["구분"].str.contains("최종 플루토 OK", na=False)
-    if not anchor_mask.any():
-        if len(df) > 0: anchor_idx = df.index[-1]
-        else: return ensure_data_types(df)
-    else: anchor_idx = df[anchor_mask].index[0]
-
-    current_end = pd.to_datetime(target_date_obj)
-    df.at[anchor_idx, "종료일"] = current_end
-    duration = int(df.at[anchor_idx, "소요 일수"]) 
-    df.at[anchor_idx, "시작일"] = current_end - timedelta(days=max(0, duration - 1))
-
-    # Backward
-    chain_link_date = df.at[anchor_idx, "시작일"]
-    for i in range(anchor_idx - 1, -1, -1):
-        if df.at[i, "독립 일정"]: continue 
-        current_end = chain_link_date - timedelta(days=1)
-        df.at[i, "종료일"] = current_end
-        duration = int(df.at[i, "소요 일수"])
-        current_start = current_end - timedelta(days=max(0, duration - 1))
-        df.at[i, "시작일"] = current_start
-        chain_link_date = current_start
-
-    # Forward
-    chain_link_date = df.at[anchor_idx, "종료일"]
-    for i in range(anchor_idx + 1, len(df)):
-        if df.at[i, "독립 일정"]: continue
-        current_start = chain_link_date + timedelta(days=1)
-        df.at[i, "시작일"] = current_start
-        duration = int(df.at[i, "소요 일수"])
-        current_end = current_start + timedelta(days=max(0, duration - 1))
-        df.at[i, "종료일"] = current_end
-        chain_link_date = current_end
-    return ensure_data_types(df)
-
-# 중요 키워드
-IMPORTANT_KEYWORDS = ["발주 회의", "집필 (본문 개발)", "1차 외부/교차 검토", "2차 외부/교차 검토", "3차 외부/교차 검토", "가쇄본 제작", "집필자 최종 검토", "내용 OK", "최종 플루토 OK", "플루토"]
-
-def create_initial_schedule(target_date_obj):
-    schedule_list = []
-    base_date = pd.to_datetime(target_date_obj)
-    current_end = base_date
-    
-    def add_row_backward(name, days, independent=False, note=""):
-        nonlocal current_end
-        display_name = name
-        if any(keyword in name for keyword in IMPORTANT_KEYWORDS): display_name = f"🔴 {name}"
-        start = current_end - timedelta(days=days - 1)
-        schedule_list.append({
-            "선택": False, "독립 일정": independent, "구분": display_name, "소요 일수": days, 
-            "시작일": start.date(), "종료일": current_end.date(), "비고": note
-        })
-        if not independent: current_end = start - timedelta(days=1)
-
-    add_row_backward("최종 플루토 OK", 2, note="★ 확정일 (기준)") 
-    add_row_backward("내용 OK", 3)
-    print_mtg_date = current_end - timedelta(days=14)
-    schedule_list.append({"선택": False, "독립 일정": True, "구분": "인쇄협의체 회의", "소요 일수": 1, "시작일": print_mtg_date.date(), "종료일": print_mtg_date.date(), "비고": "독립 일정"})
-    add_row_backward("최종 검토 반영", 7)
-    add_row_backward("집필자 최종 검토", 1)
-    add_row_backward("편집 검토", 7)
-    add_row_backward("가쇄본 제작", 3) 
-    for i in range(3, 0, -1):
-        add_row_backward(f"{i}차 조판 수정", 7)
-        add_row_backward(f"{i}차 집필자 반영", 7)
-        add_row_backward(f"{i}차 외부/교차 검토", 7) 
-    add_row_backward("1차 조판 및 편집", 40)
-    add_row_backward("  └ 최종 집필물 수령", 0, independent=True)
-    add_row_backward("  ├ 1차 집필물 수령", 0, independent=True)
-    add_row_backward("집필 (본문 개발)", 30) 
-    add_row_backward("발주 회의 및 계약", 1)
-    pre_steps = ["샘플 원고 작성", "발주회의 자료 제작", "집필자 섭외", "배열표 작성", "일정 확정", "기획안 확인"]
-    for name in pre_steps: add_row_backward(name, 1, independent=False, note="직접 입력")
-    schedule_list.reverse()
-    
-    pdf_start = base_date + timedelta(days=1)
-    pdf_end = pdf_start + timedelta(days=3 - 1)
-    schedule_list.append({"선택": False, "독립 일정": False, "구분": "최종 PDF 수령", "소요 일수": 3, "시작일": pdf_start.date(), "종료일": pdf_end.date(), "비고": "OK 이후 진행"})
-    report_date = base_date + timedelta(days=30)
-    schedule_list.append({"선택": False, "독립 일정": False, "구분": "📝 개발완료보고서 작성", "소요 일수": 1, "시작일": report_date.date(), "종료일": report_date.date(), "비고": "기준일 + 1개월 내"})
-    settlement_date = base_date + timedelta(days=90)
-    schedule_list.append({"선택": False, "독립 일정": False, "구분": "💰 개발비 정산", "소요 일수": 0, "시작일": settlement_date.date(), "종료일": settlement_date.date(), "비고": "기준일 + 3개월 내"})
-    return pd.DataFrame(schedule_list).reset_index(drop=True)
-
 # --- 7. 교재(프로젝트) 관리 함수 ---
 def get_project_by_id(pid):
-    for p in st.session_state['projects']:
-        if p['id'] == pid: return p
-    return None
+    return st.session_state['projects'].peek(pid)
 
 def update_current_project_data(key, value):
-    pid = st.session_state['current_project_id']
-    for p in st.session_state['projects']:
-        if p['id'] == pid:
-            p[key] = value
-            break
+    p = st.session_state['projects'].checkout(st.session_state['current_project_id'])
+    if p: p[key] = value
+
+def sync_save_status(rerun=False):
+    # 편집기 조각 안에서 호출: 사이드바의 '저장되지 않은 변경사항' 표시가 바뀌어야 하면 앱 전체 재실행,
+    # rerun이면 그 외에는 조각만 다시 실행 (앱 전체 실행 중에는 조각 단위 재실행이 불가 -> 전체 재실행)
+    if st.session_state['projects'].has_changes() != st.session_state.get('_save_status_shown'): st.rerun()
+    if not rerun: return
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
 def create_new_project():
     year = st.session_state.new_proj_year
@@ -426,29 +162,7 @@ def create_new_project():
         st.error("시리즈명과 교재명은 필수 입력입니다.")
         return
 
-    new_p = {
-        "id": str(uuid.uuid4()), "year": year, "level": level, "subject": subject, "series": series, "title": title,
-        "schedule_data": pd.DataFrame(), "author_list": [], "reviewer_list": [], "partner_list": [], 
-        "dev_data": pd.DataFrame(columns=["단원명", "집필자", "집필상태", "원고파일", "검토자", "검토상태", "피드백", "디자인상태", "비고"]), 
-        "issues": [], "planning_data": pd.DataFrame(), 
-        "book_specs": {"format": "", "colors_main": ["1도"], "colors_sol": "1도", "is_ebook": False, "is_answer_view": False, "is_answer_pdf": False},
-        "report_checklist": pd.DataFrame(DEFAULT_CHECKLIST),
-        "author_standards": pd.DataFrame([
-            {"구분": "쪽당", "원고료": 35000, "검토료": 14000},
-            {"구분": "문항당", "원고료": 3000, "검토료": 1500}
-        ]),
-        "review_standards": pd.DataFrame([
-            {"구분": "1차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "2차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "3차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
-            {"구분": "편집검토", "단가(쪽)": 6000, "단가(문항)": 500}
-        ]),
-        "penalties": {},
-        "target_date_val": datetime.today(),
-        "created_at": datetime.now(),
-        "settlement_list": [],
-        "contract_status": {}
-    }
+    new_p = new_project(id=str(uuid.uuid4()), year=year, level=level, subject=subject, series=series, title=title)
     
     default_target = datetime.today()
     new_p['schedule_data'] = create_initial_schedule(default_target)
@@ -460,74 +174,126 @@ def create_new_project():
     st.rerun()
 
 # --- 8. 사이드바 ---
+sidebar_span = profiling.start_span("sidebar")
 st.sidebar.title("📚 EBS 교재개발 관리")
 
-# [MD5 Hash Change Detection]
-def get_data_hash(data):
-    return hashlib.md5(pickle.dumps(data)).hexdigest()
-
-if 'last_saved_hash' not in st.session_state:
-    st.session_state['last_saved_hash'] = get_data_hash(st.session_state['projects'])
-
-current_hash = get_data_hash(st.session_state['projects'])
-has_changes = current_hash != st.session_state['last_saved_hash']
-
-if has_changes:
-    st.sidebar.markdown(
-        """
-        <div style="
-            animation: pulse 2s infinite; 
-            background-color: #ff4b4b; 
-            color: white; 
-            padding: 10px; 
-            border-radius: 5px; 
-            text-align: center; 
-            margin-bottom: 10px;
-            font-weight: bold;">
-            ⚠️ 저장되지 않은 변경사항이 있습니다!
-        </div>
-        <style>
-            @keyframes pulse {
-                0% { opacity: 1; }
-                50% { opacity: 0.7; }
-                100% { opacity: 1; }
-            }
-        </style>
-        """, 
-        unsafe_allow_html=True
-    )
-    save_btn_label = "💾 변경 사항 저장 (Click!)"
-    save_btn_type = "primary"
-else:
-    save_btn_label = "✅ 최신 상태입니다"
-    save_btn_type = "secondary"
-
-if st.sidebar.button(save_btn_label, type=save_btn_type):
-    with st.spinner("구글 시트에 저장 중..."):
-        if save_data_to_sheet(st.session_state['projects']):
-            st.session_state['last_saved_hash'] = get_data_hash(st.session_state['projects'])
-            st.sidebar.success("✅ 안전하게 저장되었습니다!")
-            st.rerun()
-        else:
-            st.sidebar.error("저장 실패. service_account.json 파일이나 인터넷 연결을 확인하세요.")
+# [Fragment] 저장 상태/저장 버튼은 독립 조각 - 충돌 확인 등은 이 조각만 다시 실행
+# 편집기 조각에서 변경이 생겨 표시가 달라져야 할 때는 sync_save_status()가 앱 전체를 다시 실행
+@st.fragment
+def save_status():
+    has_changes = st.session_state['projects'].has_changes()
+    st.session_state['_save_status_shown'] = has_changes
+
+    if has_changes:
+        st.markdown(
+            """
+            <div style="
+                animation: pulse 2s infinite; 
+                background-color: #ff4b4b; 
+                color: white; 
+                padding: 10px; 
+                border-radius: 5px; 
+                text-align: center; 
+                margin-bottom: 10px;
+                font-weight: bold;">
+                ⚠️ 저장되지 않은 변경사항이 있습니다!
+            </div>
+            <style>
+                @keyframes pulse {
+                    0% { opacity: 1; }
+                    50% { opacity: 0.7; }
+                    100% { opacity: 1; }
+                }
+            </style>
+            """, 
+            unsafe_allow_html=True
+        )
+        save_btn_label = "💾 변경 사항 저장 (Click!)"
+        save_btn_type = "primary"
+    else:
+        save_btn_label = "✅ 최신 상태입니다"
+        save_btn_type = "secondary"
+
+    if st.button(save_btn_label, type=save_btn_type):
+        with st.spinner("구글 시트에 저장 중..."):
+            view = st.session_state['projects']
+            result = save_data_to_sheet(view)
+            if result:
+                new_snap = shared_store.publish(result.projects, result.meta, base=view.snapshot)
+                # [History] 이번 저장으로 바뀐 교재만 버전 기록 (표 단위 중복 제거)
+                try:
+                    changed_ids = store.diff_ids(view.snapshot, new_snap)
+                    get_history().record([new_snap.index[pid] for pid in changed_ids if pid in new_snap.index], result.meta, base=view.snapshot)
+                except OSError as e:
+                    st.warning(f"버전 기록 저장 실패: {e}")
+                view.rebase(new_snap)
+                st.session_state['save_conflicts'] = result.conflicts
+                if result.merged: st.toast("🔀 다른 사용자의 변경 사항을 병합하여 저장했습니다.")
+                st.success("✅ 안전하게 저장되었습니다!")
+                st.rerun()
+            else:
+                st.error("저장 실패. service_account.json 파일이나 인터넷 연결을 확인하세요.")
+
+    if st.session_state.get('save_conflicts'):
+        with st.expander("⚠️ 병합 충돌 (내 변경 우선 적용)", expanded=True):
+            for c in st.session_state['save_conflicts']:
+                st.write(f"**{c['title']}**: {', '.join(c['fields'])}")
+            if st.button("확인", key="dismiss_save_conflicts"):
+                st.session_state['save_conflicts'] = []
+                sync_save_status(rerun=True)
+
+with st.sidebar: save_status()
 
 # [Emergency Reload]
 if st.sidebar.button("🔄 서버 데이터 다시 불러오기 (수정 취소)"):
     with st.spinner("서버에서 데이터를 다시 가져오는 중..."):
-        reloaded = load_data_from_sheet()
-        if reloaded:
-            st.session_state['projects'] = reloaded
-            st.session_state['last_saved_hash'] = get_data_hash(reloaded)
+        reloaded = shared_store.reload()
+        if reloaded.projects:
+            st.session_state['projects'].rebase(reloaded)
+            st.session_state['save_conflicts'] = []
             st.sidebar.success("데이터를 복구했습니다.")
             st.rerun()
 
-current_p = get_project_by_id(st.session_state['current_project_id'])
+# [Archive] 전체 DB 백업(.ebsa, 교재별 압축 + 체크섬) / 복원 - 복원 후 저장해야 서버에 반영
+# 복원은 서버 키(EBS_ARCHIVE_KEY)로 서명된 백업만 허용 (pickle 해제 = 코드 실행, 업로드 파일을 믿지 않음)
+archive_key = archive.server_key()
+with st.sidebar.expander("🗄️ 전체 백업 / 복원"):
+    if st.button("📦 백업 파일 만들기", key="archive_export", use_container_width=True):
+        buf = io.BytesIO()
+        with st.spinner("백업 파일 생성 중..."):
+            manifest = archive.export_archive(st.session_state['projects'], buf, meta={"rev": st.session_state['projects'].snapshot.rev}, key=archive_key)
+        st.download_button(
+            f"💾 다운로드 ({manifest['count']}권)", buf.getvalue(),
+            file_name=f"EBS_교재DB_{datetime.now():%Y%m%d_%H%M}.ebsa", mime="application/zip",
+            use_container_width=True
+        )
+    if archive_key is None:
+        st.caption(f"백업 복원은 서버에 {archive.KEY_ENV}가 설정된 경우에만 사용할 수 있습니다.")
+    archive_file = st.file_uploader("백업 파일 복원", type=["ebsa"], key="archive_upload") if archive_key else None
+    if archive_file is not None and st.button("↩️ 백업 내용으로 전체 교체", key="archive_import", use_container_width=True):
+        try:
+            with st.spinner("체크섬 검증 및 복원 중..."):
+                restored, manifest = archive.import_archive(archive_file, key=archive_key)
+            st.session_state['projects'].replace_all(restored)
+            if st.session_state['current_project_id'] not in {p['id'] for p in restored}:
+                st.session_state['current_project_id'] = None
+                st.session_state['selected_overview_id'] = None
+            st.toast(f"백업({manifest['created_at'].replace('T', ' ')})의 교재 {len(restored)}권으로 교체했습니다. 저장해야 반영됩니다.")
+            st.rerun()
+        except (archive.ArchiveError, zipfile.BadZipFile) as e:
+            st.error(f"복원 실패: {e}")
+
+# 현재 교재만 세션 전용 복사본으로 편집, 손대지 않은 이전 교재는 공유본으로 반환
+view = st.session_state['projects']
+for pid in list(view.overrides):
+    if pid != st.session_state['current_project_id']: view.release(pid)
+current_p = view.checkout(st.session_state['current_project_id'])
 
 st.sidebar.markdown("---")
 st.sidebar.header("🚀 메뉴 이동")
 menu = st.sidebar.radio(
     "메뉴 이동",
-    ["교재 등록 및 관리(HOME)", "1. 교재 기획", "2. 개발 일정", "3. 참여자", "4. 개발 프로세스", "5. 결과보고서 및 정산", "6. 약정서 및 서약서"],
+    ["교재 등록 및 관리(HOME)", "1. 교재 기획", "2. 개발 일정", "3. 참여자", "4. 개발 프로세스", "5. 결과보고서 및 정산", "6. 약정서 및 서약서", "7. 전체 정산 원장"],
     key="main_menu",
     label_visibility="collapsed"
 )
@@ -536,6 +302,24 @@ if current_p:
     st.sidebar.markdown("---")
     st.sidebar.markdown("**📂 현재 작업 중인 교재**")
     st.sidebar.info(f"**[{current_p['year']}/{current_p['level']}]**\n\n{current_p['series']} - {current_p['title']}")
+
+    # [History] 저장된 버전 목록 / 변경 비교 / 복원
+    versions = get_history().list_versions(current_p['id'])
+    if versions:
+        with st.sidebar.expander(f"🕘 버전 기록 ({len(versions)})"):
+            labels = {v['version']: f"v{v['version']} · {v['saved_at'].replace('T', ' ')}" + (f" ({v['note']})" if v.get('note') else "") for v in versions}
+            sel_ver = st.selectbox("버전 선택", list(reversed(list(labels))), format_func=labels.get, key=f"history_version_{current_p['id']}")
+            if sel_ver > 1:
+                for c in get_history().diff_versions(current_p['id'], sel_ver - 1, sel_ver):
+                    if c['table'] == history.INFO: st.caption(f"• {c['label']}: {', '.join(c['fields'])}")
+                    elif 'changed_cells' in c: st.caption(f"• {c['label']}: {c['changed_cells']}칸 변경 ({', '.join(map(str, c['changed_columns']))})")
+                    else: st.caption(f"• {c['label']}: {c['rows_before']}행 → {c['rows_after']}행")
+            else:
+                st.caption("최초 기록된 버전입니다.")
+            if st.button("↩️ 이 버전으로 복원", key="history_restore"):
+                history.restore_into(current_p, get_history().load_version(current_p['id'], sel_ver))
+                st.toast(f"v{sel_ver} 내용으로 복원했습니다. 저장해야 반영됩니다.")
+                st.rerun()
 else:
     st.sidebar.markdown("---")
     st.sidebar.warning("선택된 교재가 없습니다.\nHOME에서 교재를 선택해주세요.")
@@ -565,36 +349,33 @@ def entry_dialog():
             st.rerun()
 
 # --- 10. 메인 화면 ---
+sidebar_span.stop()
+menu_span = profiling.start_span(f"menu:{menu}")
 
 if menu == "교재 등록 및 관리(HOME)":
     st.title("📊 교재 등록 및 관리 Dashboard")
     
     # 1. 상단 요약 배너 (Metrics)
-    total_cnt = len(st.session_state['projects'])
-    impending_cnt = 0
-    completed_cnt = 0
-    today = datetime.now().date()
-    
-    for p in st.session_state['projects']:
-        sch = p.get('schedule_data')
-        if sch is not None and not sch.empty:
-            for _, row in sch.iterrows():
-                try:
-                    ed = pd.to_datetime(row['종료일']).date()
-                    if pd.notnull(ed):
-                        days = (ed - today).days
-                        if 0 <= days <= 3:
-                            impending_cnt += 1
-                            break 
-                except: pass
-        target_date = get_schedule_date(p)
-        if target_date and pd.notnull(target_date) and target_date.date() < today:
-            completed_cnt += 1
-
-    col_m1, col_m2, col_m3 = st.columns(3)
-    col_m1.metric("📚 전체 교재", f"{total_cnt}권")
-    col_m2.metric("🔴 마감 임박 (3일 내)", f"{impending_cnt}건")
-    col_m3.metric("🟢 완료 (플루토 OK)", f"{completed_cnt}권")
+    # [Progress] 교재별 진행 현황은 (교재, 날짜, 일정 digest) 단위로 캐시 -> 재실행 비용 없음
+    # [Fragment] 요약 배너는 REMOTE_POLL_SECONDS마다 이 조각만 다시 계산 (날짜가 바뀌어도 갱신)
+    # 다른 세션/서버의 저장으로 공유 스냅샷이 바뀌었으면 앱 전체를 다시 실행해 목록까지 반영
+    @st.fragment(run_every=REMOTE_POLL_SECONDS)
+    def home_metrics():
+        view = st.session_state['projects']
+        shared_store.poll_remote(get_db_connection, REMOTE_POLL_SECONDS)
+        latest, _ = shared_store.changes_since(view.snapshot)
+        if latest is not None and latest is not view.snapshot: st.rerun()
+        prog = progress.portfolio(view)
+        impending_cnt = sum(1 for m in prog.values() if m['impending'])
+        completed_cnt = sum(1 for m in prog.values() if m['pluto_done'])
+
+        col_m1, col_m2, col_m3 = st.columns(3)
+        col_m1.metric("📚 전체 교재", f"{len(view)}권")
+        col_m2.metric("🔴 마감 임박 (3일 내)", f"{impending_cnt}건")
+        col_m3.metric("🟢 완료 (플루토 OK)", f"{completed_cnt}권")
+
+    home_metrics()
+    prog = progress.portfolio(st.session_state['projects'])
 
     st.markdown("---")
 
@@ -603,7 +384,7 @@ if menu == "교재 등록 및 관리(HOME)":
     with col_home_L:
         st.subheader("🔔 마감 임박 알림")
         with st.container(height=300):
-            alerts = get_notifications()
+            alerts = get_notifications(st.session_state['projects'])
             if not alerts:
                 st.info("🎉 3일 이내 마감되는 일정이 없습니다.")
             else:
@@ -641,6 +422,20 @@ if menu == "교재 등록 및 관리(HOME)":
         if st.button("🔄 교재 목록 펼치기/접기", use_container_width=True):
             st.session_state['view_all_mode'] = not st.session_state['view_all_mode']
 
+        # [Export] 검색 필터에 걸린 교재 전체의 정산/일정/참여자 + 개인별 공급가액 합계
+        with st.expander(f"📦 일괄 내보내기 ({len(filtered_list)}권)"):
+            exp_fmt = st.radio("형식", ["xlsx", "zip"], format_func={"xlsx": "엑셀 (시트별)", "zip": "CSV 묶음 (zip)"}.get, horizontal=True, key="export_fmt")
+            if st.button("📥 내보내기 파일 만들기", use_container_width=True, disabled=not filtered_list):
+                buf = io.BytesIO()
+                with st.spinner("내보내기 파일 생성 중..."):
+                    n_rows = export.export(filtered_list, buf, exp_fmt)
+                label = "전체" if s_year == "전체" else s_year
+                st.download_button(
+                    f"💾 다운로드 ({n_rows:,}행)", buf.getvalue(),
+                    file_name=f"EBS_교재_{label}_정산일정.{exp_fmt}", mime=export.FORMATS[exp_fmt][1],
+                    use_container_width=True
+                )
+
     st.markdown("---")
 
     st.subheader("📋 교재 목록")
@@ -648,18 +443,20 @@ if menu == "교재 등록 및 관리(HOME)":
     is_filtered = (s_year != "전체" or s_level != "전체" or s_subject != "전체")
     show_table = is_filtered or st.session_state['view_all_mode']
 
-    cols = ["선택", "삭제", "발행 연도", "학교급", "과목", "시리즈", "교재명", "최종 플루토 OK", "ID"]
+    cols = ["선택", "삭제", "발행 연도", "학교급", "과목", "시리즈", "교재명", "진행률", "현재 단계", "지연", "최종 플루토 OK", "ID"]
     
     if show_table:
         table_data = []
         for p in filtered_list: 
             is_sel = (p['id'] == st.session_state['selected_overview_id'])
-            t_date = get_schedule_date(p)
-            t_str = t_date.strftime("%Y-%m-%d") if (t_date and pd.notnull(t_date)) else "-"
+            m = prog[p['id']]
+            t_str = m['pluto'].strftime("%Y-%m-%d") if m['pluto'] is not None else "-"
             table_data.append({
                 "선택": is_sel, "삭제": False,
                 "발행 연도": p['year'], "학교급": p['level'], "과목": p.get('subject','-'),
-                "시리즈": p['series'], "교재명": p['title'], "최종 플루토 OK": t_str, "ID": p['id']
+                "시리즈": p['series'], "교재명": p['title'],
+                "진행률": int(m['percent'] * 100), "현재 단계": m['stage'], "지연": len(m['overdue']),
+                "최종 플루토 OK": t_str, "ID": p['id']
             })
         final_df = pd.DataFrame(table_data)
         if final_df.empty: final_df = pd.DataFrame(columns=cols)
@@ -668,11 +465,14 @@ if menu == "교재 등록 및 관리(HOME)":
 
     edited_df = st.data_editor(
         final_df, hide_index=True, key="main_dash_editor",
-        column_order=["선택", "발행 연도", "학교급", "과목", "시리즈", "교재명", "최종 플루토 OK", "삭제"],
+        column_order=["선택", "발행 연도", "학교급", "과목", "시리즈", "교재명", "진행률", "현재 단계", "지연", "최종 플루토 OK", "삭제"],
         column_config={
             "선택": st.column_config.CheckboxColumn("선택", width="small"),
             "삭제": st.column_config.CheckboxColumn("삭제", width="small"),
-        }
+            "진행률": st.column_config.ProgressColumn("진행률", min_value=0, max_value=100, format="%d%%"),
+            "지연": st.column_config.NumberColumn("지연", help="종료일이 지났지만 개발 현황 완료 체크가 남은 단계 수", width="small"),
+        },
+        disabled=["진행률", "현재 단계", "지연"]
     )
 
     if not edited_df.empty:
@@ -680,7 +480,7 @@ if menu == "교재 등록 및 관리(HOME)":
         if not to_delete.empty:
             if st.button("🗑️ 선택한 교재 영구 삭제", type="primary"):
                 del_ids = to_delete['ID'].tolist()
-                st.session_state['projects'] = [p for p in st.session_state['projects'] if p['id'] not in del_ids]
+                st.session_state['projects'].remove(del_ids)
                 if st.session_state['current_project_id'] in del_ids:
                     st.session_state['current_project_id'] = None
                 st.rerun()
@@ -706,6 +506,26 @@ if menu == "교재 등록 및 관리(HOME)":
             st.session_state['current_project_id'] = None
             st.rerun()
 
+    # [Timeline] 교재 x 일정 구간 배열 (교재별 일정 digest 단위 캐시)
+    # [Fragment] 토글/구간 슬라이더 조작은 타임라인 조각만 다시 실행 (검색 필터가 바뀌면 앱 전체 실행에서 다시 받음)
+    @st.fragment
+    def home_timeline(tl_store, pids):
+        if not (st.toggle(f"🗓️ 전체 일정 타임라인 ({len(pids)}권)", key="home_timeline") and len(tl_store)): return
+        span_lo, span_hi = tl_store.span()
+        today = datetime.now().date()
+        default_lo = max(span_lo, min(span_hi, today - timedelta(days=30)))
+        default_hi = min(span_hi, max(span_lo, today + timedelta(days=180)))
+        if default_lo >= default_hi: default_lo, default_hi = span_lo, span_hi
+        tl_range = st.slider("표시 구간", min_value=span_lo, max_value=span_hi, value=(default_lo, default_hi), format="YYYY-MM-DD", key="home_timeline_range")
+        bars, resolution = tl_store.view(tl_range[0], tl_range[1], pids=pids)
+        if bars.empty: st.info("표시 구간에 해당하는 일정이 없습니다.")
+        else:
+            st.altair_chart(timeline.chart(bars), use_container_width=True)
+            st.caption(f"막대 {len(bars):,}개" + (f" · {resolution}일 이내 일정은 한 막대로 묶어 표시 (구간을 좁히면 상세 표시)" if resolution else ""))
+
+    tl_store = timeline.build(st.session_state['projects'], st.session_state['projects'].shared_digests)
+    home_timeline(tl_store, {p['id'] for p in filtered_list})
+
     if st.session_state['selected_overview_id']:
         sel_p = get_project_by_id(st.session_state['selected_overview_id'])
         if sel_p:
@@ -719,16 +539,48 @@ if menu == "교재 등록 및 관리(HOME)":
                 st.write(f"검토: {', '.join(revs) if revs else '-'}")
             with c_ov2:
                 st.caption("📅 주요 일정")
-                sch = ensure_data_types(sel_p['schedule_data'])
-                if not sch.empty:
-                    major = sch[sch['구분'].str.contains("🔴", na=False)]
-                    if not major.empty:
-                        for _, r in major.iterrows():
-                            d = r['시작일'] if pd.notnull(r['시작일']) else r['종료일']
-                            st.write(f"{d} : {r['구분'].replace('🔴 ','')}")
+                if not sel_p['schedule_data'].empty:
+                    major = tl_store.milestones(sel_p['id'])
+                    if major:
+                        for d, name in major: st.write(f"{d} : {name}")
                     else: st.write("주요 일정 없음")
                 else: st.write("일정 없음")
 
+# [Ledger] 전체 교재 정산 원장: 지급 건별 원천세(기타소득 8.8% / 사업소득 3.3%) 및 실지급액
+elif menu == "7. 전체 정산 원장":
+    st.title("📒 전체 정산 원장")
+    all_projects = list(st.session_state['projects'])
+
+    c_lf1, c_lf2, c_lf3 = st.columns([1, 1, 1])
+    with c_lf1: l_years = st.multiselect("발행 연도", sorted({p['year'] for p in all_projects}), key="ledger_years")
+    with c_lf2: l_levels = st.multiselect("학교급", ["초등", "중학", "고교", "기타"], key="ledger_levels")
+    with c_lf3: l_default = st.radio("기본 소득 구분", ledger.INCOME_TYPES, horizontal=True, key="ledger_default_type")
+
+    ledger_df = ledger.build_ledger(all_projects, l_years, l_levels)
+    other_type = ledger.BUSINESS_INCOME if l_default == ledger.OTHER_INCOME else ledger.OTHER_INCOME
+    pay_keys = ledger.payment_keys(ledger_df)
+    l_except = st.multiselect(f"{other_type} 적용 대상 (지급 건별 개별 지정)", list(pay_keys), format_func=pay_keys.get, key="ledger_income_except")
+    pay_df = ledger.payments(ledger_df, all_projects, {k: other_type for k in l_except}, l_default)
+    summary_df = ledger.payee_summary(pay_df)
+
+    c_lm1, c_lm2, c_lm3, c_lm4 = st.columns(4)
+    c_lm1.metric("👥 지급 대상자", f"{pay_df['이름'].nunique():,}명")  # 소득구분이 섞인 사람은 합계 표에 2줄
+    c_lm2.metric("💰 총 지급액", f"{int(pay_df['지급액'].sum()):,}원")
+    c_lm3.metric("🧾 원천세 계", f"{int(pay_df['원천세 계'].sum()):,}원")
+    c_lm4.metric("🏦 실지급액", f"{int(pay_df['실지급액'].sum()):,}원")
+    st.caption("기타소득: 필요경비 60% 공제 후 20% + 지방소득세 10% (지급액 125,000원 이하 비과세) · 사업소득: 3% + 0.3% · 10원 미만 절사, 소득세 1,000원 미만 소액부징수")
+
+    tab_l1, tab_l2, tab_l3 = st.tabs(["대상자별 합계", "지급 건별", "원장 상세"])
+    with tab_l1: st.dataframe(summary_df, hide_index=True, use_container_width=True)
+    with tab_l2: st.dataframe(pay_df, hide_index=True, use_container_width=True)
+    with tab_l3: st.dataframe(ledger_df.drop(columns=["교재ID"]), hide_index=True, use_container_width=True)
+
+    unresolved = pay_df[pay_df['확인 필요'] != ""]
+    if not unresolved.empty:
+        st.warning(f"⚠️ 계좌를 확정할 수 없는 지급 건 {len(unresolved)}건 (계좌 없음 / 같은 교재의 동명이인) - '확인 필요' 열을 확인하세요.")
+    batch_label = "_".join(l_years) if l_years else "전체"
+    st.download_button("💾 지급 배치 파일 (CSV)", ledger.payment_batch_csv(pay_df), file_name=f"지급배치_{batch_label}.csv", mime="text/csv", disabled=pay_df.empty)
+
 elif not current_p:
     st.title(f"{menu}")
     st.warning("⚠️ 교재가 선택되지 않았습니다.")
@@ -778,7 +630,7 @@ else:
                             existing = [a['이름'] for a in current_p.get('author_list', [])]
                             for auth in plan_df['집필자'].unique():
                                 if pd.notnull(auth) and str(auth).strip() not in ['-', ''] and auth not in existing:
-                                    current_p['author_list'].append({"이름": auth, "역할": "공동집필"})
+                                    current_p['author_list'].append(Person(name=auth, role="공동집필"))
                         
                         if '대단원' in plan_df.columns:
                             current_dev_df = current_p.get('dev_data', pd.DataFrame())
@@ -825,40 +677,46 @@ else:
                     st.success("파일 업로드 완료!")
                 except Exception as e: st.error(f"파일 읽기 실패: {e}")
 
-            plan_df = current_p.get('planning_data', pd.DataFrame())
-            if not plan_df.empty:
-                if '문항수' not in plan_df.columns: plan_df['문항수'] = 0
+            # [Fragment] 배열표 편집은 이 조각(표 + 집필자별 차트)만 다시 실행
+            @st.fragment
+            def planning_grid(pid):
+                current_p = st.session_state['projects'].checkout(pid)
+                plan_df = current_p.get('planning_data', pd.DataFrame())
+                if not plan_df.empty:
+                    if '문항수' not in plan_df.columns: plan_df['문항수'] = 0
 
-                edited_plan = st.data_editor(plan_df, num_rows="dynamic", key="planning_editor")
-                if not edited_plan.equals(plan_df):
-                    update_current_project_data('planning_data', edited_plan)
-                
-                if '집필자' in plan_df.columns:
-                    try:
-                        col_g1, col_g2 = st.columns(2)
-                        with col_g1:
-                             if '쪽수' in plan_df.columns:
-                                plan_df['쪽수_num'] = pd.to_numeric(plan_df['쪽수'], errors='coerce').fillna(0)
-                                chart_data_page = plan_df.groupby('집필자')['쪽수_num'].sum().reset_index()
-                                st.markdown("##### 📄 집필자별 쪽수")
-                                st.bar_chart(chart_data_page.set_index('집필자'))
-                        
-                        with col_g2:
-                             if '문항수' in plan_df.columns:
-                                plan_df['문항수_num'] = pd.to_numeric(plan_df['문항수'], errors='coerce').fillna(0)
-                                chart_data_item = plan_df.groupby('집필자')['문항수_num'].sum().reset_index()
-                                st.markdown("##### ❓ 집필자별 문항수")
-                                st.bar_chart(chart_data_item.set_index('집필자'), color="#FF6C6C") 
-
-                    except Exception as e: pass
-            else:
-                if st.button("빈 배열표 생성"):
-                    current_p['planning_data'] = pd.DataFrame(columns=["분권", "구분", "대단원", "중단원", "쪽수", "문항수", "집필자"])
-                    st.rerun()
+                    edited_plan = st.data_editor(plan_df, num_rows="dynamic", key="planning_editor")
+                    if not edited_plan.equals(plan_df):
+                        current_p['planning_data'] = edited_plan
+                        sync_save_status()
+                    
+                    if '집필자' in plan_df.columns:
+                        try:
+                            col_g1, col_g2 = st.columns(2)
+                            with col_g1:
+                                 if '쪽수' in plan_df.columns:
+                                    plan_df['쪽수_num'] = pd.to_numeric(plan_df['쪽수'], errors='coerce').fillna(0)
+                                    chart_data_page = plan_df.groupby('집필자')['쪽수_num'].sum().reset_index()
+                                    st.markdown("##### 📄 집필자별 쪽수")
+                                    st.bar_chart(chart_data_page.set_index('집필자'))
+                            
+                            with col_g2:
+                                 if '문항수' in plan_df.columns:
+                                    plan_df['문항수_num'] = pd.to_numeric(plan_df['문항수'], errors='coerce').fillna(0)
+                                    chart_data_item = plan_df.groupby('집필자')['문항수_num'].sum().reset_index()
+                                    st.markdown("##### ❓ 집필자별 문항수")
+                                    st.bar_chart(chart_data_item.set_index('집필자'), color="#FF6C6C") 
+
+                        except Exception as e: pass
+                else:
+                    if st.button("빈 배열표 생성"):
+                        current_p['planning_data'] = pd.DataFrame(columns=["분권", "구분", "대단원", "중단원", "쪽수", "문항수", "집필자"])
+                        st.rerun()
+
+            planning_grid(current_p['id'])
 
         with tab_plan2:
             st.subheader("교재 사양")
-            if 'book_specs' not in current_p: current_p['book_specs'] = {}
             specs = current_p['book_specs']
 
             with st.container(border=True):
@@ -1057,26 +915,34 @@ else:
 
         if trigger_rerun: st.rerun()
 
-        edited_df = st.data_editor(
-            df, num_rows="dynamic", hide_index=True, key="schedule_editor",
-            column_order=["선택", "독립 일정", "구분", "소요 일수", "시작일", "종료일", "비고"],
-            column_config={
-                "시작일": st.column_config.DateColumn("시작일", format="YYYY-MM-DD dddd"),
-                "종료일": st.column_config.DateColumn("종료일", format="YYYY-MM-DD dddd"),
-            }
-        )
+        # [Fragment] 일정표 편집은 이 조각만 다시 실행 (사이드바 일정 조작 버튼은 앱 전체 실행)
+        @st.fragment
+        def schedule_grid(pid):
+            current_p = st.session_state['projects'].checkout(pid)
+            df = ensure_data_types(current_p.get('schedule_data', pd.DataFrame()))
+            edited_df = st.data_editor(
+                df, num_rows="dynamic", hide_index=True, key="schedule_editor",
+                column_order=["선택", "독립 일정", "구분", "소요 일수", "시작일", "종료일", "비고"],
+                column_config={
+                    "시작일": st.column_config.DateColumn("시작일", format="YYYY-MM-DD dddd"),
+                    "종료일": st.column_config.DateColumn("종료일", format="YYYY-MM-DD dddd"),
+                }
+            )
 
-        if not edited_df.equals(df):
-             for index, row in edited_df.iterrows():
-                if row['독립 일정']:
-                    try:
-                        s_date = pd.to_datetime(row['시작일']).date() if pd.notnull(row['시작일']) else None
-                        duration = int(row['소요 일수'])
-                        if s_date and duration >= 0:
-                            new_end = s_date + timedelta(days=duration - 1)
-                            edited_df.at[index, '종료일'] = new_end
-                    except: pass
-             update_current_project_data('schedule_data', ensure_data_types(edited_df))
+            if not edited_df.equals(df):
+                 for index, row in edited_df.iterrows():
+                    if row['독립 일정']:
+                        try:
+                            s_date = pd.to_datetime(row['시작일']).date() if pd.notnull(row['시작일']) else None
+                            duration = int(row['소요 일수'])
+                            if s_date and duration >= 0:
+                                new_end = s_date + timedelta(days=duration - 1)
+                                edited_df.at[index, '종료일'] = new_end
+                        except: pass
+                 current_p['schedule_data'] = ensure_data_types(edited_df)
+                 sync_save_status()
+
+        schedule_grid(current_p['id'])
 
     # ==========================================
     # [3. 참여자]
@@ -1093,7 +959,7 @@ else:
         # --- 1. 집필진 ---
         with tab_auth:
             st.info("💡 목록에서 행을 클릭하면 수정/삭제할 수 있습니다.")
-            auth_df = pd.DataFrame(current_p.get('author_list', []))
+            auth_df = pd.DataFrame([a.to_dict() for a in current_p.get('author_list', [])])
             cols = ["이름", "학교급", "소속", "과목", "역할", "연락처", "이메일", "우편번호", "주소", "상세주소", "은행명", "계좌번호", "주민번호(앞)"]
             if auth_df.empty: auth_df = pd.DataFrame(columns=cols)
             else:
@@ -1148,7 +1014,7 @@ else:
                     if st.form_submit_button("💾 저장 / 등록", type="primary"):
                         if not name: st.error("이름 필수")
                         else:
-                            new_data = {"이름": name, "학교급": school, "소속": affil, "과목": subj, "역할": role, "연락처": phone, "이메일": email, "우편번호": zipcode, "주소": addr, "상세주소": detail, "은행명": bank, "계좌번호": account, "주민번호(앞)": rid}
+                            new_data = Person.from_dict({"이름": name, "학교급": school, "소속": affil, "과목": subj, "역할": role, "연락처": phone, "이메일": email, "우편번호": zipcode, "주소": addr, "상세주소": detail, "은행명": bank, "계좌번호": account, "주민번호(앞)": rid})
                             if selected_row: current_p['author_list'][selected_idx] = new_data; st.success("수정 완료")
                             else: current_p['author_list'].append(new_data); st.success("등록 완료")
                             st.rerun()
@@ -1161,7 +1027,7 @@ else:
         # --- 2. 검토진 ---
         with tab_rev:
             st.info("💡 목록에서 행을 클릭하면 수정/삭제할 수 있습니다.")
-            part_df = pd.DataFrame(current_p.get('reviewer_list', []))
+            part_df = pd.DataFrame([r.to_dict() for r in current_p.get('reviewer_list', [])])
             cols = ["이름", "학교급", "소속", "과목", "검토차수", "매칭정보", "연락처", "이메일", "우편번호", "주소", "상세주소", "은행명", "계좌번호", "주민번호(앞)"]
             if part_df.empty: part_df = pd.DataFrame(columns=cols)
             else: 
@@ -1286,7 +1152,7 @@ else:
                         if not f_name or not final_role: st.error("이름/차수 필수")
                         else:
                             role_clean = normalize_string(final_role)
-                            new_data = {"이름": f_name, "검토차수": role_clean, "매칭정보": final_match_val, "소속": f_affil, "학교급": f_school, "과목": f_subj, "연락처": f_phone, "이메일": f_email, "우편번호": zipcode, "주소": addr, "상세주소": detail, "은행명": bank, "계좌번호": acc, "주민번호(앞)": rid}
+                            new_data = Person.from_dict({"이름": f_name, "검토차수": role_clean, "매칭정보": final_match_val, "소속": f_affil, "학교급": f_school, "과목": f_subj, "연락처": f_phone, "이메일": f_email, "우편번호": zipcode, "주소": addr, "상세주소": detail, "은행명": bank, "계좌번호": acc, "주민번호(앞)": rid})
                             
                             if selected_row: current_p['reviewer_list'][selected_idx] = new_data; st.success("수정 완료")
                             else: current_p['reviewer_list'].append(new_data); st.success("등록 완료")
@@ -1376,117 +1242,85 @@ else:
                 st.markdown("##### 📝 단원별 집필/검토자 배정 매트릭스")
             with col_btn:
                 if st.button("🔄 검토자 자동 배정 (초기화 후 재배정)", type="primary"):
-                    dev_df = current_p['dev_data']
-                    review_cols = [c for c in dev_df.columns if "검토" in c or "감수" in c]
-                    for col in review_cols:
-                        if col not in ["검토상태", "검토완료"]: dev_df[col] = "-"
-                    
-                    cnt = 0
-                    for r in current_p['reviewer_list']:
-                        match_targets = [t.strip() for t in str(r.get('매칭정보','')).split(',') if t.strip()]
-                        role_col = normalize_string(r.get('검토차수'))
-                        
-                        if role_col in dev_df.columns and match_targets:
-                            for idx, row in dev_df.iterrows():
-                                unit_name = str(row['단원명'])
-                                unit_match_exact = unit_name in match_targets
-                                
-                                unit_match_contains = False
-                                for target in match_targets:
-                                    if target in unit_name or unit_name in target:
-                                        unit_match_contains = True
-                                        break
-                                
-                                author_match = any(t == str(row['집필자']) for t in match_targets)
-                                
-                                if unit_match_exact or unit_match_contains or author_match:
-                                    current_val = str(dev_df.at[idx, role_col])
-                                    if current_val in ["-", "", "nan", "None"]: 
-                                        dev_df.at[idx, role_col] = r['이름']; cnt += 1
-                                    elif r['이름'] not in current_val: 
-                                        dev_df.at[idx, role_col] = current_val + ", " + r['이름']; cnt += 1
-
-                    current_p['dev_data'] = dev_df
+                    cnt, changes = auto_assign_reviewers(current_p)
+                    edits.commit(current_p, 'dev_data', changes, source="auto_assign")
                     st.success(f"기존 배정을 초기화하고, {cnt}건의 매칭을 새로 완료했습니다!")
                     st.rerun()
 
-            dev_df = current_p['dev_data']
-            base_cols = ["단원명", "집필자"]
-            desired_order = ["1차외부검토", "2차외부검토", "3차외부검토", "편집검토", "감수"]
-            sorted_review_cols = [c for c in desired_order if c in dev_df.columns]
-            other_cols = [c for c in dev_df.columns if ("검토" in c or "감수" in c) and c not in ["검토상태", "검토자", "검토료_단가"] and c not in ["집필완료", "검토완료", "피드백완료", "디자인완료"] and c not in sorted_review_cols]
-            final_cols = base_cols + sorted_review_cols + other_cols
-            
-            edited = st.data_editor(dev_df[final_cols], hide_index=True, key="dev_process_matrix_editor")
-            if not edited.equals(dev_df[final_cols]):
-                dev_df.update(edited)
-                current_p['dev_data'] = dev_df
+            # [Fragment] 배정 매트릭스 편집은 이 조각만 다시 실행
+            @st.fragment
+            def dev_matrix(pid):
+                current_p = st.session_state['projects'].checkout(pid)
+                dev_df = current_p['dev_data']
+                base_cols = ["단원명", "집필자"]
+                desired_order = ["1차외부검토", "2차외부검토", "3차외부검토", "편집검토", "감수"]
+                sorted_review_cols = [c for c in desired_order if c in dev_df.columns]
+                other_cols = [c for c in dev_df.columns if ("검토" in c or "감수" in c) and c not in ["검토상태", "검토자", "검토료_단가"] and c not in ["집필완료", "검토완료", "피드백완료", "디자인완료"] and c not in sorted_review_cols]
+                final_cols = base_cols + sorted_review_cols + other_cols
+                
+                # [Delta] 위젯 변경분(edited_rows)에서 바뀐 칸만 반영
+                st.data_editor(dev_df[final_cols], hide_index=True, key="dev_process_matrix_editor")
+                dev_df, changes = edits.consume(st.session_state, "dev_process_matrix_editor", dev_df, final_cols)
+                if changes:
+                    current_p['dev_data'] = dev_df
+                    edits.commit(current_p, 'dev_data', changes)
+                    sync_save_status()
+
+            dev_matrix(current_p['id'])
 
         with tab_detail:
-             st.markdown("##### ✍️ 상세 집필/검토/디자인 상태 관리 (체크하여 완료 표시)")
-             dev_df = current_p['dev_data']
-             status_cols = ["단원명", "집필자", "집필완료", "검토완료", "피드백완료", "디자인완료", "비고"]
-             valid_status_cols = [c for c in status_cols if c in dev_df.columns]
-             
-             edited_status = st.data_editor(
-                 dev_df[valid_status_cols], 
-                 hide_index=True, 
-                 key="dev_status_editor",
-                 column_config={
-                    "집필완료": st.column_config.CheckboxColumn("집필", width="small"),
-                    "검토완료": st.column_config.CheckboxColumn("검토", width="small"),
-                    "피드백완료": st.column_config.CheckboxColumn("피드백", width="small"),
-                    "디자인완료": st.column_config.CheckboxColumn("디자인", width="small"),
-                 }
-             )
-             if not edited_status.equals(dev_df[valid_status_cols]):
-                 dev_df.update(edited_status)
-                 current_p['dev_data'] = dev_df
-                 st.rerun()
+             # [Fragment] 완료 체크는 이 조각만 다시 실행 - 진행 상황 탭의 지연 단계 표시가 달라질 때만 앱 전체 재실행
+             @st.fragment
+             def dev_status(pid):
+                 current_p = st.session_state['projects'].checkout(pid)
+                 st.markdown("##### ✍️ 상세 집필/검토/디자인 상태 관리 (체크하여 완료 표시)")
+                 dev_df = current_p['dev_data']
+                 status_cols = ["단원명", "집필자", "집필완료", "검토완료", "피드백완료", "디자인완료", "비고"]
+                 valid_status_cols = [c for c in status_cols if c in dev_df.columns]
+                 
+                 st.data_editor(
+                     dev_df[valid_status_cols], 
+                     hide_index=True, 
+                     key="dev_status_editor",
+                     column_config={
+                        "집필완료": st.column_config.CheckboxColumn("집필", width="small"),
+                        "검토완료": st.column_config.CheckboxColumn("검토", width="small"),
+                        "피드백완료": st.column_config.CheckboxColumn("피드백", width="small"),
+                        "디자인완료": st.column_config.CheckboxColumn("디자인", width="small"),
+                     }
+                 )
+                 dev_df, changes = edits.consume(st.session_state, "dev_status_editor", dev_df, valid_status_cols)
+                 if changes:
+                     current_p['dev_data'] = dev_df
+                     edits.commit(current_p, 'dev_data', changes)
+                     if progress.metrics(current_p)['overdue'] != st.session_state.get('_progress_overdue_shown', []): st.rerun()
+                     sync_save_status()
+
+             dev_status(current_p['id'])
 
         with tab_progress:
             st.markdown("##### 🚀 전체 일정 진행 대시보드")
             schedule_df = current_p.get('schedule_data', pd.DataFrame())
             if not schedule_df.empty:
-                schedule_df = ensure_data_types(schedule_df)
-                pre_ok_df = schedule_df[schedule_df['구분'].str.contains("최종 플루토 OK", na=False) == False]
-                
-                total_tasks = len(pre_ok_df)
-                
-                # [Fixed] Compare timestamps
-                today = pd.Timestamp.now().normalize()
+                m = progress.metrics(current_p, digests=st.session_state['projects'].shared_digests(current_p['id']))
+                st.session_state['_progress_overdue_shown'] = m['overdue']
                 
-                # Convert '종료일' to datetime (coerce errors to NaT) and compare
-                end_dates = pd.to_datetime(pre_ok_df['종료일'], errors='coerce')
-                completed_tasks = pre_ok_df[end_dates < today]
-                
-                completed_count = len(completed_tasks)
-                progress = completed_count / total_tasks if total_tasks > 0 else 0.0
-                
-                st.metric("전체 진행률 (플루토 OK 전)", f"{int(progress * 100)}%", delta_color="off")
-                st.progress(progress)
+                c_p1, c_p2 = st.columns(2)
+                c_p1.metric("전체 진행률 (플루토 OK 전)", f"{int(m['percent'] * 100)}%", delta_color="off")
+                c_p2.metric("현재 단계", m['stage'])
+                st.progress(m['percent'])
+                if m['overdue']:
+                    with st.expander(f"⏰ 지연 단계 {len(m['overdue'])}건 (종료일 경과, 완료 체크 미완)"):
+                        for o in m['overdue']:
+                            st.write(f"- {o['task']} (종료: {o['end']}) · {o['flag']} 미완 {o['remaining']}개 단원")
                 st.markdown("### 🚦 단계별 상태")
                 
-                sorted_schedule = schedule_df.sort_values('시작일')
-                for _, row in sorted_schedule.iterrows():
-                    try:
-                        # [Fixed] Safe date comparison logic
-                        s_date = pd.to_datetime(row.get('시작일'), errors='coerce')
-                        e_date = pd.to_datetime(row.get('종료일'), errors='coerce')
-                        
-                        is_completed = False
-                        is_ongoing = False
-                        
-                        if pd.notnull(e_date):
-                            if e_date < today: is_completed = True
-                            elif pd.notnull(s_date) and s_date <= today <= e_date: is_ongoing = True
-                        
-                        status = "✅ 완료" if is_completed else ("🏃 진행중" if is_ongoing else "⚪ 대기")
-                        if str(row['구분']).startswith("🔴"):
-                             st.error(f"**{status}** | **{str(row['구분']).replace('🔴 ','')}** ({row['시작일']} ~ {row['종료일']})")
-                        else:
-                             st.write(f"**{status}** | {row['구분']} ({row['시작일']} ~ {row['종료일']})")
-                    except: continue
+                sts = m['statuses']
+                for name, status, s_date, e_date in zip(sts['구분'].astype(str), sts['상태'], sts['시작일'], sts['종료일']):
+                    if name.startswith("🔴"):
+                         st.error(f"**{status}** | **{name.replace('🔴 ','')}** ({s_date} ~ {e_date})")
+                    else:
+                         st.write(f"**{status}** | {name} ({s_date} ~ {e_date})")
             else: st.info("등록된 일정이 없습니다.")
 
     # ==========================================
@@ -1497,12 +1331,18 @@ else:
         tab_report, tab_settle = st.tabs(["결과보고서", "정산"])
         
         with tab_report:
-            st.markdown("##### 📎 필수 서류 구비 체크리스트")
-            checklist_df = current_p.get('report_checklist', pd.DataFrame())
-            edited_checklist = st.data_editor(checklist_df, hide_index=True, num_rows="fixed", key="report_checklist_editor")
-            if not edited_checklist.equals(checklist_df):
-                update_current_project_data('report_checklist', edited_checklist)
-                st.rerun()
+            # [Fragment] 체크리스트 편집은 이 조각만 다시 실행
+            @st.fragment
+            def report_checklist(pid):
+                current_p = st.session_state['projects'].checkout(pid)
+                st.markdown("##### 📎 필수 서류 구비 체크리스트")
+                checklist_df = current_p.get('report_checklist', pd.DataFrame())
+                edited_checklist = st.data_editor(checklist_df, hide_index=True, num_rows="fixed", key="report_checklist_editor")
+                if not edited_checklist.equals(checklist_df):
+                    current_p['report_checklist'] = edited_checklist
+                    sync_save_status(rerun=True)
+
+            report_checklist(current_p['id'])
 
         with tab_settle:
             st.subheader("1. 기준 단가 설정")
@@ -1545,231 +1385,93 @@ else:
                     update_current_project_data('review_standards', edited_rev_std); st.rerun()
 
             st.markdown("---")
-            st.subheader("2. 정산 내역서")
-
-            # [Logic] Auto Mode (Updated)
-            def generate_auto_data():
-                plan_df = current_p.get('planning_data', pd.DataFrame())
-                dev_df = current_p.get('dev_data', pd.DataFrame())
+            # [Fragment] 정산 내역(자동 산출/직접 입력 버튼, 집필/검토 표, 합계)은 이 조각만 다시 실행
+            # 기준 단가가 바뀌면 위 편집기가 앱 전체를 다시 실행하므로 여기서 다시 연동됨
+            @st.fragment
+            def settlement_panel(pid):
+                current_p = st.session_state['projects'].checkout(pid)
+                st.subheader("2. 정산 내역서")
+
+                # [Derived] 자동 산출 내역이면 기획/개발 현황/기준 단가 변경분을 단원 단위로 반영 (수동 보정 유지)
+                settlement.refresh(current_p)
+
+                col_b1, col_b2, col_dummy = st.columns([1, 1, 3])
+                with col_b1:
+                    if st.button("🔄 자동 산출 (데이터 연동)", type="primary", help="수동으로 고친 내용은 초기화됩니다. 이후 기획/배정 변경은 자동 반영"):
+                        with profiling.span("settlement.generate"):
+                            settlement.reset(current_p)
+                        sync_save_status(rerun=True)
+                with col_b2:
+                    if st.button("📝 직접 입력 (초기화)", type="secondary"):
+                        current_p['settlement_overrides'] = {}
+                        current_p['settlement_list'] = [
+                            {"구분": "집필", "이름": "", "내용": "", "지급기준": "쪽당", "수량": 0, "집필단가": 0, "검토단가": 0, "비고": ""},
+                            {"구분": "검토", "이름": "", "내용": "", "지급기준": "쪽당", "수량": 0, "단가": 0, "비고": ""}
+                        ]
+                        sync_save_status(rerun=True)
+                if settlement.is_auto(current_p['settlement_list']):
+                    n_override = len(current_p.get('settlement_overrides') or {})
+                    st.caption(f"🔗 자동 산출 연동 중 (수동 보정 {n_override}건 유지)")
+
+                # 정산 내역 표 (공급가액 포함)는 내역이 바뀔 때만 다시 만듦
+                settle_df = settlement.frame(current_p)
+                is_write = settle_df['구분'] == '집필'
+                is_review = settle_df['구분'] == '검토'
+
+                st.markdown("#### ✍️ 집필료 정산 내역")
+                write_df = settle_df[is_write].drop(columns=['_rank']).reset_index(drop=True)
+                if write_df.empty: write_df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "집필단가", "검토단가", "공급가액", "비고", settlement.KEY])
                 
-                if not plan_df.empty:
-                    if '쪽수' not in plan_df.columns: plan_df['쪽수'] = 0
-                    if '문항수' not in plan_df.columns: plan_df['문항수'] = 0
-                    plan_df['쪽수_calc'] = pd.to_numeric(plan_df['쪽수'], errors='coerce').fillna(0.0)
-                    plan_df['문항수_calc'] = pd.to_numeric(plan_df['문항수'], errors='coerce').fillna(0.0)
-                
-                new_rows = []
-                auth_std = current_p['author_standards']
-                def get_auth_price(unit_type, price_type):
-                    try:
-                        row = auth_std[auth_std['구분'] == unit_type + "당"]
-                        if not row.empty:
-                            val = row.iloc[0][price_type]
-                            return int(val) if pd.notnull(val) else 0
-                    except: pass
-                    return 0
-
-                # Author Rows (Updated: Include both Writing & Review Fee)
-                if not plan_df.empty and '집필자' in plan_df.columns:
-                    auth_grouped = plan_df.groupby('집필자')[['쪽수_calc', '문항수_calc']].sum().reset_index()
-                    for _, row in auth_grouped.iterrows():
-                        name = row['집필자']
-                        if name in ['-', '', 'nan', 'None']: continue
-                        
-                        if row['쪽수_calc'] > 0:
-                            w_price = get_auth_price("쪽", "원고료")
-                            r_price = get_auth_price("쪽", "검토료")
-                            new_rows.append({
-                                "구분": "집필", 
-                                "이름": name, 
-                                "내용": "원고 집필 (쪽)", 
-                                "지급기준": "쪽당", 
-                                "수량": row['쪽수_calc'], 
-                                "집필단가": w_price, 
-                                "검토단가": r_price, 
-                                "비고": ""
-                            })
-                        if row['문항수_calc'] > 0:
-                            w_price = get_auth_price("문항", "원고료")
-                            r_price = get_auth_price("문항", "검토료")
-                            new_rows.append({
-                                "구분": "집필", 
-                                "이름": name, 
-                                "내용": "원고 집필 (문항)", 
-                                "지급기준": "문항당", 
-                                "수량": row['문항수_calc'], 
-                                "집필단가": w_price, 
-                                "검토단가": r_price, 
-                                "비고": ""
-                            })
-
-                # Reviewer Rows (Remains same logic)
-                if not dev_df.empty:
-                    unit_stats = {}
-                    if not plan_df.empty:
-                         for _, r in plan_df.iterrows():
-                            uname = f"[{r.get('분권','')}] {r.get('대단원','')} > {r.get('중단원','')}"
-                            unit_stats[uname] = {'page': r.get('쪽수_calc',0), 'item': r.get('문항수_calc',0)}
-                    
-                    rev_prices = {}
-                    for _, r in rev_std_df.iterrows():
-                        key = normalize_string(r['구분'])
-                        rev_prices[key] = {'name': r['구분'], 'p_page': r.get('단가(쪽)',0), 'p_item': r.get('단가(문항)',0)}
-
-                    reviewer_agg = {} 
-                    for _, row in dev_df.iterrows():
-                        uname = str(row.get('단원명',''))
-                        stats = unit_stats.get(uname, {'page':0, 'item':0})
-                        for col in dev_df.columns:
-                            c_clean = normalize_string(col)
-                            if c_clean in rev_prices:
-                                cell = str(row[col])
-                                if cell and cell not in ['-', '', 'nan', 'None']:
-                                    people = [x.strip() for x in cell.split(',')]
-                                    for p_name in people:
-                                        if not p_name: continue
-                                        key = (p_name, rev_prices[c_clean]['name'])
-                                        if key not in reviewer_agg: reviewer_agg[key] = {'page':0, 'item':0}
-                                        reviewer_agg[key]['page'] += stats['page']
-                                        reviewer_agg[key]['item'] += stats['item']
-
-                    for (r_name, r_role), stats in reviewer_agg.items():
-                        role_key = normalize_string(r_role)
-                        prices = rev_prices.get(role_key, {'p_page':0, 'p_item':0})
-                        if stats['page'] > 0:
-                            new_rows.append({"구분": "검토", "이름": r_name, "내용": f"{r_role} (쪽)", "지급기준": "쪽당", "수량": stats['page'], "단가": prices['p_page'], "비고": ""})
-                        if stats['item'] > 0:
-                             new_rows.append({"구분": "검토", "이름": r_name, "내용": f"{r_role} (문항)", "지급기준": "문항당", "수량": stats['item'], "단가": prices['p_item'], "비고": ""})
-                return new_rows
-
-            col_b1, col_b2, col_dummy = st.columns([1, 1, 3])
-            with col_b1:
-                if st.button("🔄 자동 산출 (데이터 연동)", type="primary"):
-                    new_data = generate_auto_data()
-                    current_p['settlement_list'] = new_data
-                    st.rerun()
-            with col_b2:
-                if st.button("📝 직접 입력 (초기화)", type="secondary"):
-                    current_p['settlement_list'] = [
-                        {"구분": "집필", "이름": "", "내용": "", "지급기준": "쪽당", "수량": 0, "집필단가": 0, "검토단가": 0, "비고": ""},
-                        {"구분": "검토", "이름": "", "내용": "", "지급기준": "쪽당", "수량": 0, "단가": 0, "비고": ""}
-                    ]
-                    st.rerun()
-
-            if 'settlement_list' not in current_p: current_p['settlement_list'] = []
-            settle_df = pd.DataFrame(current_p['settlement_list'])
-            if settle_df.empty: settle_df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "단가", "비고"])
-
-            # Ensure columns exist for Writing Fee
-            if '집필단가' not in settle_df.columns: settle_df['집필단가'] = 0
-            if '검토단가' not in settle_df.columns: settle_df['검토단가'] = 0
-
-            # Safe numeric conversion
-            settle_df['수량'] = safe_to_numeric(settle_df['수량'])
-            # Review fee uses '단가', Writing fee uses '집필단가' + '검토단가'
-            settle_df['단가'] = safe_to_numeric(settle_df['단가'])
-            settle_df['집필단가'] = safe_to_numeric(settle_df['집필단가'])
-            settle_df['검토단가'] = safe_to_numeric(settle_df['검토단가'])
-
-            # Calculate Price (Split logic based on type)
-            def calc_price(row):
-                if row['구분'] == '집필':
-                    return row['수량'] * (row['집필단가'] + row['검토단가'])
-                else:
-                    return row['수량'] * row['단가']
-            
-            settle_df['공급가액'] = settle_df.apply(calc_price, axis=1)
-
-            st.markdown("#### ✍️ 집필료 정산 내역")
-            write_df = settle_df[settle_df['구분'] == '집필'].reset_index(drop=True)
-            if write_df.empty: write_df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "집필단가", "검토단가", "공급가액", "비고"])
-            
-            # [Updated] Columns for Writing Fee
-            edited_write = st.data_editor(
-                write_df,
-                num_rows="dynamic",
-                column_order=["이름", "내용", "지급기준", "수량", "집필단가", "검토단가", "공급가액", "비고"],
-                column_config={
-                    "지급기준": st.column_config.SelectboxColumn("지급기준", options=["쪽당", "문항당", "건당(직접)", "식(직접)"]),
-                    "수량": st.column_config.NumberColumn(format="%.1f"),
-                    "집필단가": st.column_config.NumberColumn(label="집필단가(원)", format="%d원"),
-                    "검토단가": st.column_config.NumberColumn(label="검토단가(원)", format="%d원"),
-                    "공급가액": st.column_config.NumberColumn(format="%d원", disabled=True),
-                },
-                key="settlement_write_editor"
-            )
-
-            st.markdown("#### 🔍 검토료 정산 내역")
-            # [Updated] Sort review fees by role rank
-            review_df = settle_df[settle_df['구분'] == '검토'].reset_index(drop=True)
-            if not review_df.empty:
-                review_df['_rank'] = review_df['내용'].apply(get_sort_rank)
-                review_df = review_df.sort_values(by='_rank').drop(columns=['_rank']).reset_index(drop=True)
-
-            if review_df.empty: review_df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "단가", "공급가액", "비고"])
+                # [Updated] Columns for Writing Fee (출처 키 _key는 숨김 열로 유지)
+                edited_write = st.data_editor(
+                    write_df,
+                    num_rows="dynamic",
+                    column_order=["이름", "내용", "지급기준", "수량", "집필단가", "검토단가", "공급가액", "비고"],
+                    column_config={
+                        "지급기준": st.column_config.SelectboxColumn("지급기준", options=["쪽당", "문항당", "건당(직접)", "식(직접)"]),
+                        "수량": st.column_config.NumberColumn(format="%.1f"),
+                        "집필단가": st.column_config.NumberColumn(label="집필단가(원)", format="%d원"),
+                        "검토단가": st.column_config.NumberColumn(label="검토단가(원)", format="%d원"),
+                        "공급가액": st.column_config.NumberColumn(format="%d원", disabled=True),
+                    },
+                    key="settlement_write_editor"
+                )
 
-            edited_review = st.data_editor(
-                review_df,
-                num_rows="dynamic",
-                column_order=["이름", "내용", "지급기준", "수량", "단가", "공급가액", "비고"],
-                column_config={
-                    "지급기준": st.column_config.SelectboxColumn("지급기준", options=["쪽당", "문항당", "건당(직접)", "식(직접)"]),
-                    "수량": st.column_config.NumberColumn(format="%.1f"),
-                    "단가": st.column_config.NumberColumn(format="%d원"),
-                    "공급가액": st.column_config.NumberColumn(format="%d원", disabled=True),
-                },
-                key="settlement_review_editor"
-            )
+                st.markdown("#### 🔍 검토료 정산 내역")
+                # [Updated] Sort review fees by role rank
+                review_df = settle_df[is_review].sort_values(by='_rank', kind='stable').drop(columns=['_rank']).reset_index(drop=True)
+                if review_df.empty: review_df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "단가", "공급가액", "비고", settlement.KEY])
 
-            # Sync Logic
-            if not edited_write.empty:
-                edited_write['수량'] = safe_to_numeric(edited_write['수량'])
-                edited_write['집필단가'] = safe_to_numeric(edited_write['집필단가'])
-                edited_write['검토단가'] = safe_to_numeric(edited_write['검토단가'])
-                edited_write['공급가액'] = edited_write['수량'] * (edited_write['집필단가'] + edited_write['검토단가'])
-            
-            if not edited_review.empty:
-                edited_review['수량'] = safe_to_numeric(edited_review['수량'])
-                edited_review['단가'] = safe_to_numeric(edited_review['단가'])
-                edited_review['공급가액'] = edited_review['수량'] * edited_review['단가']
-
-            if not edited_write.equals(write_df) or not edited_review.equals(review_df):
-                edited_write['구분'] = '집필'
-                edited_review['구분'] = '검토'
-                
-                # Consolidate Columns
-                # Writing fee rows need '단가' to be 0 or sum? Let's just keep '집필단가','검토단가'
-                # Review fee rows need '집필단가'=0, '검토단가'=0
-                
-                for c in ["집필단가", "검토단가"]:
-                    if c not in edited_review.columns: edited_review[c] = 0
-                if "단가" not in edited_write.columns: edited_write["단가"] = 0
+                edited_review = st.data_editor(
+                    review_df,
+                    num_rows="dynamic",
+                    column_order=["이름", "내용", "지급기준", "수량", "단가", "공급가액", "비고"],
+                    column_config={
+                        "지급기준": st.column_config.SelectboxColumn("지급기준", options=["쪽당", "문항당", "건당(직접)", "식(직접)"]),
+                        "수량": st.column_config.NumberColumn(format="%.1f"),
+                        "단가": st.column_config.NumberColumn(format="%d원"),
+                        "공급가액": st.column_config.NumberColumn(format="%d원", disabled=True),
+                    },
+                    key="settlement_review_editor"
+                )
 
-                cols_common = ["구분", "이름", "내용", "지급기준", "수량", "비고", "공급가액", "단가", "집필단가", "검토단가"]
+                # Sync Logic: 자동 산출 행의 수정은 보정(settlement_overrides)으로, 나머지는 직접 입력 행으로 저장
+                if not edited_write.equals(write_df) or not edited_review.equals(review_df):
+                    edited_write['구분'] = '집필'
+                    edited_review['구분'] = '검토'
+                    other_rows = settle_df[~(is_write | is_review)].drop(columns=['_rank']).to_dict('records')
+                    settlement.record_edits(current_p, edited_write.to_dict('records') + edited_review.to_dict('records') + other_rows)
+                    sync_save_status(rerun=True)
                 
-                # Align columns
-                for df in [edited_write, edited_review]:
-                    for c in cols_common:
-                        if c not in df.columns: df[c] = 0
-
-                final_df = pd.concat([edited_write[cols_common], edited_review[cols_common]], ignore_index=True)
-                other_df = settle_df[~settle_df['구분'].isin(['집필', '검토'])]
+                total_write = settle_df.loc[is_write, '공급가액'].sum()
+                total_review = settle_df.loc[is_review, '공급가액'].sum()
                 
-                if not other_df.empty:
-                    for c in cols_common:
-                        if c not in other_df.columns: other_df[c] = 0
-                    final_df = pd.concat([final_df, other_df[cols_common]], ignore_index=True)
+                c_t1, c_t2, c_t3 = st.columns(3)
+                c_t1.metric("✍️ 집필료 합계", f"{int(total_write):,}원")
+                c_t2.metric("🔍 검토료 합계", f"{int(total_review):,}원")
+                c_t3.metric("💰 총 지급액 (공급가액)", f"{int(total_write + total_review):,}원")
 
-                current_p['settlement_list'] = final_df.to_dict('records')
-                st.rerun()
-            
-            total_write = edited_write['공급가액'].sum() if not edited_write.empty else 0
-            total_review = edited_review['공급가액'].sum() if not edited_review.empty else 0
-            
-            c_t1, c_t2, c_t3 = st.columns(3)
-            c_t1.metric("✍️ 집필료 합계", f"{int(total_write):,}원")
-            c_t2.metric("🔍 검토료 합계", f"{int(total_review):,}원")
-            c_t3.metric("💰 총 지급액 (공급가액)", f"{int(total_write + total_review):,}원")
+            settlement_panel(current_p['id'])
 
     # ==========================================
     # [6. 약정서 및 서약서] (Updated with 2-Step Selector)
@@ -1848,44 +1550,16 @@ else:
                 # Split View (좌: 자동 데이터 / 우: 입력 폼)
                 c_left, c_right = st.columns(2)
                 
-                # [Auto Data Logic]
-                settle_list = current_p.get('settlement_list', [])
-                est_fee = 0
-                for item in settle_list:
-                    if item.get('구분') == '검토' and item.get('이름') == target_name:
-                        # 정산 데이터 내역에 차수 정보가 포함된 경우 우선 매칭 (없으면 이름 합산)
-                        content = str(item.get('내용', ''))
-                        # [Fix] 정확한 문자열 포함 여부 체크 (Strict matching)
-                        if normalize_string(target_role) in normalize_string(content):
-                             qty = float(item.get('수량', 0))
-                             price = float(item.get('단가', 0))
-                             est_fee += (qty * price)
-
-                # 일정 계산 (Role 기반 필터링)
-                sch_df = current_p.get('schedule_data', pd.DataFrame())
-                est_period_str = "일정 미정"
-                s_date_default = datetime.today().date()
-                e_date_default = datetime.today().date()
-                
-                if not sch_df.empty:
-                    mask = sch_df['구분'].apply(lambda x: normalize_string(target_role) in normalize_string(x))
-                    role_sch = sch_df[mask]
-                    
-                    if not role_sch.empty:
-                        # [Fixed] Ensure dates are handled even if they are datetime64[ns]
-                        min_date = role_sch['시작일'].min()
-                        max_date = role_sch['종료일'].max()
-                        
-                        # Convert to date object if it's a timestamp
-                        if isinstance(min_date, pd.Timestamp): min_date = min_date.date()
-                        if isinstance(max_date, pd.Timestamp): max_date = max_date.date()
-
-                        if pd.notnull(min_date) and pd.notnull(max_date):
-                            est_period_str = f"{min_date} ~ {max_date}"
-                            s_date_default = min_date
-                            e_date_default = max_date
-                    else:
-                        est_period_str = "해당 차수 일정 없음"
+                # [Auto Data Logic] 정산 탭 금액 / 일정 탭 기간 추정 (contracts 모듈, 일괄 생성과 같은 규칙)
+                p_digests = st.session_state['projects'].shared_digests(current_p['id'])
+                est_fee = contracts.estimate_fee(current_p, target_name, target_role, p_digests)
+                est_period = contracts.estimate_period(current_p, target_role, p_digests)
+                s_date_default = e_date_default = datetime.today().date()
+                if est_period:
+                    s_date_default, e_date_default = est_period
+                    est_period_str = f"{s_date_default} ~ {e_date_default}"
+                else:
+                    est_period_str = "일정 미정" if current_p.get('schedule_data', pd.DataFrame()).empty else "해당 차수 일정 없음"
 
                 with c_left:
                     st.info(f"📊 **{selected_label}** 기준 데이터")
@@ -1897,7 +1571,6 @@ else:
                 with c_right:
                     st.success("✍️ 약정 내용 최종 확정")
                     
-                    if 'contract_status' not in current_p: current_p['contract_status'] = {}
                     saved_status = current_p['contract_status'].get(selected_label, {})
                     
                     final_fee = st.number_input("총 검토료 (수정 가능)", value=int(saved_status.get('final_fee', est_fee)), step=1000)
@@ -1933,7 +1606,7 @@ else:
 
                     with c_btn_s:
                         if st.button("🚀 서명 요청 링크 생성", type="primary", use_container_width=True):
-                            new_status_data = {
+                            new_status_data = ContractStatus.from_dict({
                                 "target_label": selected_label, 
                                 "name": target_name,
                                 "role": target_role,
@@ -1945,25 +1618,41 @@ else:
                                 "contract_date": contract_date,
                                 "dept_head": dept_head,
                                 "link_token": str(uuid.uuid4())[:8] 
-                            }
+                            })
                             current_p['contract_status'][selected_label] = new_status_data
                             st.toast(f"✅ {selected_label} 건에 대한 서명 요청 링크가 생성되었습니다!")
                             st.rerun()
 
+            # [Batch] 검토자 전원 약정서 DOCX 일괄 생성 (캐시된 서식 + 스레드 풀)
+            st.markdown("---")
+            st.markdown("#### 📦 약정서 일괄 생성 (DOCX)")
+            c_bt1, c_bt2 = st.columns([2, 1])
+            with c_bt1:
+                batch_scope = st.radio("대상", ["book", "year"], horizontal=True, key="contract_batch_scope",
+                                       format_func={"book": "현재 교재 검토자 전원", "year": f"{current_p['year']}년 전체 교재"}.get)
+            with c_bt2:
+                if st.button("📄 일괄 생성", use_container_width=True):
+                    targets = [current_p] if batch_scope == "book" else [p for p in st.session_state['projects'] if p['year'] == current_p['year']]
+                    buf = io.BytesIO()
+                    with st.spinner("약정서 생성 중..."):
+                        n_docs = contracts.render_batch(targets, buf, workers=min(8, (os.cpu_count() or 2)),
+                                                       digests=st.session_state['projects'].shared_digests)
+                    st.download_button(f"💾 다운로드 ({n_docs}부)", buf.getvalue(), file_name=f"검토약정서_{current_p['year']}_{current_p['title'] if batch_scope == 'book' else '전체'}.zip",
+                                       mime="application/zip", use_container_width=True)
+
             st.markdown("---")
             st.markdown("#### 📨 진행 상태 및 링크 확인")
             
             status_list = []
-            if 'contract_status' in current_p:
-                for label, info in current_p['contract_status'].items():
-                    link_url = f"https://ebs-contract-sign.com/view/{info.get('link_token')}" # Fake URL
-                    status_list.append({
-                        "대상 (차수-이름)": label,
-                        "상태": info.get('status'),
-                        "확정 검토료": f"{int(info.get('final_fee',0)):,}원",
-                        "위촉 기간": f"{info.get('start_date')}~{info.get('end_date')}",
-                        "서명 링크 (전송용)": link_url
-                    })
+            for label, info in current_p['contract_status'].items():
+                link_url = f"https://ebs-contract-sign.com/view/{info.get('link_token')}" # Fake URL
+                status_list.append({
+                    "대상 (차수-이름)": label,
+                    "상태": info.get('status'),
+                    "확정 검토료": f"{int(info.get('final_fee',0)):,}원",
+                    "위촉 기간": f"{info.get('start_date')}~{info.get('end_date')}",
+                    "서명 링크 (전송용)": link_url
+                })
             
             if status_list:
                 st.dataframe(pd.DataFrame(status_list), hide_index=True, use_container_width=True)
@@ -1973,4 +1662,19 @@ else:
         # 2. 집필 약정서 탭 (Placeholder)
         with tab_contract_auth:
             st.warning("⚠️ 집필 약정서 기능은 향후 데이터 구조 고도화 후 개발될 예정입니다.")
-            st.info("예정 기능: 인세/매절 구분, 공동 집필 배분율 설정 등")
\ No newline at end of file
+            st.info("예정 기능: 인세/매절 구분, 공동 집필 배분율 설정 등")
+
+# --- 11. 성능 계측 패널 ---
+menu_span.stop()
+if profiler is not None:
+    with st.sidebar.expander("⏱️ 성능 계측 (이번 실행)", expanded=False):
+        summary = profiler.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+        q = quota.default().snapshot()
+        st.caption(f"시트 요청 {q['sent']}회 (재시도 {q['retries']} · 실패 {q['failures']} · 합침 {q['coalesced']} · 속도 제한 대기 {q['throttled']}회/{q['throttle_wait_s']:.1f}s)")
+        trace_json = profiler.to_json()
+        st.download_button("⬇️ JSON 트레이스", data=trace_json.encode('utf-8'), file_name="rerun_trace.json", mime="application/json")
+    trace_dir = os.environ.get(profiling.PROFILE_DIR_ENV)
+    if trace_dir:
+        profiler.dump(trace_dir)
@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import sys
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import profiling
+from models import Project, migrate_project, migrate_projects
+
+# --- 전체 DB 백업 아카이브 (.ebsa) ---
+# zip 컨테이너(무압축) 안에 교재별 파일을 따로 압축해 넣고, 각 파일의 sha256을 manifest.json에 기록한다.
+#   manifest.json                   형식 버전, 생성 시각, 교재 목록과 파일별 {sha256, codec}
+#   manifest.sha256                 manifest.json 자체의 sha256
+#   manifest.sig                    manifest.json의 HMAC-SHA256 (EBS_ARCHIVE_KEY가 설정된 서버에서 만들 때)
+#   projects/<id>/info.pkl.z        표가 아닌 필드 (zlib pickle)
+#   projects/<id>/<필드>.pkl.z       DataFrame 필드 - 표마다 따로 (열 블록 그대로 pickle, dtype/index 보존)
+# parquet도 검토했으나 교재당 작은 표가 많아 파일당 오버헤드로 더 크고 느렸고, RangeIndex/dtype이 그대로 복원되지 않음.
+# 교재 단위로 독립적이므로 압축/해제와 검증을 스레드 풀에서 병렬로 처리한다 (zlib, sha256은 GIL 해제).
+# [Security] 표는 pickle이므로 가져오기 = 코드 실행 가능. sha256은 만든 사람이 계산하므로 출처를 증명하지 못함
+# -> 서버 키(EBS_ARCHIVE_KEY)로 manifest에 서명하고, key를 넘기면 서명이 맞는 아카이브만 해제한다
+#    (manifest에 파일별 sha256이 있으므로 manifest 서명으로 전체가 인증됨). 앱 화면 복원은 항상 서명 필수.
+# 실행: python -m archive export backup.ebsa | import backup.ebsa | verify backup.ebsa
+FORMAT = "ebs-archive"
+VERSION = 1
+MANIFEST = "manifest.json"
+MANIFEST_SUM = "manifest.sha256"
+MANIFEST_SIG = "manifest.sig"
+KEY_ENV = "EBS_ARCHIVE_KEY"
+LOCAL_DB = "book_project_data.pkl"
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def server_key():
+    key = os.environ.get(KEY_ENV)
+    return key.encode("utf-8") if key else None
+
+def _sign(body, key):
+    return hmac.new(key, body, hashlib.sha256).hexdigest()
+
+# --- 교재 한 권 <-> 파일 묶음 ---
+CODEC = "pkl.z"
+
+def _encode(value):
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+def _decode(codec, data):
+    if codec != CODEC: raise ArchiveError(f"알 수 없는 형식: {codec}")
+    return pickle.loads(zlib.decompress(data))
+
+def encode_project(p):
+    # 반환: [(파일 이름, codec, 바이트)]
+    files, info = [], {}
+    for key in p.keys():
+        value = p[key]
+        if isinstance(value, pd.DataFrame): files.append((key, CODEC, _encode(value)))
+        else: info[key] = value
+    files.append(("info", CODEC, _encode(info)))
+    return files
+
+def decode_project(files):
+    # files: {필드: (codec, 바이트)}
+    data = _decode(*files["info"])
+    for key, (codec, blob) in files.items():
+        if key != "info": data[key] = _decode(codec, blob)
+    return migrate_project(Project.from_dict(data))
+
+
+def _path(pid, name, codec):
+    return f"projects/{pid}/{name}.{codec}"
+
+
+# --- 내보내기 ---
+@profiling.timed("archive.export")
+def export_archive(projects, out, meta=None, workers=4, key=None):
+    # out: 경로 또는 바이너리 파일 객체, key: 서명 키 (없으면 서명 없이). 반환: manifest
+    projects = list(projects)
+    manifest = {
+        "format": FORMAT, "version": VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "rev": (meta or {}).get("rev"), "count": len(projects), "projects": [],
+    }
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+        for p, files in zip(projects, pool.map(encode_project, projects)):
+            entry = {"id": p['id'], "title": p['title'], "series": p['series'], "year": p['year'], "files": {}}
+            for name, codec, data in files:
+                zf.writestr(_path(p['id'], name, codec), data)
+                entry["files"][name] = {"codec": codec, "sha256": _sha256(data), "size": len(data)}
+            manifest["projects"].append(entry)
+        body = json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+        zf.writestr(MANIFEST, body)
+        zf.writestr(MANIFEST_SUM, _sha256(body))
+        if key: zf.writestr(MANIFEST_SIG, _sign(body, key))
+    return manifest
+
+
+# --- 가져오기 / 검증 ---
+def read_manifest(zf, key=None):
+    # key: 서명 키 - 주어지면 서명이 없거나 맞지 않는 아카이브는 ArchiveError (해제 전에 확인)
+    try:
+        body = zf.read(MANIFEST)
+        expected = zf.read(MANIFEST_SUM).decode("ascii").strip()
+    except KeyError as e:
+        raise ArchiveError(f"아카이브 구성 파일 없음: {e}")
+    if _sha256(body) != expected: raise ArchiveError("manifest 체크섬 불일치")
+    if key is not None:
+        try: sig = zf.read(MANIFEST_SIG).decode("ascii").strip()
+        except KeyError: raise ArchiveError("서명 없는 아카이브입니다 (이 서버에서 만든 백업만 복원 가능)")
+        if not hmac.compare_digest(sig, _sign(body, key)): raise ArchiveError("서명 불일치 - 이 서버에서 만든 백업이 아닙니다")
+    manifest = json.loads(body)
+    if manifest.get("format") != FORMAT: raise ArchiveError("EBS 백업 아카이브가 아닙니다")
+    if manifest.get("version", 0) > VERSION: raise ArchiveError(f"지원하지 않는 아카이브 버전: {manifest.get('version')}")
+    return manifest
+
+@profiling.timed("archive.import")
+def import_archive(src, workers=4, verify_only=False, key=None):
+    # src: 경로 또는 바이너리 파일 객체, key: 서명 키 (read_manifest 참고)
+    # 반환: (교재 목록, manifest) - 검증 실패 시 ArchiveError
+    # zip 읽기는 순서대로(파일 핸들 공유), 체크섬 검증과 해제/복원은 병렬
+    with zipfile.ZipFile(src) as zf:
+        manifest = read_manifest(zf, key)
+        names = set(zf.namelist())
+        raw = []
+        for entry in manifest["projects"]:
+            files = {}
+            for name, f in entry["files"].items():
+                path = _path(entry["id"], name, f["codec"])
+                if path not in names: raise ArchiveError(f"{entry['title']}: {name} 파일 없음")
+                files[name] = (f["codec"], zf.read(path))
+            raw.append((entry, files))
+
+    def restore(item):
+        entry, files = item
+        for name, f in entry["files"].items():
+            if _sha256(files[name][1]) != f["sha256"]: raise ArchiveError(f"{entry['title']}: {name} 체크섬 불일치")
+        return None if verify_only else decode_project(files)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        projects = list(pool.map(restore, raw))
+    if len(projects) != manifest.get("count", len(projects)): raise ArchiveError("교재 수 불일치")
+    return ([] if verify_only else projects), manifest
+
+
+# --- 명령행 ---
+def _load_local(path):
+    with open(path, "rb") as f:
+        return migrate_projects(pickle.load(f))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m archive", description="EBS 교재 DB 백업 아카이브")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="로컬 DB(pickle) -> 아카이브")
+    p_exp.add_argument("archive")
+    p_exp.add_argument("--db", default=LOCAL_DB)
+    p_imp = sub.add_parser("import", help="아카이브 -> 로컬 DB(pickle)")
+    p_imp.add_argument("archive")
+    p_imp.add_argument("--db", default=LOCAL_DB)
+    p_ver = sub.add_parser("verify", help="체크섬 검증만")
+    p_ver.add_argument("archive")
+    for p in (p_exp, p_imp, p_ver): p.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args(argv)
+
+    # 키가 설정돼 있으면 내보낼 때 서명, 가져올 때 서명 확인 (키 없이 가져오기는 직접 만든 파일에만 사용)
+    key = server_key()
+    t0 = datetime.now()
+    try:
+        if args.cmd == "export":
+            manifest = export_archive(_load_local(args.db), args.archive, workers=args.workers, key=key)
+            print(f"내보내기: 교재 {manifest['count']}권 -> {args.archive} ({os.path.getsize(args.archive) / 1024 / 1024:.1f} MB)")
+        elif args.cmd == "import":
+            projects, manifest = import_archive(args.archive, workers=args.workers, key=key)
+            tmp = args.db + ".tmp"
+            with open(tmp, "wb") as f: pickle.dump(projects, f)
+            os.replace(tmp, args.db)
+            print(f"가져오기: 교재 {len(projects)}권 -> {args.db} (백업 시각 {manifest['created_at']})")
+        else:
+            _, manifest = import_archive(args.archive, workers=args.workers, verify_only=True, key=key)
+            print(f"검증 완료: 교재 {manifest['count']}권, 체크섬 이상 없음")
+    except ArchiveError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 1
+    print(f"소요 시간: {(datetime.now() - t0).total_seconds():.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
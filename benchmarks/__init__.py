@@ -0,0 +1,3 @@
+# --- 성능 측정 도구 (합성 포트폴리오 기반) ---
+# 실행: python -m benchmarks.run --projects 100 --out bench_output.json
+# 부하 테스트: python -m benchmarks.loadtest --sessions 20 --iterations 3
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# --- 다중 세션 부하 테스트 (Streamlit AppTest, 가짜 구글 시트) ---
+# 실행: python -m benchmarks.loadtest --sessions 20 --iterations 3
+os.environ["EBS_SHEETS_BACKEND"] = "fake"
+
+import fake_sheets
+import history
+import quota
+import storage
+from benchmarks.synthetic import generate_portfolio
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+SHEET_NAME = "EBS_Book_DB"
+MENU_HOME = "교재 등록 및 관리(HOME)"
+MENU_SCHEDULE = "2. 개발 일정"
+MENU_SETTLE = "5. 결과보고서 및 정산"
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f: pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return None
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def timed(self, action, fn):
+        t0 = time.perf_counter()
+        try:
+            at = fn()
+            ok = at is None or not at.exception
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - t0
+        self.samples[action].append(elapsed)
+        if not ok: self.errors[action] += 1
+        return ok
+
+    def report(self):
+        out = {}
+        for action, xs in self.samples.items():
+            qs = statistics.quantiles(xs, n=100, method="inclusive") if len(xs) > 1 else [xs[0]] * 99
+            out[action] = {
+                "count": len(xs), "errors": self.errors.get(action, 0),
+                "p50_ms": qs[49] * 1000, "p90_ms": qs[89] * 1000, "p95_ms": qs[94] * 1000, "p99_ms": qs[98] * 1000,
+                "max_ms": max(xs) * 1000,
+            }
+        return out
+
+
+def _click(at, label, where="main"):
+    buttons = at.sidebar.button if where == "sidebar" else at.button
+    for b in buttons:
+        if label in b.label: return b.click().run()
+    # 버튼이 없으면(예: 바뀐 게 없어 저장 버튼이 '최신 상태'로 바뀜) 아무 일도 안 한 것 -> 오류로 집계
+    raise LookupError(f"버튼 없음: {label}")
+
+def _menu(at, name):
+    return at.sidebar.radio(key="main_menu").set_value(name).run()
+
+def session_flow(session_no, project_ids, iterations, recorder, timeout):
+    # 각 동작 후 yield -> 스케줄러가 다른 세션과 교차 실행
+    # project_ids: 이 세션이 여는 교재 - 이미 저장된 교재를 다시 열면 바뀐 게 없어 저장 버튼이 없음(오류로 집계)
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    recorder.timed("open_app", at.run)
+    yield
+    for pid in project_ids[:iterations]:
+        def open_book():
+            at.session_state['current_project_id'] = pid
+            at.session_state['selected_overview_id'] = pid
+            return _menu(at, MENU_HOME)
+        recorder.timed("open_book", open_book); yield
+        recorder.timed("open_schedule", lambda: _menu(at, MENU_SCHEDULE)); yield
+        recorder.timed("recalculate_schedule", lambda: _click(at, "전체 재계산", where="sidebar")); yield
+        recorder.timed("open_settlement", lambda: _menu(at, MENU_SETTLE)); yield
+        recorder.timed("run_settlement", lambda: _click(at, "자동 산출")); yield
+        recorder.timed("save", lambda: _click(at, "변경 사항 저장", where="sidebar")); yield
+
+def run_sessions(flows, rng):
+    # AppTest는 프로세스 전역 런타임을 사용하므로 스레드 대신 한 스레드에서 세션을 무작위 교차 실행
+    live = list(flows)
+    while live:
+        flow = rng.choice(live)
+        try: next(flow)
+        except StopIteration: live.remove(flow)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EBS 교재개발 관리 - 다중 세션 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=10, help="동시에 열린 세션 수")
+    parser.add_argument("--iterations", type=int, default=3, help="세션당 반복 흐름 수")
+    parser.add_argument("--projects", type=int, default=30, help="sessions x iterations 이상이어야 교재가 겹치지 않음")
+    parser.add_argument("--units", type=int, default=40)
+    parser.add_argument("--reviewers", type=int, default=6)
+    parser.add_argument("--timeout", type=float, default=120, help="스크립트 실행 1회 제한 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sheets", default="", help="가짜 시트 설정, 예: latency_ms=80,quota_per_minute=60")
+    parser.add_argument("--out", default="loadtest_output.json")
+    args = parser.parse_args(argv)
+
+    portfolio = generate_portfolio(args.projects, args.units, args.reviewers, seed=args.seed)
+    fake_sheets.reset()
+    sheet = fake_sheets.get_worksheet(SHEET_NAME, fake_sheets.FakeConfig())
+    storage.write_projects(sheet, portfolio)
+    sheet.config = fake_sheets.FakeConfig.from_spec(args.sheets)
+    project_ids = [p['id'] for p in portfolio]
+    del portfolio
+
+    # 합성 교재의 버전 기록이 실제 history/ 폴더에 남지 않게 임시 폴더 사용
+    history_dir = tempfile.mkdtemp(prefix="ebs_loadtest_history_")
+    prev_history_dir = os.environ.get(history.HISTORY_DIR_ENV)
+    os.environ[history.HISTORY_DIR_ENV] = history_dir
+    recorder = Recorder()
+    rss_before = rss_mb()
+    t0 = time.perf_counter()
+    try:
+        rng = random.Random(args.seed)
+        order = rng.sample(project_ids, len(project_ids))
+        books = [[order[(i + k * args.sessions) % len(order)] for k in range(args.iterations)] for i in range(args.sessions)]
+        flows = [session_flow(i, books[i], args.iterations, recorder, args.timeout) for i in range(args.sessions)]
+        run_sessions(flows, rng)
+    finally:
+        if prev_history_dir is None: os.environ.pop(history.HISTORY_DIR_ENV, None)
+        else: os.environ[history.HISTORY_DIR_ENV] = prev_history_dir
+        shutil.rmtree(history_dir, ignore_errors=True)
+    wall_s = time.perf_counter() - t0
+
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(), "params": vars(args), "wall_s": wall_s},
+        "sheets": sheet.stats,
+        "scheduler": quota.default().snapshot(),
+        "memory": {"rss_before_mb": rss_before, "rss_after_mb": rss_mb(), "peak_rss_mb": peak_rss_mb()},
+        "actions": recorder.report(),
+    }
+    for action, r in report["actions"].items():
+        print(f"{action:<22} n={r['count']:<4} err={r['errors']:<3} p50 {r['p50_ms']:9.1f} ms  p95 {r['p95_ms']:9.1f} ms  p99 {r['p99_ms']:9.1f} ms")
+    q = report["scheduler"]
+    print(f"시트 요청: {q['sent']}회 전송, 재시도 {q['retries']}, 실패 {q['failures']}, 합침 {q['coalesced']}, 속도 제한 {q['throttled']}회 ({q['throttle_wait_s']:.1f}s)")
+    print(f"메모리: RSS {report['memory']['rss_after_mb']:.1f} MB (peak {report['memory']['peak_rss_mb']:.1f} MB), 총 {wall_s:.1f}s")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+    return 1 if any(r['errors'] for r in report["actions"].values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import argparse
+import json
+import pickle
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import fake_sheets
+import settlement
+import storage
+from core import (
+    get_data_hash, recalculate_dates, get_notifications, auto_assign_reviewers,
+    create_ics_file, ensure_data_types,
+)
+from benchmarks.synthetic import generate_portfolio
+
+# --- 핵심 함수 벤치마크 ---
+def build_cases(portfolio, sheets_spec=""):
+    config = fake_sheets.FakeConfig.from_spec(sheets_spec)
+    sheet = fake_sheets.FakeWorksheet("bench", config)
+    storage.write_projects(sheet, portfolio)
+    # 범위 읽기용 시트는 따로: sheets.save가 같은 열을 다시 쓰면 layout의 체크섬이 맞지 않음
+    load_sheet = fake_sheets.FakeWorksheet("bench.load", config)
+    layout = storage.write_projects(load_sheet, portfolio)
+
+    def each(fn):
+        return lambda: [fn(p) for p in portfolio]
+
+    return {
+        "pickle.dumps": lambda: pickle.dumps(portfolio),
+        "get_data_hash": lambda: get_data_hash(portfolio),
+        "recalculate_dates": each(lambda p: recalculate_dates(p['schedule_data'].copy(), p['target_date_val'])),
+        "get_notifications": lambda: get_notifications(portfolio),
+        "auto_assign_reviewers": each(auto_assign_reviewers),
+        "settlement.reset": each(settlement.reset),      # 정산 자동 산출 (앱의 '자동 산출' 버튼)
+        "settlement.refresh": each(settlement.refresh),  # 편집 후 갱신 - 바뀐 게 없으면 비교만
+        "settlement.derive_rows": each(settlement.derive_rows),  # 두 번째 호출부터 바뀐 단원만 계산
+        "create_ics_file": each(lambda p: create_ics_file(ensure_data_types(p['schedule_data']), p['title'])),
+        "sheets.save": lambda: storage.write_projects(sheet, portfolio),
+        "sheets.load": lambda: storage.read_projects(sheet),  # 메타 없음 -> A열 전체 읽기
+        "sheets.load.batched": lambda: storage.read_projects(load_sheet, layout),
+    }
+
+def time_case(fn, repeat, warmup=1):
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples),
+    }
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, cur in results.items():
+        prev = baseline.get("results", {}).get(name)
+        if not prev: continue
+        ratio = cur['median_s'] / prev['median_s'] if prev['median_s'] else float('inf')
+        if ratio > threshold: regressions.append((name, prev['median_s'], cur['median_s'], ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EBS 교재개발 관리 - 합성 포트폴리오 벤치마크")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--units", type=int, default=40, help="교재당 배열표 단원 수")
+    parser.add_argument("--reviewers", type=int, default=6, help="교재당 검토자 수")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="실행할 케이스 이름")
+    parser.add_argument("--sheets", default="", help="가짜 시트 설정, 예: latency_ms=80,jitter_ms=40")
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--compare", help="이전 결과 JSON과 비교 (median 기준)")
+    parser.add_argument("--threshold", type=float, default=1.25, help="회귀 판정 배수")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    portfolio = generate_portfolio(args.projects, args.units, args.reviewers, seed=args.seed)
+    gen_s = time.perf_counter() - t0
+
+    results = {}
+    for name, fn in build_cases(portfolio, args.sheets).items():
+        if args.only and name not in args.only: continue
+        results[name] = time_case(fn, args.repeat)
+        print(f"{name:<24} median {results[name]['median_s'] * 1000:10.2f} ms")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "params": vars(args),
+            "generate_s": gen_s,
+            "payload_bytes": len(pickle.dumps(portfolio)),
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, prev, cur, ratio in regressions:
+            print(f"[회귀] {name}: {prev * 1000:.2f} ms -> {cur * 1000:.2f} ms (x{ratio:.2f})")
+        if regressions: return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
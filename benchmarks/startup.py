@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+# --- 콜드 스타트 측정 (새 프로세스에서 앱 첫 실행) ---
+# 실행: python -m benchmarks.startup --runs 5 --budget-ms 4000
+# 프로세스마다 (1) 앱이 쓰는 모듈 import 시간, (2) 가짜 시트로 HOME 첫 렌더까지의 시간을 재고,
+# 첫 화면에서 불필요한 무거운 의존성(구글 시트/엑셀/이미지)이 로드되었는지 확인한다.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["gspread", "oauth2client", "openpyxl", "PIL", "streamlit_drawable_canvas", "altair"]
+
+CHILD = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import streamlit, pandas
+t_base = time.perf_counter()
+import app_modules
+t_import = time.perf_counter()
+import fake_sheets, storage
+from benchmarks.synthetic import generate_portfolio
+storage.write_projects(fake_sheets.get_worksheet("EBS_Book_DB"), generate_portfolio({projects}, seed=0))
+from streamlit.testing.v1 import AppTest
+t_run0 = time.perf_counter()
+at = AppTest.from_file(os.path.join({root!r}, "app.py"), default_timeout=120)
+at.run()
+t_run = time.perf_counter()
+print(json.dumps({{
+    "base_ms": (t_base - t0) * 1000,
+    "modules_ms": (t_import - t_base) * 1000,
+    "first_run_ms": (t_run - t_run0) * 1000,
+    "error": str(at.exception[0].message) if at.exception else None,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+# 앱이 최상위에서 import 하는 자체 모듈 (HOME 첫 화면 기준)
+APP_MODULES = ["core", "models", "profiling", "storage", "concurrency", "fake_sheets", "quota", "store", "history",
+               "export", "contracts", "ledger", "settlement", "edits", "progress", "timeline", "archive"]
+
+
+def run_once(projects, workdir):
+    code = CHILD.replace("import app_modules", "import " + ", ".join(APP_MODULES)).format(root=ROOT, projects=projects, heavy=HEAVY)
+    env = dict(os.environ, EBS_SHEETS_BACKEND="fake", PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, timeout=300)
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if out.returncode or not lines: raise RuntimeError(out.stderr[-2000:])
+    return json.loads(lines[-1])
+
+def import_profile(top=10):
+    # python -X importtime 결과에서 누적 시간이 큰 최상위 모듈 (app.py와 같은 순서로 import)
+    code = "import streamlit, " + ", ".join(APP_MODULES)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=ROOT))
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        parts = line[len("import time:"):].split("|")
+        try: rows.append((int(parts[1]), parts[2][1:].rstrip()))  # 이름 앞 들여쓰기 = 중첩 import
+        except ValueError: continue
+    top_level = [(us, name) for us, name in rows if not name.startswith(" ")]
+    return [{"module": name, "cumulative_ms": us / 1000} for us, name in sorted(top_level, reverse=True)[:top]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EBS 교재개발 관리 - 콜드 스타트 측정")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--projects", type=int, default=50, help="가짜 시트에 넣을 합성 교재 수")
+    parser.add_argument("--budget-ms", type=float, default=4000, help="첫 화면(전체 import + 첫 실행) 허용 시간 중앙값")
+    parser.add_argument("--out", default="startup_output.json")
+    args = parser.parse_args(argv)
+
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:  # 로컬 백업 파일 등 작업 폴더 영향 배제
+        for i in range(args.runs):
+            s = run_once(args.projects, workdir)
+            if s["error"]: print(f"[오류] {s['error']}")
+            samples.append(s)
+            print(f"run {i + 1}: 기본 {s['base_ms']:.0f} ms, 앱 모듈 {s['modules_ms']:.0f} ms, 첫 실행 {s['first_run_ms']:.0f} ms, 로드된 무거운 모듈 {s['loaded'] or '-'}")
+
+    total = [s["base_ms"] + s["modules_ms"] + s["first_run_ms"] for s in samples]
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(), "python": sys.version.split()[0], "params": vars(args)},
+        "median_ms": {k: statistics.median(s[k] for s in samples) for k in ("base_ms", "modules_ms", "first_run_ms")},
+        "startup_median_ms": statistics.median(total),
+        "heavy_loaded": sorted({m for s in samples for m in s["loaded"]}),
+        "import_profile": import_profile(),
+        "samples": samples,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"시작 시간 중앙값 {report['startup_median_ms']:.0f} ms (예산 {args.budget_ms:.0f} ms)")
+    for row in report["import_profile"]: print(f"  {row['module']:<20} {row['cumulative_ms']:8.1f} ms")
+    print(f"결과 저장: {args.out}")
+    over = report["startup_median_ms"] > args.budget_ms
+    if over: print("[초과] 시작 시간 예산을 넘었습니다.")
+    if report["heavy_loaded"]: print(f"[주의] 첫 화면에서 로드된 모듈: {', '.join(report['heavy_loaded'])}")
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
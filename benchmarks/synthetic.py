@@ -0,0 +1,56 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+import pandas as pd
+
+from core import create_initial_schedule
+from models import Person, ensure_review_roles, new_project
+
+# --- 합성 포트폴리오 생성기 ---
+LEVELS = ["초등", "중학", "고교"]
+SUBJECTS = ["국어", "영어", "수학", "사회", "과학"]
+REVIEW_ROLES = ["1차외부검토", "2차외부검토", "3차외부검토", "편집검토"]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+
+def _person_name(rng):
+    return rng.choice(SURNAMES) + "".join(rng.choice("민서준우지현수연하윤도") for _ in range(2))
+
+def make_planning(rng, n_units, authors):
+    rows = []
+    n_big = max(1, n_units // 5)
+    for i in range(n_units):
+        big = i * n_big // n_units + 1
+        rows.append({
+            "분권": f"Book{1 + i // 40}", "구분": "", "대단원": f"{big}. 대단원{big}", "중단원": f"{i + 1}. 중단원{i + 1}",
+            "쪽수": rng.randint(2, 30), "문항수": rng.choice([0, rng.randint(5, 25)]), "집필자": rng.choice(authors), "비고": "",
+        })
+    return pd.DataFrame(rows)
+
+def make_project(rng, n_units=40, n_reviewers=6, n_authors=4, base_date=None):
+    base_date = base_date or date.today()
+    target = base_date + timedelta(days=rng.randint(-180, 365))
+    authors = [_person_name(rng) for _ in range(n_authors)]
+    p = new_project(
+        id=str(uuid.UUID(int=rng.getrandbits(128))), year=str(target.year), level=rng.choice(LEVELS),
+        subject=rng.choice(SUBJECTS), series=f"시리즈{rng.randint(1, 30)}", title=f"교재{rng.randint(1, 10**6)}",
+    )
+    p.schedule_data = create_initial_schedule(target)
+    p.target_date_val = pd.Timestamp(target)
+    p.planning_data = make_planning(rng, n_units, authors)
+    p.author_list = [Person(name=a, role="공동집필") for a in authors]
+    p.reviewer_list = [
+        Person(name=_person_name(rng), review_role=REVIEW_ROLES[i % len(REVIEW_ROLES)],
+               match_info=", ".join(rng.sample(authors, k=max(1, n_authors // 2))))
+        for i in range(n_reviewers)
+    ]
+    dev_df = pd.DataFrame({"단원명": [f"[{r['분권']}] {r['대단원']} > {r['중단원']}" for _, r in p.planning_data.iterrows()],
+                           "집필자": p.planning_data['집필자'].tolist()})
+    for col in ["집필완료", "검토완료", "피드백완료", "디자인완료"]: dev_df[col] = False
+    dev_df["비고"] = ""
+    p.dev_data = dev_df
+    return ensure_review_roles(p)
+
+def generate_portfolio(n_projects=50, n_units=40, n_reviewers=6, seed=0):
+    rng = random.Random(seed)
+    return [make_project(rng, n_units=n_units, n_reviewers=n_reviewers) for _ in range(n_projects)]
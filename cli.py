@@ -0,0 +1,208 @@
+import argparse
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+
+import concurrency
+import edits
+import fake_sheets
+import history
+import quota
+import settlement
+import storage
+import store
+from core import recalculate_dates, create_initial_schedule, create_ics_file, ensure_data_types, auto_assign_reviewers
+from models import migrate_projects
+
+# --- 일괄 작업 명령행 (야간 cron 등) ---
+# 화면에서 교재마다 누르던 작업을 선택한 교재 전체에 대해 병렬로 실행하고 한 번에 저장한다.
+#   recalc          일정 전체 재계산 (독립 일정 제외, 기준일 = 교재의 최종 플루토 OK 기준일)
+#   reset-schedule  기준일로 표준 일정 새로 생성 (--target 없으면 교재의 기준일)
+#   settle          자동 산출 정산 내역 갱신 (--reset: 수동 보정까지 초기화하고 다시 산출)
+#   assign          검토자 자동 배정 (초기화 후 재배정) + 정산 연동
+#   ics             일정 ICS 파일 내보내기 (--out 폴더)
+# 저장은 앱과 같은 리비전 비교 저장(concurrency.save_projects): 그 사이 다른 저장이 있으면 교재별로 병합.
+# 실행: python -m cli recalc --year 2026 --workers 8
+#       python -m cli ics --series 수능특강 --out ./ics
+#       python -m cli settle --all --db book_project_data.pkl --dry-run
+SHEET_NAME = "EBS_Book_DB"
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+KEY_FILE = "service_account.json"
+
+
+class CliError(Exception):
+    pass
+
+
+# --- 교재별 작업 (프로세스 풀에서 실행 -> 최상위 함수) ---
+# 반환: (교재, 결과 메시지) - ics는 교재 대신 파일 바이트
+def _recalc(p):
+    sch = p.get('schedule_data')
+    if sch is None or sch.empty: return p, "일정 없음 (건너뜀)"
+    p['schedule_data'] = recalculate_dates(ensure_data_types(sch), p.get('target_date_val') or datetime.today())
+    return p, f"{len(p['schedule_data'])}개 단계 재계산"
+
+def _reset_schedule(p, target=None):
+    target = target or p.get('target_date_val') or datetime.today()
+    p['schedule_data'] = create_initial_schedule(target)
+    p['target_date_val'] = target
+    return p, f"기준일 {pd.Timestamp(target).date()} 표준 일정 생성"
+
+def _settle(p, reset=False):
+    if reset:
+        settlement.reset(p)
+        return p, f"자동 산출 {len(p['settlement_list'])}행 (보정 초기화)"
+    if not settlement.is_auto(p.get('settlement_list') or []): return p, "직접 입력 내역 (건너뜀, --reset으로 자동 산출 전환)"
+    changed = settlement.refresh(p)
+    return p, "갱신" if changed else "변경 없음"
+
+def _assign(p):
+    cnt, changes = auto_assign_reviewers(p)
+    edits.commit(p, 'dev_data', changes, source="cli")  # 구독자(정산 연동) 호출
+    return p, f"{cnt}건 배정"
+
+def _ics(p):
+    sch = p.get('schedule_data')
+    if sch is None or sch.empty: return None, "일정 없음 (건너뜀)"
+    return create_ics_file(ensure_data_types(sch), p['title']), "ICS 생성"
+
+def _run_one(fn, p):
+    try:
+        return fn(p) + (None,)
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+def run(fn, projects, workers=1):
+    # 반환: [(결과, 메시지, 오류)] - 교재 순서 유지, 교재 하나의 실패가 나머지를 막지 않음
+    # 직접 실행할 때도 복사본에 적용 (원본은 저장 시 병합 기준)
+    if workers <= 1 or len(projects) <= 1: return [_run_one(fn, store.clone(p)) for p in projects]
+    with ProcessPoolExecutor(max_workers=min(workers, len(projects))) as pool:
+        return list(pool.map(partial(_run_one, fn), projects, chunksize=max(1, len(projects) // (workers * 4))))
+
+
+# --- 불러오기 / 저장 ---
+def connect():
+    # 앱과 같은 연결: EBS_SHEETS_BACKEND=fake 이면 가짜 시트, 아니면 service_account.json
+    if os.environ.get("EBS_SHEETS_BACKEND") == "fake":
+        return quota.wrap(fake_sheets.get_worksheet(SHEET_NAME))
+    if not os.path.exists(KEY_FILE): raise CliError(f"{KEY_FILE} 파일이 없습니다 (--db로 로컬 파일 지정 가능)")
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    creds = ServiceAccountCredentials.from_json_keyfile_name(KEY_FILE, SCOPE)
+    return quota.wrap(gspread.authorize(creds).open(SHEET_NAME).sheet1)
+
+def load(db=None):
+    # 반환: (교재 목록, 메타, 시트 - 로컬 파일이면 None)
+    if db:
+        with open(db, "rb") as f: return migrate_projects(pickle.load(f)), {}, None
+    sheet = connect()
+    meta = storage.read_meta(sheet)
+    return migrate_projects(storage.read_projects(sheet, meta)), meta, sheet
+
+def select(projects, ids=None, year=None, series=None, title=None, all_=False):
+    if not (ids or year or series or title or all_): raise CliError("대상 교재를 지정하세요 (--id/--year/--series/--title/--all)")
+    out = []
+    for p in projects:
+        if ids and p['id'] not in ids: continue
+        if year and str(p['year']) != str(year): continue
+        if series and series not in str(p['series']): continue
+        if title and title not in str(p['title']): continue
+        out.append(p)
+    return out
+
+def save(projects, base_projects, meta, sheet, db, note):
+    # 반환: 결과 설명 문자열
+    base = store.Snapshot(base_projects, meta, "sheet" if sheet else "local")
+    if not store.diff_ids(base, store.Snapshot(projects)): return "바뀐 내용 없음 (저장 생략)"
+    if sheet is None:
+        tmp = db + ".tmp"
+        with open(tmp, "wb") as f: pickle.dump(projects, f)
+        os.replace(tmp, db)
+        return f"{db} 저장"
+    result = concurrency.save_projects(sheet, projects, meta.get("stamp"), base.digests)
+    new = store.Snapshot(result.projects, result.meta)
+    try:
+        history.HistoryStore().record([new.index[pid] for pid in store.diff_ids(base, new) if pid in new.index], result.meta, note=note, base=base)
+    except OSError as e:
+        print(f"버전 기록 저장 실패: {e}", file=sys.stderr)
+    msg = f"구글 시트 저장 (rev {result.meta['rev']})"
+    if result.merged: msg += f", 다른 저장과 병합 (충돌 {len(result.conflicts)}건은 이 작업 결과 우선)"
+    return msg
+
+
+def _label(p):
+    return f"[{p['series']}] {p['title']} ({p['year']})"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cli", description="EBS 교재 일괄 작업")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    cmds = {
+        "recalc": sub.add_parser("recalc", help="일정 전체 재계산 (독립 일정 제외)"),
+        "reset-schedule": sub.add_parser("reset-schedule", help="표준 일정 새로 생성"),
+        "settle": sub.add_parser("settle", help="정산 내역 자동 산출 갱신"),
+        "assign": sub.add_parser("assign", help="검토자 자동 배정"),
+        "ics": sub.add_parser("ics", help="일정 ICS 파일 내보내기"),
+    }
+    cmds["reset-schedule"].add_argument("--target", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(), help="기준일 YYYY-MM-DD")
+    cmds["settle"].add_argument("--reset", action="store_true", help="수동 보정 초기화 후 다시 산출")
+    cmds["ics"].add_argument("--out", default="ics", help="ICS 파일을 쓸 폴더")
+    for p in cmds.values():
+        p.add_argument("--id", action="append", dest="ids", help="교재 id (여러 번 지정 가능)")
+        p.add_argument("--year")
+        p.add_argument("--series", help="시리즈명 일부")
+        p.add_argument("--title", help="교재명 일부")
+        p.add_argument("--all", action="store_true", dest="all_", help="전체 교재")
+        p.add_argument("--db", help="구글 시트 대신 로컬 DB(pickle) 파일")
+        p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        p.add_argument("--dry-run", action="store_true", help="실행만 하고 저장하지 않음")
+    args = parser.parse_args(argv)
+
+    ops = {
+        "recalc": _recalc,
+        "reset-schedule": partial(_reset_schedule, target=getattr(args, "target", None)),
+        "settle": partial(_settle, reset=getattr(args, "reset", False)),
+        "assign": _assign,
+        "ics": _ics,
+    }
+    t0 = datetime.now()
+    try:
+        projects, meta, sheet = load(args.db)
+        targets = select(projects, args.ids, args.year, args.series, args.title, args.all_)
+        if not targets: raise CliError("조건에 맞는 교재가 없습니다")
+        print(f"{args.cmd}: 교재 {len(targets)}권, 작업자 {min(args.workers, len(targets))}개")
+        results = run(ops[args.cmd], targets, args.workers)
+
+        failed, updated = 0, {}
+        for p, (value, msg, error) in zip(targets, results):
+            if error:
+                failed += 1
+                print(f"  ✗ {_label(p)}: {error}")
+                continue
+            print(f"  ✓ {_label(p)}: {msg}")
+            if args.cmd == "ics":
+                if value is None or args.dry_run: continue
+                os.makedirs(args.out, exist_ok=True)
+                path = os.path.join(args.out, f"{p['series']}_{p['title']}_Schedule.ics".replace(os.sep, "_"))
+                with open(path, "wb") as f: f.write(value)
+            else:
+                updated[p['id']] = value
+
+        if updated and not args.dry_run:
+            new_projects = [updated.get(p['id'], p) for p in projects]
+            print(save(new_projects, projects, meta, sheet, args.db, note=f"cli {args.cmd}"))
+        elif updated:
+            print("--dry-run: 저장하지 않음")
+    except (CliError, storage.RevisionConflict, storage.CorruptData) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 1
+    print(f"소요 시간: {(datetime.now() - t0).total_seconds():.2f}s" + (f", 실패 {failed}권" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
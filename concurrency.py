@@ -0,0 +1,101 @@
+import copy
+import hashlib
+import pickle
+
+import storage
+from models import migrate_projects
+
+# --- 동시 편집 지원 (낙관적 동시성 제어) ---
+# 로드 시점의 필드별 digest를 기준(base)으로 저장 직전 원격 데이터와 3-way 병합한다.
+
+def field_digest(value):
+    return hashlib.md5(pickle.dumps(value)).hexdigest()
+
+def project_digests(p):
+    return {key: field_digest(p[key]) for key in p.keys()}
+
+def snapshot_digests(projects):
+    return {p['id']: project_digests(p) for p in projects}
+
+
+def merge_projects(base, local, remote):
+    # base: {pid: {field: digest}}, local/remote: 프로젝트 리스트
+    # 반환: (병합 결과, 충돌 목록[{id, title, fields}]) - 같은 필드를 양쪽에서 바꾼 경우 로컬 우선
+    local_map = {p['id']: p for p in local}
+    remote_map = {p['id']: p for p in remote}
+    merged, conflicts = [], []
+
+    def changed(p, pid):
+        return project_digests(p) != base.get(pid)
+
+    for pid, r in remote_map.items():
+        l = local_map.get(pid)
+        if pid not in base:
+            merged.append(r)  # 다른 사용자가 새로 만든 교재
+            continue
+        if l is None:
+            # 로컬에서 삭제: 원격이 그 사이 수정되었으면 유지하고 충돌로 보고
+            if changed(r, pid):
+                merged.append(r)
+                conflicts.append({"id": pid, "title": r['title'], "fields": ["(삭제됨)"]})
+            continue
+        base_fields = base[pid]
+        l_dig, r_dig = project_digests(l), project_digests(r)
+        if l_dig == base_fields:
+            merged.append(r)
+            continue
+        if r_dig == base_fields:
+            merged.append(l)
+            continue
+        result = copy.copy(r)
+        clashed = []
+        for key in l.keys():
+            b, lv, rv = base_fields.get(key), l_dig.get(key), r_dig.get(key)
+            if lv == b: continue
+            if rv != b and rv != lv: clashed.append(key)
+            result[key] = l[key]
+        merged.append(result)
+        if clashed: conflicts.append({"id": pid, "title": l['title'], "fields": clashed})
+
+    for pid, l in local_map.items():
+        if pid in remote_map: continue
+        if pid not in base:
+            merged.append(l)  # 로컬에서 새로 만든 교재
+        elif changed(l, pid):
+            # 원격에서 삭제되었지만 로컬에서 수정한 교재는 유지
+            merged.append(l)
+            conflicts.append({"id": pid, "title": l['title'], "fields": ["(원격 삭제됨)"]})
+    return merged, conflicts
+
+
+class SaveResult:
+    __slots__ = ("projects", "meta", "merged", "conflicts")
+
+    def __init__(self, projects, meta, merged=False, conflicts=None):
+        self.projects = projects
+        self.meta = meta
+        self.merged = merged
+        self.conflicts = conflicts or []
+
+
+def save_projects(sheet, local, base_stamp, base_digests, attempts=3):
+    # compare-and-swap 저장, 원격이 바뀌었으면 병합 후 재시도
+    merged_any, all_conflicts = False, []
+    for _ in range(attempts):
+        try:
+            meta = storage.write_projects_cas(sheet, local, base_stamp)
+            return SaveResult(local, meta, merged_any, all_conflicts)
+        except storage.SaveInProgress:
+            raise
+        except storage.RevisionConflict as e:
+            remote_meta = e.args[0]
+            try:
+                remote = migrate_projects(storage.read_projects(sheet, remote_meta))
+            except storage.CorruptData:
+                continue  # 읽는 사이 그 열을 다음 저장이 덮어씀 -> 다시 저장 시도 (최신 메타로 다시 충돌)
+            local, conflicts = merge_projects(base_digests, local, remote)
+            all_conflicts.extend(conflicts)
+            merged_any = True
+            base_stamp = remote_meta.get("stamp")
+            base_digests = snapshot_digests(remote)
+    raise storage.RevisionConflict("다른 사용자의 저장이 계속 이어져 병합에 실패했습니다.")
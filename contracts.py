@@ -0,0 +1,256 @@
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+import profiling
+from core import normalize_string
+
+# --- 검토 약정서 일괄 생성 (DOCX) ---
+# 템플릿은 한 번만 파싱해 (고정 XML 조각, 필드 이름) 목록으로 캐시하고, 문서마다 값만 끼워 넣는다.
+# EBS_CONTRACT_TEMPLATE=경로.docx 로 실제 서식을 쓸 수 있다 (본문에 {{name}} 형식 자리표시자,
+# 자리표시자는 한 덩어리(run)로 입력되어 있어야 함). 지정하지 않으면 내장 서식 사용.
+TEMPLATE_ENV = "EBS_CONTRACT_TEMPLATE"
+_FIELD_RE = re.compile(r"\{\{(\w+)\}\}")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+# --- 내장 서식 (미리보기 팝업과 같은 내용) ---
+def _run(text, bold=False, size=None):
+    props = ("<w:b/>" if bold else "") + (f'<w:sz w:val="{size}"/>' if size else "")
+    return f'<w:r>{"<w:rPr>" + props + "</w:rPr>" if props else ""}<w:t xml:space="preserve">{text}</w:t></w:r>'
+
+def _para(*runs, align=None):
+    ppr = f'<w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else ""
+    return f"<w:p>{ppr}{''.join(runs)}</w:p>"
+
+def _table(rows):
+    border = "".join(f'<w:{side} w:val="single" w:sz="4" w:space="0" w:color="000000"/>' for side in ("top", "left", "bottom", "right", "insideH", "insideV"))
+    body = "".join(
+        "<w:tr>" + "".join(f'<w:tc><w:tcPr><w:tcW w:w="{w}" w:type="dxa"/></w:tcPr>{_para(_run(text, bold=bold))}</w:tc>' for text, w, bold in ((k, 2400, True), (v, 6600, False))) + "</w:tr>"
+        for k, v in rows
+    )
+    return f'<w:tbl><w:tblPr><w:tblW w:w="9000" w:type="dxa"/><w:tblBorders>{border}</w:tblBorders></w:tblPr>{body}</w:tbl>'
+
+def builtin_document_xml():
+    body = [
+        _para(_run("EBS 교재 검토 약정서", bold=True, size=36), align="center"),
+        _para(_run("한국교육방송공사(이하 “EBS”라 한다)는 "), _run("{{name}}", bold=True),
+              _run("(이하 “상대방”이라 한다)을/를 EBS 교재 검토자로 위촉하고 다음과 같이 약정한다.")),
+        _para(_run("제1조(검토위촉)", bold=True)),
+        _table([
+            ("검토 교재", "{{book_title}}"),
+            ("검토 차수", "{{role}}"),
+            ("검토료", "{{fee}} (원천세 및 부가세 포함)"),
+            ("위촉 기간", "{{period}}"),
+            ("특약 사항", "{{note}}"),
+        ]),
+        _para(_run("(제2조 ~ 제15조 표준 약관)")),
+        _para(_run("약정 체결일: {{date}}"), align="center"),
+        _para(_run("[EBS]", bold=True)),
+        _para(_run("주소: 경기도 고양시 일산동구 한류월드로 281")),
+        _para(_run("담당 부장: {{dept_head}} (인)")),
+        _para(_run("[상대방]", bold=True)),
+        _para(_run("성명: {{name}} (인)")),
+    ]
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {_W}><w:body>{"".join(body)}</w:body></w:document>'
+
+
+class Template:
+    # entries: docx 안의 나머지 파일(그대로 복사), parts: document.xml을 [고정, 필드, 고정, ...]으로 분할
+    __slots__ = ("entries", "parts")
+
+    def __init__(self, entries, document_xml):
+        self.entries = entries
+        self.parts = _FIELD_RE.split(document_xml)
+
+    def render_xml(self, values):
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = escape(str(values.get(parts[i], "")))
+        return "".join(parts)
+
+    def render(self, values):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in self.entries.items(): zf.writestr(name, data)
+            zf.writestr("word/document.xml", self.render_xml(values))
+        return buf.getvalue()
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def load_template(path=None):
+    # (경로, 수정 시각) 기준 캐시 -> 서식 파일이 바뀔 때만 다시 파싱
+    path = path or os.environ.get(TEMPLATE_ENV) or None
+    key = (path, os.path.getmtime(path) if path else None)
+    with _cache_lock:
+        if key not in _cache:
+            if path:
+                with zipfile.ZipFile(path) as zf:
+                    entries = {n: zf.read(n) for n in zf.namelist() if n != "word/document.xml"}
+                    doc = zf.read("word/document.xml").decode("utf-8")
+            else:
+                entries = {"[Content_Types].xml": _CONTENT_TYPES, "_rels/.rels": _RELS}
+                doc = builtin_document_xml()
+            _cache.clear()
+            _cache[key] = Template(entries, doc)
+        return _cache[key]
+
+
+# --- 약정 데이터 조회 인덱스 ---
+# 교재별로 (이름, 정규화된 차수) -> 검토료 합계, 정규화된 차수 -> (최소 시작일, 최대 종료일)을 한 번 만들어 재사용.
+# 정산/일정 내용의 digest가 키이므로 두 표가 바뀔 때만 다시 만든다.
+INDEX_CACHE_SIZE = 256
+
+def _norm(series):
+    return series.astype(str).str.replace(" ", "", regex=False).str.strip()
+
+def _as_date(v):
+    return v.date() if isinstance(v, pd.Timestamp) else v
+
+
+class ContractIndex:
+    __slots__ = ("fee_rows", "fees", "sch_roles", "sch_start", "sch_end", "has_schedule", "periods")
+
+    def __init__(self, settlement_list, schedule_df, roles=()):
+        # 정산: 검토 행만 이름별로 (정규화된 내용, 금액) 묶음
+        self.fee_rows, self.fees = {}, {}
+        df = pd.DataFrame(settlement_list or [])
+        if not df.empty and {'구분', '이름'} <= set(df.columns):
+            df = df[df['구분'] == '검토']
+            if not df.empty:
+                amount = (pd.to_numeric(df.get('수량', 0), errors='coerce').fillna(0).astype(float)
+                          * pd.to_numeric(df.get('단가', 0), errors='coerce').fillna(0).astype(float))
+                content = _norm(df['내용']) if '내용' in df.columns else pd.Series("", index=df.index)
+                for name, c, a in zip(df['이름'], content, amount):
+                    self.fee_rows.setdefault(name, []).append((c, a))
+        # 일정: 구분을 한 번만 정규화
+        self.has_schedule = schedule_df is not None and not schedule_df.empty
+        self.periods = {}
+        if self.has_schedule:
+            self.sch_roles = _norm(schedule_df['구분']).to_numpy()
+            self.sch_start = schedule_df['시작일'].to_numpy()
+            self.sch_end = schedule_df['종료일'].to_numpy()
+        for role in roles: self.period(role)
+
+    def fee(self, name, role):
+        # 기존 규칙과 동일: 이름 일치 + 내용에 차수 문자열 포함
+        key = (name, normalize_string(role))
+        if key not in self.fees:
+            self.fees[key] = sum(a for c, a in self.fee_rows.get(name, ()) if key[1] in c)
+        return self.fees[key]
+
+    def period(self, role):
+        # 반환: (시작일, 종료일) 또는 None(일정 없음)
+        r = normalize_string(role)
+        if r not in self.periods:
+            found = None
+            if self.has_schedule:
+                mask = [r in x for x in self.sch_roles]
+                if any(mask):
+                    starts = pd.Series(self.sch_start[mask])
+                    ends = pd.Series(self.sch_end[mask])
+                    min_date, max_date = _as_date(starts.min()), _as_date(ends.max())
+                    if not (pd.isnull(min_date) or pd.isnull(max_date)): found = (min_date, max_date)
+            self.periods[r] = found
+        return self.periods[r]
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+@profiling.timed("contracts.index")
+def contract_index(project, digests=None):
+    # 캐시 키: 공유본이면 스냅샷에 이미 있는 필드 digest (ProjectView.shared_digests),
+    # 세션 복사본이면 정산/일정 표 객체 자체 - 두 표는 편집할 때 새 객체로 교체되므로(제자리 수정 없음)
+    # 객체가 같으면 내용도 같다. 항목에 표를 함께 보관해 id가 다른 객체에 재사용되지 않게 한다.
+    sl, sch = project.get('settlement_list'), project.get('schedule_data')
+    if digests: key = (project['id'], digests.get('settlement_list'), digests.get('schedule_data'))
+    else: key = (project['id'], id(sl), id(sch))
+    with _index_lock:
+        hit = _index_cache.get(key)
+        if hit is not None and (digests or (hit[1] is sl and hit[2] is sch)):
+            _index_cache.move_to_end(key)
+            return hit[0]
+    roles = {r['검토차수'] for r in project.get('reviewer_list', [])}  # 기간 미리 계산용 (나머지 차수는 조회 시 계산)
+    idx = ContractIndex(sl, sch, roles)
+    with _index_lock:
+        _index_cache[key] = (idx, None, None) if digests else (idx, sl, sch)
+        while len(_index_cache) > INDEX_CACHE_SIZE: _index_cache.popitem(last=False)
+    return idx
+
+def estimate_fee(project, name, role, digests=None):
+    return contract_index(project, digests).fee(name, role)
+
+def estimate_period(project, role, digests=None):
+    return contract_index(project, digests).period(role)
+
+def contract_values(project, reviewer, index=None):
+    name, role = reviewer['이름'], reviewer['검토차수']
+    index = index or contract_index(project)
+    saved = project['contract_status'].get(f"[{role}] {name}") or {}
+    fee = saved.get('final_fee') if saved else index.fee(name, role)
+    period = (saved.get('start_date'), saved.get('end_date')) if saved and saved.get('start_date') else index.period(role)
+    contract_date = saved.get('contract_date') or datetime.today()
+    return {
+        "name": name, "book_title": project['title'], "role": role,
+        "fee": f"{int(fee or 0):,}원",
+        "period": f"{period[0]} ~ {period[1]}" if period else "일정 미정",
+        "note": saved.get('special_note', "해당 없음"),
+        "date": contract_date.strftime("%Y년 %m월 %d일"),
+        "dept_head": saved.get('dept_head', "교재개발부장"),
+    }
+
+
+def _safe(text):
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(text)).strip() or "_"
+
+def contract_jobs(projects, digests=None):
+    # (zip 안 경로, 값) 목록 - 검토자 한 명당 약정서 한 부. digests: 교재 id -> 필드 digest (없으면 None 반환)
+    seen = set()
+    for p in projects:
+        folder = _safe(f"{p['year']}_{p['series']}_{p['title']}")
+        index = contract_index(p, digests(p['id']) if digests else None)
+        for r in p.get('reviewer_list', []):
+            if not r['이름']: continue
+            base = f"{folder}/{_safe(r['검토차수'] or '미지정')}_{_safe(r['이름'])}_검토약정서"
+            path, n = base, 1
+            while path in seen:
+                n += 1
+                path = f"{base}_{n}"
+            seen.add(path)
+            yield f"{path}.docx", contract_values(p, r, index)
+
+@profiling.timed("contracts.batch")
+def render_batch(projects, out, workers=4, template=None, digests=None):
+    # 문서별 렌더링(압축 포함)은 스레드 풀에서, zip 기록은 순서대로. 반환: 생성한 문서 수
+    template = template or load_template()
+    jobs = list(contract_jobs(projects, digests))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+        for (path, _), data in zip(jobs, pool.map(lambda job: template.render(job[1]), jobs)):
+            zf.writestr(path, data)  # docx는 이미 압축되어 있으므로 STORED
+    return len(jobs)
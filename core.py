@@ -0,0 +1,250 @@
+import re
+import uuid
+import pickle
+import hashlib
+import pandas as pd
+from datetime import datetime, timedelta
+
+import profiling
+
+# --- 공통 유틸리티 (Streamlit 비의존) ---
+def normalize_string(s):
+    return str(s).replace(" ", "").strip()
+
+def clean_korean_date(date_str):
+    if pd.isna(date_str): return None
+    s = str(date_str)
+    s = re.sub(r'\s*\(.*?\)', '', s)
+    return s.strip()
+
+# [Safe Convert Helper]
+def safe_to_numeric(series):
+    return pd.to_numeric(series.astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+
+# [Helper] 정산 내역 정렬 순서 함수
+def get_sort_rank(content_str):
+    s = normalize_string(str(content_str))
+    if "1차" in s: return 1
+    if "2차" in s: return 2
+    if "3차" in s: return 3
+    if "편집" in s: return 4
+    if "감수" in s: return 5
+    return 99
+
+# --- 날짜/일정 유틸리티 ---
+def get_day_name(date_obj):
+    if pd.isnull(date_obj): return ""
+    try: return ["(월)", "(화)", "(수)", "(목)", "(금)", "(토)", "(일)"][date_obj.weekday()]
+    except: return ""
+
+def validate_email(email): return "@" in str(email)
+
+# [Fixed] NaT handling
+def get_schedule_date(project, keyword="플루토"):
+    df = project.get('schedule_data', pd.DataFrame())
+    if df.empty: return None
+    mask = df['구분'].astype(str).str.contains(keyword, na=False)
+    if mask.any():
+        try:
+            date_val = df.loc[mask, '종료일'].values[-1]
+            dt = pd.to_datetime(date_val, errors='coerce')
+            if pd.isna(dt): return None
+            return dt
+        except: return None
+    return None
+
+@profiling.timed("get_notifications")
+def get_notifications(projects):
+    notifications = []
+    today = datetime.now().date()
+    alert_window = 3 
+    for p in projects:
+        sch = p.get('schedule_data')
+        if sch is not None and not sch.empty:
+            for _, row in sch.iterrows():
+                try:
+                    end_date = pd.to_datetime(row['종료일']).date()
+                    if pd.notnull(end_date):
+                        days_left = (end_date - today).days
+                        if 0 <= days_left <= alert_window:
+                            notifications.append({
+                                "project": f"[{p['series']}] {p['title']}",
+                                "task": row['구분'],
+                                "date": end_date,
+                                "d_day": days_left
+                            })
+                except: continue
+    return notifications
+
+def create_ics_file(df, project_title):
+    ics_content = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//EBS 교재개발 관리 프로그램//Streamlit App//KO",
+        "X-WR-CALNAME:EBS " + project_title + " 개발 일정"
+    ]
+    for _, row in df.iterrows():
+        if pd.isnull(row['시작일']) or pd.isnull(row['종료일']): continue
+        try:
+            start_date = row['시작일'].strftime('%Y%m%d')
+            end_date = (pd.to_datetime(row['종료일']).date() + timedelta(days=1)).strftime('%Y%m%d')
+            ics_content.extend([
+                "BEGIN:VEVENT",
+                f"UID:{uuid.uuid4()}@ebs.co.kr",
+                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}",
+                f"DTSTART;VALUE=DATE:{start_date}",
+                f"DTEND;VALUE=DATE:{end_date}",
+                f"SUMMARY:{row['구분']}",
+                f"DESCRIPTION:{row['비고']}",
+                "END:VEVENT"
+            ])
+        except: continue
+    ics_content.append("END:VCALENDAR")
+    return "\n".join(ics_content).encode('utf-8')
+
+# --- 데이터 안전장치 함수 ---
+def ensure_data_types(df):
+    df = df.copy()
+    df = df.reset_index(drop=True)
+    df["시작일"] = pd.to_datetime(df["시작일"], errors='coerce').dt.date
+    df["종료일"] = pd.to_datetime(df["종료일"], errors='coerce').dt.date
+    df["소요 일수"] = pd.to_numeric(df["소요 일수"], errors='coerce').fillna(0).astype(int)
+    df["선택"] = df["선택"].astype(bool)
+    df["독립 일정"] = df["독립 일정"].astype(bool)
+    return df
+
+# --- 핵심 로직 (일정) ---
+@profiling.timed("recalculate_dates")
+def recalculate_dates(df, target_date_obj):
+    df["시작일"] = pd.to_datetime(df["시작일"])
+    df["종료일"] = pd.to_datetime(df["종료일"])
+    
+    anchor_mask = df["구분"].str.contains("최종 플루토 OK", na=False)
+    if not anchor_mask.any():
+        if len(df) > 0: anchor_idx = df.index[-1]
+        else: return ensure_data_types(df)
+    else: anchor_idx = df[anchor_mask].index[0]
+
+    current_end = pd.to_datetime(target_date_obj)
+    df.at[anchor_idx, "종료일"] = current_end
+    duration = int(df.at[anchor_idx, "소요 일수"]) 
+    df.at[anchor_idx, "시작일"] = current_end - timedelta(days=max(0, duration - 1))
+
+    # Backward
+    chain_link_date = df.at[anchor_idx, "시작일"]
+    for i in range(anchor_idx - 1, -1, -1):
+        if df.at[i, "독립 일정"]: continue 
+        current_end = chain_link_date - timedelta(days=1)
+        df.at[i, "종료일"] = current_end
+        duration = int(df.at[i, "소요 일수"])
+        current_start = current_end - timedelta(days=max(0, duration - 1))
+        df.at[i, "시작일"] = current_start
+        chain_link_date = current_start
+
+    # Forward
+    chain_link_date = df.at[anchor_idx, "종료일"]
+    for i in range(anchor_idx + 1, len(df)):
+        if df.at[i, "독립 일정"]: continue
+        current_start = chain_link_date + timedelta(days=1)
+        df.at[i, "시작일"] = current_start
+        duration = int(df.at[i, "소요 일수"])
+        current_end = current_start + timedelta(days=max(0, duration - 1))
+        df.at[i, "종료일"] = current_end
+        chain_link_date = current_end
+    return ensure_data_types(df)
+
+# 중요 키워드
+IMPORTANT_KEYWORDS = ["발주 회의", "집필 (본문 개발)", "1차 외부/교차 검토", "2차 외부/교차 검토", "3차 외부/교차 검토", "가쇄본 제작", "집필자 최종 검토", "내용 OK", "최종 플루토 OK", "플루토"]
+
+def create_initial_schedule(target_date_obj):
+    schedule_list = []
+    base_date = pd.to_datetime(target_date_obj)
+    current_end = base_date
+    
+    def add_row_backward(name, days, independent=False, note=""):
+        nonlocal current_end
+        display_name = name
+        if any(keyword in name for keyword in IMPORTANT_KEYWORDS): display_name = f"🔴 {name}"
+        start = current_end - timedelta(days=days - 1)
+        schedule_list.append({
+            "선택": False, "독립 일정": independent, "구분": display_name, "소요 일수": days, 
+            "시작일": start.date(), "종료일": current_end.date(), "비고": note
+        })
+        if not independent: current_end = start - timedelta(days=1)
+
+    add_row_backward("최종 플루토 OK", 2, note="★ 확정일 (기준)") 
+    add_row_backward("내용 OK", 3)
+    print_mtg_date = current_end - timedelta(days=14)
+    schedule_list.append({"선택": False, "독립 일정": True, "구분": "인쇄협의체 회의", "소요 일수": 1, "시작일": print_mtg_date.date(), "종료일": print_mtg_date.date(), "비고": "독립 일정"})
+    add_row_backward("최종 검토 반영", 7)
+    add_row_backward("집필자 최종 검토", 1)
+    add_row_backward("편집 검토", 7)
+    add_row_backward("가쇄본 제작", 3) 
+    for i in range(3, 0, -1):
+        add_row_backward(f"{i}차 조판 수정", 7)
+        add_row_backward(f"{i}차 집필자 반영", 7)
+        add_row_backward(f"{i}차 외부/교차 검토", 7) 
+    add_row_backward("1차 조판 및 편집", 40)
+    add_row_backward("  └ 최종 집필물 수령", 0, independent=True)
+    add_row_backward("  ├ 1차 집필물 수령", 0, independent=True)
+    add_row_backward("집필 (본문 개발)", 30) 
+    add_row_backward("발주 회의 및 계약", 1)
+    pre_steps = ["샘플 원고 작성", "발주회의 자료 제작", "집필자 섭외", "배열표 작성", "일정 확정", "기획안 확인"]
+    for name in pre_steps: add_row_backward(name, 1, independent=False, note="직접 입력")
+    schedule_list.reverse()
+    
+    pdf_start = base_date + timedelta(days=1)
+    pdf_end = pdf_start + timedelta(days=3 - 1)
+    schedule_list.append({"선택": False, "독립 일정": False, "구분": "최종 PDF 수령", "소요 일수": 3, "시작일": pdf_start.date(), "종료일": pdf_end.date(), "비고": "OK 이후 진행"})
+    report_date = base_date + timedelta(days=30)
+    schedule_list.append({"선택": False, "독립 일정": False, "구분": "📝 개발완료보고서 작성", "소요 일수": 1, "시작일": report_date.date(), "종료일": report_date.date(), "비고": "기준일 + 1개월 내"})
+    settlement_date = base_date + timedelta(days=90)
+    schedule_list.append({"선택": False, "독립 일정": False, "구분": "💰 개발비 정산", "소요 일수": 0, "시작일": settlement_date.date(), "종료일": settlement_date.date(), "비고": "기준일 + 3개월 내"})
+    return pd.DataFrame(schedule_list).reset_index(drop=True)
+
+# [MD5 Hash Change Detection]
+def get_data_hash(data):
+    with profiling.span("get_data_hash") as sp:
+        payload = pickle.dumps(data)
+        sp.size = len(payload)
+        return hashlib.md5(payload).hexdigest()
+
+# --- 핵심 로직 (배정/정산) ---
+# [Logic] 검토자 자동 배정 (초기화 후 재배정), 배정 건수 반환
+@profiling.timed("auto_assign_reviewers")
+def auto_assign_reviewers(project):
+    # 반환: (배정 건수, 바뀐 칸 [(행 label, 열, 이전 값, 새 값)]) - 바뀐 칸은 편집 기록(edits.commit)용
+    dev_df = project['dev_data']
+    review_cols = [c for c in dev_df.columns if ("검토" in c or "감수" in c) and c not in ["검토상태", "검토완료"]]
+    before = dev_df[review_cols].copy()
+    for col in review_cols: dev_df[col] = "-"
+    
+    cnt = 0
+    for r in project['reviewer_list']:
+        match_targets = [t.strip() for t in str(r.get('매칭정보','')).split(',') if t.strip()]
+        role_col = normalize_string(r.get('검토차수'))
+        
+        if role_col in dev_df.columns and match_targets:
+            for idx, row in dev_df.iterrows():
+                unit_name = str(row['단원명'])
+                unit_match_exact = unit_name in match_targets
+                
+                unit_match_contains = False
+                for target in match_targets:
+                    if target in unit_name or unit_name in target:
+                        unit_match_contains = True
+                        break
+                
+                author_match = any(t == str(row['집필자']) for t in match_targets)
+                
+                if unit_match_exact or unit_match_contains or author_match:
+                    current_val = str(dev_df.at[idx, role_col])
+                    if current_val in ["-", "", "nan", "None"]: 
+                        dev_df.at[idx, role_col] = r['이름']; cnt += 1
+                    elif r['이름'] not in current_val: 
+                        dev_df.at[idx, role_col] = current_val + ", " + r['이름']; cnt += 1
+
+    project['dev_data'] = dev_df
+    changes = [(idx, col, before.at[idx, col], dev_df.at[idx, col])
+               for col in review_cols for idx in dev_df.index if str(before.at[idx, col]) != str(dev_df.at[idx, col])]
+    return cnt, changes
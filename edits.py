@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+# --- 표 편집기 변경분 적용 + 편집 기록 ---
+# st.data_editor의 위젯 상태(st.session_state[key])에는 입력 표 기준의 변경분만 들어 있다:
+#   {"edited_rows": {행 위치: {열: 값}}, "added_rows": [{열: 값}], "deleted_rows": [행 위치]}
+# 표 전체를 비교/update() 하지 않고 바뀐 칸만 원본 표에 반영한다.
+# 위젯 상태는 다음 실행에도 남아 있으므로 이미 반영한 변경분은 세션 상태에 기억해 두고 새 변경분만 적용
+# (그 사이 자동 배정 등으로 바뀐 값을 예전 편집 값으로 되돌리지 않음).
+# 반영한 변경은 편집 기록(journal)에 남기고, 표 이름별 구독자(정산 재계산 등)에게 알린다.
+JOURNAL_SIZE = 1000
+
+_journal = deque(maxlen=JOURNAL_SIZE)
+_subscribers = {}
+_lock = threading.Lock()
+_seq = 0
+
+
+def _applied_key(key):
+    return f"_{key}_applied"
+
+def _set_cell(df, label, col, value):
+    try:
+        df.at[label, col] = value
+    except (TypeError, ValueError):
+        df[col] = df[col].astype(object)  # 예: bool 열에 빈 값
+        df.at[label, col] = value
+
+def _same(a, b):
+    if a is None or b is None:
+        return (a is None or pd.isna(a)) and (b is None or pd.isna(b))
+    try:
+        return bool(a == b) or (pd.isna(a) and pd.isna(b))
+    except (TypeError, ValueError):
+        return False
+
+
+def consume(state, key, df, columns=None):
+    # 반환: (반영된 표, 변경 목록 [(행 label, 열, 이전 값, 새 값)])
+    # columns: 편집기에 보여준 열 (None이면 전체) - 추가 행은 이 열만 채운다
+    delta = state.get(key) or {}
+    applied = state.get(_applied_key(key)) or {}
+    current = {}
+    changes = []
+    labels = list(df.index)
+
+    for pos, cells in (delta.get("edited_rows") or {}).items():
+        pos = int(pos)
+        if pos >= len(labels): continue
+        for col, value in cells.items():
+            current[("e", pos, col)] = value
+            if col not in df.columns or applied.get(("e", pos, col), object()) == value: continue
+            old = df.at[labels[pos], col]
+            if _same(old, value): continue
+            _set_cell(df, labels[pos], col, value)
+            changes.append((labels[pos], col, old, value))
+
+    added = delta.get("added_rows") or []
+    new_rows = []
+    for i, row in enumerate(added):
+        current[("a", i)] = dict(row)
+        if applied.get(("a", i)) is not None: continue
+        new_rows.append({c: row.get(c) for c in (columns or df.columns)})
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+        changes.extend((None, c, None, v) for row in new_rows for c, v in row.items() if v is not None)
+
+    drop = []
+    for pos in delta.get("deleted_rows") or []:
+        current[("d", int(pos))] = True
+        if applied.get(("d", int(pos))) or int(pos) >= len(labels): continue
+        drop.append(labels[int(pos)])
+    if drop:
+        changes.extend((label, None, None, None) for label in drop)
+        df = df.drop(index=drop)
+
+    state[_applied_key(key)] = current  # 위젯 상태에서 사라진 항목은 잊음
+    return df, changes
+
+
+def commit(project, table, changes, source="editor"):
+    # 편집 기록 추가 + 구독자 호출. changes: [(행 label, 열, 이전 값, 새 값)] - 행 label이 None이면 추가된 행
+    global _seq
+    if not changes: return
+    now = time.time()
+    with _lock:
+        for label, col, old, new in changes:
+            _seq += 1
+            _journal.append({"seq": _seq, "pid": project['id'], "table": table, "row": label, "col": col,
+                             "old": old, "new": new, "source": source, "at": now})
+        subscribers = list(_subscribers.get(table, ()))
+    for fn in subscribers: fn(project, changes)
+
+
+def subscribe(table, fn):
+    # fn(project, changes) - 같은 함수는 한 번만 등록
+    with _lock:
+        fns = _subscribers.setdefault(table, [])
+        if fn not in fns: fns.append(fn)
+
+def since(seq=0, pid=None, table=None):
+    # seq 이후의 편집 기록 (가장 오래된 기록이 밀려났으면 남아 있는 것만)
+    with _lock:
+        return [e for e in _journal if e["seq"] > seq and (pid is None or e["pid"] == pid) and (table is None or e["table"] == table)]
+
+def last_seq():
+    with _lock: return _seq
@@ -0,0 +1,143 @@
+import csv
+import io
+import zipfile
+
+import pandas as pd
+
+import profiling
+from core import safe_to_numeric
+
+# --- 전체 교재 일괄 내보내기 (정산/일정/참여자) ---
+# 교재를 하나씩 표로 만들어 바로 기록하고 버리므로 메모리는 교재 한 권 분량만 사용한다.
+# 형식: CSV 묶음(zip) 또는 시트 여러 개짜리 XLSX (openpyxl write_only 모드)
+BOOK_COLUMNS = ["발행 연도", "학교급", "과목", "시리즈", "교재명"]
+SETTLEMENT_COLUMNS = BOOK_COLUMNS + ["구분", "이름", "내용", "지급기준", "수량", "단가", "집필단가", "검토단가", "공급가액", "비고"]
+SCHEDULE_COLUMNS = BOOK_COLUMNS + ["구분", "시작일", "종료일", "소요 일수", "독립 일정"]
+PARTICIPANT_COLUMNS = BOOK_COLUMNS + ["구분", "이름", "소속(담당자)", "역할/분야", "연락처", "이메일"]
+TOTAL_COLUMNS = ["이름", "구분", "교재 수", "공급가액"]
+
+
+def filter_projects(projects, years=None, levels=None, subjects=None):
+    for p in projects:
+        if years and p['year'] not in years: continue
+        if levels and p['level'] not in levels: continue
+        if subjects and p.get('subject', '-') not in subjects: continue
+        yield p
+
+def _book(p):
+    return [p['year'], p['level'], p.get('subject', '-'), p['series'], p['title']]
+
+
+# --- 교재 한 권 -> 행 ---
+def add_supply_amount(df):
+    # 정산 탭과 같은 규칙: 집필은 수량 x (집필단가 + 검토단가), 나머지는 수량 x 단가
+    for c in ["수량", "단가", "집필단가", "검토단가"]:
+        df[c] = safe_to_numeric(df[c]) if c in df.columns else 0
+    is_write = df['구분'] == '집필'
+    df['공급가액'] = df['수량'] * (df['집필단가'] + df['검토단가']).where(is_write, df['단가'])
+    return df
+
+def settlement_frame(p):
+    df = pd.DataFrame(p.get('settlement_list') or [])
+    if df.empty: return df
+    return add_supply_amount(df)
+
+def settlement_rows(p, totals=None):
+    df = settlement_frame(p)
+    if df.empty: return
+    book = _book(p)
+    cols = SETTLEMENT_COLUMNS[len(BOOK_COLUMNS):]
+    for c in cols:
+        if c not in df.columns: df[c] = ""
+    if totals is not None:
+        # 개인별 합계 누적 (이름 + 구분), 교재 수는 서로 다른 교재 기준
+        for (name, kind), amount in df[df['이름'].astype(str).str.strip() != ""].groupby(['이름', '구분'])['공급가액'].sum().items():
+            t = totals.setdefault((name, kind), {"books": set(), "amount": 0})
+            t["books"].add(p['id'])
+            t["amount"] += amount
+    for row in df[cols].itertuples(index=False):
+        yield book + list(row)
+
+def schedule_rows(p):
+    df = p.get('schedule_data')
+    if df is None or df.empty: return
+    book = _book(p)
+    cols = SCHEDULE_COLUMNS[len(BOOK_COLUMNS):]
+    df = df.reindex(columns=cols)
+    for c in ("시작일", "종료일"): df[c] = pd.to_datetime(df[c], errors='coerce').dt.date
+    for row in df.itertuples(index=False):
+        yield book + list(row)
+
+def participant_rows(p):
+    # 주민번호/계좌 등 개인정보는 내보내지 않음
+    book = _book(p)
+    for a in p.get('author_list', []):
+        yield book + ["집필", a['이름'], a['소속'], a['역할'], a['연락처'], a['이메일']]
+    for r in p.get('reviewer_list', []):
+        yield book + ["검토", r['이름'], r['소속'], r['검토차수'], r['연락처'], r['이메일']]
+    for c in p.get('partner_list', []):
+        field_ = c.get('분야', "")
+        if isinstance(field_, list): field_ = ", ".join(field_)
+        yield book + ["업체", c.get('업체명', ""), c.get('담당자', ""), field_, c.get('연락처', ""), c.get('이메일', "")]
+
+def total_rows(totals):
+    for (name, kind), t in sorted(totals.items(), key=lambda kv: (-kv[1]["amount"], kv[0])):
+        yield [name, kind, len(t["books"]), t["amount"]]
+
+
+def iter_sheets(projects):
+    # (시트 이름, 열, 행 generator) 순서대로. 개인별 합계는 정산 시트를 다 쓴 뒤에 확정된다
+    projects = list(projects)
+    totals = {}
+    yield "정산", SETTLEMENT_COLUMNS, (row for p in projects for row in settlement_rows(p, totals))
+    yield "일정", SCHEDULE_COLUMNS, (row for p in projects for row in schedule_rows(p))
+    yield "참여자", PARTICIPANT_COLUMNS, (row for p in projects for row in participant_rows(p))
+    yield "개인별 합계", TOTAL_COLUMNS, total_rows(totals)
+
+
+def _cell(v):
+    if v is None: return ""
+    try:
+        if pd.isna(v): return ""
+    except (TypeError, ValueError): pass
+    if hasattr(v, "item"): return v.item()  # numpy 스칼라
+    return v
+
+
+# --- 출력 형식 ---
+@profiling.timed("export.csv_zip")
+def write_csv_zip(projects, out):
+    # 시트마다 CSV 한 개, zip 항목에 행 단위로 바로 기록 (엑셀 한글 호환을 위해 utf-8-sig)
+    count = 0
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, columns, rows in iter_sheets(projects):
+            with zf.open(f"{name}.csv", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow([_cell(v) for v in row])
+                    count += 1
+    return count
+
+@profiling.timed("export.xlsx")
+def write_xlsx(projects, out):
+    from openpyxl import Workbook  # write_only: 행을 임시 파일로 흘려보내 메모리 일정
+    wb = Workbook(write_only=True)
+    count = 0
+    for name, columns, rows in iter_sheets(projects):
+        ws = wb.create_sheet(name)
+        ws.append(columns)
+        for row in rows:
+            ws.append([_cell(v) for v in row])
+            count += 1
+    wb.save(out)
+    return count
+
+FORMATS = {
+    "xlsx": (write_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "zip": (write_csv_zip, "application/zip"),
+}
+
+def export(projects, out, fmt="xlsx"):
+    writer, _ = FORMATS[fmt]
+    return writer(projects, out)
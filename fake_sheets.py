@@ -0,0 +1,289 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+
+# --- 로컬 구글 시트 대체 (오프라인 테스트/벤치마크용) ---
+# 앱이 사용하는 gspread Worksheet API 일부(col_values, get, update, clear, batch_*)를
+# 메모리 상에서 흉내낸다. 지연/쿼터 오류/요청 크기 제한을 설정할 수 있다.
+#   EBS_SHEETS_BACKEND=fake                      -> 프로세스 내 시트 사용
+#   EBS_FAKE_SHEETS="latency_ms=80,quota_per_minute=60"  -> 동작 설정
+#   EBS_FAKE_SHEETS_URL=http://127.0.0.1:8765    -> python -m fake_sheets 서버 사용
+_A1_RE = re.compile(r"^([A-Z]+)?(\d+)?$")
+
+def col_to_index(letters):
+    idx = 0
+    for ch in letters: idx = idx * 26 + (ord(ch) - ord('A') + 1)
+    return idx
+
+def parse_range(range_name):
+    # "A1", "A1:A10", "B:B" -> (row1, col1, row2, col2), 끝이 열린 경우 None
+    parts = range_name.split("!")[-1].upper().split(":")
+    bounds = []
+    for part in parts:
+        m = _A1_RE.match(part)
+        if not m: raise ValueError(f"잘못된 범위: {range_name}")
+        col = col_to_index(m.group(1)) if m.group(1) else None
+        row = int(m.group(2)) if m.group(2) else None
+        bounds.append((row, col))
+    (r1, c1), (r2, c2) = bounds[0], bounds[-1]
+    if len(bounds) == 1 and r1 is None: r2 = None
+    return (r1 or 1, c1 or 1, r2, c2)
+
+
+# [Error] gspread.exceptions.APIError 와 같은 속성(code, response.status_code)을 제공
+class _Response:
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.text = json.dumps({"error": {"code": status_code, "message": message}})
+
+    def json(self):
+        return json.loads(self.text)
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code}: {message}")
+        self.code = status_code
+        self.response = _Response(status_code, message)
+
+class QuotaExceeded(FakeAPIError):
+    def __init__(self, message="Quota exceeded for quota metric 'Requests per minute'"):
+        super().__init__(429, message)
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 0.0          # 요청당 고정 지연
+    jitter_ms: float = 0.0           # 추가 무작위 지연 (0 ~ jitter)
+    bandwidth_mbps: float = 0.0      # 요청(연결)당 응답 전송 속도 (0 = 무제한) - 큰 응답일수록 오래 걸림
+    quota_per_minute: int = 0        # 분당 허용 요청 수 (0 = 무제한)
+    error_rate: float = 0.0          # 무작위 503 발생 확률
+    max_cell_chars: int = 50000      # 셀당 최대 문자 수 (구글 시트 제한)
+    max_request_bytes: int = 0       # 쓰기 요청 1회 최대 크기 (0 = 무제한)
+    seed: int = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        kwargs = {}
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+            key, _, value = item.partition("=")
+            if key not in types: raise ValueError(f"알 수 없는 설정: {key}")
+            kwargs[key] = (int if types[key] in (int, "int") else float)(value)
+        return cls(**kwargs)
+
+
+class FakeWorksheet:
+    def __init__(self, title="Sheet1", config=None):
+        self.title = title
+        self.config = config or FakeConfig()
+        self.stats = {"requests": 0, "reads": 0, "writes": 0, "bytes_in": 0, "bytes_out": 0, "quota_errors": 0, "server_errors": 0}
+        self._cells = {}  # (row, col) -> str
+        self._lock = threading.RLock()
+        self._recent = deque()
+        self._rng = random.Random(self.config.seed)
+
+    # [Simulation] 지연, 쿼터, 무작위 오류
+    def _request(self, kind):
+        cfg = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[kind] += 1
+            now = time.monotonic()
+            if cfg.quota_per_minute:
+                while self._recent and now - self._recent[0] > 60: self._recent.popleft()
+                if len(self._recent) >= cfg.quota_per_minute:
+                    self.stats["quota_errors"] += 1
+                    raise QuotaExceeded()
+                self._recent.append(now)
+            if cfg.error_rate and self._rng.random() < cfg.error_rate:
+                self.stats["server_errors"] += 1
+                raise FakeAPIError(503, "The service is currently unavailable.")
+            delay = cfg.latency_ms + (self._rng.random() * cfg.jitter_ms if cfg.jitter_ms else 0)
+        if delay: time.sleep(delay / 1000)
+
+    def _transfer(self, rows):
+        if self.config.bandwidth_mbps:
+            time.sleep(sum(len(v) for row in rows for v in row) * 8 / (self.config.bandwidth_mbps * 1e6))
+        return rows
+
+    def _check_payload(self, values):
+        size = 0
+        for row in values or []:
+            for v in row:
+                n = len(str(v)) if v is not None else 0
+                if n > self.config.max_cell_chars:
+                    raise FakeAPIError(400, f"Your input contains more than the maximum of {self.config.max_cell_chars} characters in a single cell.")
+                size += n
+        if self.config.max_request_bytes and size > self.config.max_request_bytes:
+            raise FakeAPIError(413, "Request payload size exceeds the limit")
+        return size
+
+    def _max_row(self, col=None):
+        rows = [r for (r, c) in self._cells if col is None or c == col]
+        return max(rows) if rows else 0
+
+    def _read(self, range_name):
+        r1, c1, r2, c2 = parse_range(range_name)
+        r2 = r2 or self._max_row()
+        c2 = c2 or c1
+        rows = []
+        for r in range(r1, r2 + 1):
+            row = [self._cells.get((r, c), "") for c in range(c1, c2 + 1)]
+            while row and row[-1] == "": row.pop()
+            rows.append(row)
+        while rows and not rows[-1]: rows.pop()
+        self.stats["bytes_out"] += sum(len(v) for row in rows for v in row)
+        return rows
+
+    def _write(self, range_name, values):
+        r1, c1, _, _ = parse_range(range_name or "A1")
+        for i, row in enumerate(values or []):
+            for j, v in enumerate(row):
+                if v in ("", None): self._cells.pop((r1 + i, c1 + j), None)
+                else: self._cells[(r1 + i, c1 + j)] = str(v)
+
+    def _clear(self, range_name=None):
+        if range_name is None:
+            self._cells.clear()
+            return
+        r1, c1, r2, c2 = parse_range(range_name)
+        c2 = c2 or c1
+        for (r, c) in list(self._cells):
+            if r >= r1 and (r2 is None or r <= r2) and c1 <= c <= c2: del self._cells[(r, c)]
+
+    # --- gspread Worksheet 호환 API ---
+    def col_values(self, col):
+        self._request("reads")
+        with self._lock:
+            last = self._max_row(col)
+            values = [self._cells.get((r, col), "") for r in range(1, last + 1)]
+            self.stats["bytes_out"] += sum(len(v) for v in values)
+        self._transfer([values])
+        return values
+
+    def get(self, range_name):
+        self._request("reads")
+        with self._lock: rows = self._read(range_name)
+        return self._transfer(rows)
+
+    def batch_get(self, ranges):
+        self._request("reads")
+        with self._lock: results = [self._read(r) for r in ranges]
+        self._transfer([row for rows in results for row in rows])
+        return results
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._request("writes")
+        self.stats["bytes_in"] += self._check_payload(values)
+        with self._lock: self._write(range_name, values)
+        return {"updatedRange": range_name}
+
+    def batch_update(self, data, **kwargs):
+        self._request("writes")
+        self.stats["bytes_in"] += self._check_payload([v for d in data for v in d.get("values", [])])
+        with self._lock:
+            for d in data: self._write(d["range"], d["values"])
+        return {"totalUpdatedRanges": len(data)}
+
+    def clear(self):
+        self._request("writes")
+        with self._lock: self._clear()
+
+    def batch_clear(self, ranges):
+        self._request("writes")
+        with self._lock:
+            for r in ranges: self._clear(r)
+
+
+# --- 프로세스 내 레지스트리 ---
+_registry = {}
+_registry_lock = threading.Lock()
+
+def get_worksheet(name="EBS_Book_DB", config=None):
+    # 같은 프로세스의 모든 세션이 하나의 가짜 시트를 공유
+    url = os.environ.get("EBS_FAKE_SHEETS_URL")
+    if url: return RemoteWorksheet(url, name)
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = FakeWorksheet(name, config or FakeConfig.from_spec(os.environ.get("EBS_FAKE_SHEETS")))
+        elif config is not None:
+            _registry[name].config = config
+        return _registry[name]
+
+def reset():
+    with _registry_lock:
+        _registry.clear()
+
+
+# --- localhost 서버 / 클라이언트 (여러 프로세스에서 같은 가짜 시트 공유) ---
+_METHODS = {"col_values", "get", "batch_get", "update", "batch_update", "clear", "batch_clear"}
+
+class RemoteWorksheet:
+    def __init__(self, url, name="EBS_Book_DB"):
+        self.url = url.rstrip("/")
+        self.title = name
+
+    def _call(self, method, *args, **kwargs):
+        from urllib import request, error
+        body = json.dumps({"sheet": self.title, "method": method, "args": args, "kwargs": kwargs}).encode("utf-8")
+        req = request.Request(self.url + "/call", data=body, headers={"Content-Type": "application/json"})
+        try:
+            with request.urlopen(req) as resp: return json.loads(resp.read())["result"]
+        except error.HTTPError as e:
+            payload = json.loads(e.read() or b"{}").get("error", {})
+            raise (QuotaExceeded() if e.code == 429 else FakeAPIError(e.code, payload.get("message", str(e))))
+
+    def __getattr__(self, name):
+        if name not in _METHODS: raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+def serve(host="127.0.0.1", port=8765, config=None):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args): pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/stats": return self._reply(404, {"error": {"message": "not found"}})
+            with _registry_lock: self._reply(200, {name: ws.stats for name, ws in _registry.items()})
+
+        def do_POST(self):
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if req.get("method") not in _METHODS: return self._reply(400, {"error": {"message": "unsupported method"}})
+            ws = _local_worksheet(req.get("sheet", "EBS_Book_DB"), config)
+            try:
+                self._reply(200, {"result": getattr(ws, req["method"])(*req.get("args", []), **req.get("kwargs", {}))})
+            except FakeAPIError as e:
+                self._reply(e.code, e.response.json())
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    return server
+
+def _local_worksheet(name, config):
+    with _registry_lock:
+        if name not in _registry: _registry[name] = FakeWorksheet(name, config or FakeConfig())
+        return _registry[name]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="로컬 가짜 구글 시트 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", default=os.environ.get("EBS_FAKE_SHEETS", ""), help="예: latency_ms=80,quota_per_minute=60")
+    args = parser.parse_args()
+    httpd = serve(args.host, args.port, FakeConfig.from_spec(args.config))
+    print(f"fake sheets: http://{args.host}:{args.port} ({args.config or '기본 설정'})")
+    httpd.serve_forever()
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import pandas as pd
+
+import profiling
+from models import Project, migrate_project
+
+# --- 버전 기록 (내용 주소 기반 저장) ---
+# 교재마다 표(일정/기획/개발/정산) 단위로 pickle -> sha256 해시를 키로 objects/ 에 한 번만 저장하고,
+# 버전은 {표 이름: 해시} 매니페스트 한 줄로 남긴다. 바뀌지 않은 표는 이전 객체를 그대로 참조.
+#   history/objects/ab/cdef...   zlib 압축 pickle
+#   history/projects/<id>.jsonl  버전 매니페스트 (한 줄 = 한 버전)
+# 앱 프로세스 여러 개/명령행(cli.py)이 같은 폴더에 기록하므로 버전 번호는 매니페스트 파일을 잠근 채
+# 파일 내용에서 정한다 (프로세스별 캐시 없음). 중간에 끊긴 줄은 읽을 때 건너뛴다.
+HISTORY_DIR_ENV = "EBS_HISTORY_DIR"
+TABLES = {
+    "schedule_data": "일정",
+    "planning_data": "기획",
+    "dev_data": "개발 현황",
+    "settlement_list": "정산",
+}
+INFO = "info"  # 나머지 필드(기본 정보, 참여자, 단가 기준 등)를 묶은 객체
+
+_lock = threading.Lock()
+
+
+def default_dir():
+    return os.environ.get(HISTORY_DIR_ENV, "history")
+
+
+def _atomic_write(path, data, mode="wb"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp")
+    with os.fdopen(fd, mode) as f: f.write(data)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(path):
+    # 매니페스트 파일 배타 잠금 (다른 프로세스 포함). 반환: 읽기/추가용 파일 객체
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _parse(data):
+    # 끊긴 줄(기록 도중 종료 등)은 건너뜀
+    out = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        if not line.strip(): continue
+        try: out.append(json.loads(line))
+        except ValueError: continue
+    return out
+
+
+class HistoryStore:
+    def __init__(self, root=None):
+        self.root = root or default_dir()
+        self._diffs = {}  # 버전은 바뀌지 않으므로 비교 결과 캐시
+
+    # --- 객체 저장소 ---
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def put_object(self, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path): _atomic_write(path, zlib.compress(blob, 6))
+        return digest
+
+    def get_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
+
+    # --- 매니페스트 ---
+    def _manifest_path(self, pid):
+        return os.path.join(self.root, "projects", f"{pid}.jsonl")
+
+    def list_versions(self, pid):
+        path = self._manifest_path(pid)
+        if not os.path.exists(path): return []
+        with open(path, "rb") as f: return _parse(f.read())
+
+    def list_projects(self):
+        # 삭제된 교재도 기록이 남아 있으면 복원 가능
+        folder = os.path.join(self.root, "projects")
+        if not os.path.isdir(folder): return []
+        out = []
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".jsonl"): continue
+            versions = self.list_versions(name[:-6])
+            if versions: out.append(versions[-1])
+        return out
+
+    def _append(self, pid, make_entry):
+        # 잠금 -> 파일의 마지막 버전 확인 -> make_entry(마지막 매니페스트)가 돌려준 항목 추가 (None이면 건너뜀)
+        with _locked(self._manifest_path(pid)) as f:
+            f.seek(0)
+            data = f.read()
+            versions = _parse(data)
+            entry = make_entry(versions[-1] if versions else None)
+            if entry is None: return None
+            entry = {"version": max((v["version"] for v in versions), default=0) + 1, **entry}
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            if data and not data.endswith(b"\n"): line = "\n" + line  # 끊긴 줄 뒤에 붙지 않게
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            return entry
+
+    def _tables(self, p):
+        tables = {key: self.put_object(p[key]) for key in TABLES}
+        tables[INFO] = self.put_object({k: p[k] for k in p.keys() if k not in TABLES})
+        return tables
+
+    @profiling.timed("history.record")
+    def record(self, projects, meta=None, note="", base=None):
+        # 내용이 바뀐 교재만 새 버전 추가, 반환: 기록된 교재 수
+        # base: 저장 전 스냅샷 - 기록이 없는 교재는 저장 전 상태를 먼저 남겨 첫 수정도 되돌릴 수 있게 함
+        meta = meta or {}
+        saved_at = datetime.now().isoformat(timespec="seconds")
+        written = 0
+        with _lock:
+            for p in projects:
+                queue = []
+                if base is not None and p['id'] in base.index and not self.list_versions(p['id']):
+                    queue.append((base.index[p['id']], {"rev": base.rev}, "저장 전 상태", True))
+                queue.append((p, meta, note, False))
+                for q, q_meta, q_note, first_only in queue:
+                    tables = self._tables(q)  # 객체는 내용 주소라 잠금 밖에서 써도 안전
+
+                    def make_entry(last):
+                        if first_only and last is not None: return None  # 그 사이 다른 기록이 먼저 남김
+                        if last and last["tables"] == tables: return None
+                        return {"id": q['id'], "title": q['title'], "series": q['series'],
+                                "saved_at": saved_at, "rev": q_meta.get("rev"), "note": q_note, "tables": tables}
+
+                    if self._append(q['id'], make_entry) is not None and not first_only: written += 1
+        return written
+
+    def _entry(self, pid, version):
+        for entry in self.list_versions(pid):
+            if entry["version"] == version: return entry
+        raise KeyError(f"{pid} 버전 {version} 없음")
+
+    def load_version(self, pid, version):
+        entry = self._entry(pid, version)
+        data = dict(self.get_object(entry["tables"][INFO]))
+        for key in TABLES: data[key] = self.get_object(entry["tables"][key])
+        return migrate_project(Project.from_dict(data))
+
+    def diff_versions(self, pid, old_version, new_version):
+        key = (pid, old_version, new_version)
+        if key not in self._diffs: self._diffs[key] = self._diff(pid, old_version, new_version)
+        return self._diffs[key]
+
+    def _diff(self, pid, old_version, new_version):
+        old, new = self._entry(pid, old_version)["tables"], self._entry(pid, new_version)["tables"]
+        changes = []
+        for key in list(TABLES) + [INFO]:
+            if old.get(key) == new.get(key): continue  # 해시가 같으면 열어보지 않음
+            changes.append(describe_change(key, self.get_object(old[key]), self.get_object(new[key])))
+        return changes
+
+
+def _as_frame(value):
+    if isinstance(value, pd.DataFrame): return value
+    return pd.DataFrame([v.to_dict() if hasattr(v, "to_dict") else v for v in value or []])
+
+def describe_change(key, before, after):
+    if key == INFO:
+        fields = [k for k in set(before) | set(after) if pickle.dumps(before.get(k)) != pickle.dumps(after.get(k))]
+        return {"table": key, "label": "기본 정보/참여자", "fields": sorted(fields)}
+    a, b = _as_frame(before), _as_frame(after)
+    out = {"table": key, "label": TABLES[key], "rows_before": len(a), "rows_after": len(b)}
+    if list(a.columns) == list(b.columns) and len(a) == len(b):
+        a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+        try:
+            diff = (a != b) & ~(a.isna() & b.isna())
+            out["changed_cells"] = int(diff.to_numpy().sum())
+            out["changed_columns"] = [c for c in a.columns if diff[c].any()]
+        except (TypeError, ValueError): pass
+    return out
+
+
+def restore_into(project, restored):
+    # 복원한 버전의 필드를 현재(세션 복사본) 교재에 덮어쓰기, id는 유지
+    for key in restored.keys():
+        if key != 'id': project[key] = restored[key]
+    return project
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+import profiling
+from export import add_supply_amount, filter_projects
+
+# --- 전체 정산 원장 (원천징수 계산) ---
+# 모든 교재의 정산 행을 한 표로 모으고, 지급 건(지급 대상자 x 교재)별 원천세를 벡터 연산으로 계산한다.
+#   기타소득: 필요경비 60% 공제 후 소득세 20% (= 지급액의 8%) + 지방소득세(소득세의 10%) = 8.8%
+#             기타소득금액 5만원 이하(지급액 125,000원 이하)는 과세최저한으로 비과세
+#   사업소득: 소득세 3% + 지방소득세 0.3% = 3.3%
+#   세액은 10원 미만 절사, 소득세 1,000원 미만은 소액부징수
+OTHER_INCOME = "기타소득"
+BUSINESS_INCOME = "사업소득"
+INCOME_TYPES = [OTHER_INCOME, BUSINESS_INCOME]
+OTHER_EXPENSE_RATE = 0.6
+OTHER_TAX_RATE = 0.2
+OTHER_MIN_TAXABLE = 50000
+BUSINESS_TAX_RATE = 0.03
+LOCAL_TAX_RATE = 0.1
+MIN_COLLECT = 1000
+
+LEDGER_COLUMNS = ["발행 연도", "학교급", "과목", "시리즈", "교재명", "교재ID", "구분", "이름", "내용", "공급가액"]
+PAYMENT_COLUMNS = ["이름", "소득구분", "발행 연도", "학교급", "시리즈", "교재명", "지급액", "소득세", "지방소득세", "원천세 계", "실지급액", "은행명", "계좌번호", "확인 필요"]
+NO_ACCOUNT = "계좌 없음"
+AMBIGUOUS = "동명이인 - 계좌 확인"
+
+
+@profiling.timed("ledger.build")
+def build_ledger(projects, years=None, levels=None):
+    # 모든 교재의 정산 행을 모아 DataFrame 한 번 생성 -> 공급가액도 전체를 한 번에 계산
+    rows = []
+    for p in filter_projects(projects, years, levels):
+        book = {"발행 연도": p['year'], "학교급": p['level'], "과목": p.get('subject', '-'), "시리즈": p['series'], "교재명": p['title'], "교재ID": p['id']}
+        rows.extend({**item, **book} for item in p.get('settlement_list') or [])
+    if not rows: return pd.DataFrame(columns=LEDGER_COLUMNS)
+    ledger = add_supply_amount(pd.DataFrame(rows)).reindex(columns=LEDGER_COLUMNS)
+    ledger['이름'] = ledger['이름'].astype(str).str.strip()
+    ledger['공급가액'] = pd.to_numeric(ledger['공급가액'], errors='coerce').fillna(0)
+    return ledger[(ledger['이름'] != "") & (ledger['이름'] != "nan")].reset_index(drop=True)
+
+
+def _truncate10(x):
+    return np.floor(np.round(x, 4) / 10) * 10  # 부동소수 오차(9999.9999...) 보정 후 절사
+
+def withholding(gross, income_type):
+    # gross, income_type: 같은 길이의 배열 -> (소득세, 지방소득세)
+    gross = np.asarray(gross, dtype=float)
+    is_other = np.asarray(income_type) == OTHER_INCOME
+    other_base = gross * (1 - OTHER_EXPENSE_RATE)
+    income_tax = np.where(
+        is_other,
+        np.where(other_base <= OTHER_MIN_TAXABLE, 0, _truncate10(other_base * OTHER_TAX_RATE)),
+        _truncate10(gross * BUSINESS_TAX_RATE),
+    )
+    income_tax = np.where(income_tax < MIN_COLLECT, 0, income_tax)
+    local_tax = _truncate10(income_tax * LOCAL_TAX_RATE)
+    return income_tax, local_tax
+
+
+def _accounts(projects):
+    # (교재 id, 이름) -> {(은행명, 계좌번호)} - 계좌는 지급 건의 교재에 등록된 사람에서만 찾는다
+    # (다른 교재의 동명이인 계좌로 이체되지 않게). 같은 교재에 계좌가 다른 동명이인이 있으면 2개 이상
+    out = {}
+    for p in projects:
+        for person in list(p.get('author_list', [])) + list(p.get('reviewer_list', [])):
+            name = str(person['이름']).strip()
+            if name and person['계좌번호']:
+                out.setdefault((p['id'], name), set()).add((person['은행명'], person['계좌번호']))
+    return out
+
+def _account(accounts, pid, name):
+    # 반환: (은행명, 계좌번호, 확인 필요 사유) - 모호하면 추측하지 않고 비워 둠
+    found = accounts.get((pid, name), set())
+    if len(found) == 1: return (*next(iter(found)), "")
+    return "", "", AMBIGUOUS if found else NO_ACCOUNT
+
+def payment_keys(ledger):
+    # 소득구분 개별 지정 선택지: (이름, 교재ID) -> "이름 · [시리즈] 교재명"
+    if ledger.empty: return {}
+    rows = ledger[["이름", "교재ID", "시리즈", "교재명"]].drop_duplicates(["이름", "교재ID"]).sort_values(["이름", "시리즈", "교재명"])
+    return {(r['이름'], r['교재ID']): f"{r['이름']} · [{r['시리즈']}] {r['교재명']}" for r in rows.to_dict("records")}
+
+@profiling.timed("ledger.payments")
+def payments(ledger, projects=(), income_types=None, default_type=OTHER_INCOME):
+    # 지급 건 = (이름, 교재) 합계. income_types: {(이름, 교재ID): 소득구분} 지급 건별 개별 지정
+    # (이름만으로 지정하면 다른 교재의 동명이인까지 같은 소득구분이 됨)
+    if ledger.empty: return pd.DataFrame(columns=PAYMENT_COLUMNS)
+    pay = ledger.groupby(["이름", "교재ID", "발행 연도", "학교급", "시리즈", "교재명"], as_index=False, sort=False)['공급가액'].sum()
+    pay = pay.rename(columns={'공급가액': '지급액'})
+    overrides = income_types or {}
+    pay['소득구분'] = [overrides.get(key, default_type) for key in zip(pay['이름'], pay['교재ID'])]
+    pay['소득세'], pay['지방소득세'] = withholding(pay['지급액'].to_numpy(), pay['소득구분'].to_numpy())
+    pay['원천세 계'] = pay['소득세'] + pay['지방소득세']
+    pay['실지급액'] = pay['지급액'] - pay['원천세 계']
+    accounts = _accounts(projects)
+    pay['은행명'], pay['계좌번호'], pay['확인 필요'] = zip(*(_account(accounts, pid, n) for pid, n in zip(pay['교재ID'], pay['이름'])))
+    for c in ['지급액', '소득세', '지방소득세', '원천세 계', '실지급액']: pay[c] = pay[c].round().astype("int64")
+    return pay.sort_values(["이름", "발행 연도", "교재명"]).reset_index(drop=True)[PAYMENT_COLUMNS]
+
+def payee_summary(pay):
+    # 지급 대상자별 합계
+    if pay.empty: return pd.DataFrame(columns=["이름", "소득구분", "지급 건수", "지급액", "소득세", "지방소득세", "원천세 계", "실지급액"])
+    out = pay.groupby(["이름", "소득구분"], as_index=False).agg(
+        **{"지급 건수": ("지급액", "size"), "지급액": ("지급액", "sum"), "소득세": ("소득세", "sum"),
+           "지방소득세": ("지방소득세", "sum"), "원천세 계": ("원천세 계", "sum"), "실지급액": ("실지급액", "sum")})
+    return out.sort_values("지급액", ascending=False).reset_index(drop=True)
+
+def payment_batch_csv(pay):
+    # 이체용 지급 배치 파일 (엑셀 한글 호환 utf-8-sig)
+    return pay.to_csv(index=False).encode("utf-8-sig")
@@ -0,0 +1,257 @@
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+import pandas as pd
+
+from core import normalize_string
+
+# --- 교재(프로젝트) 데이터 모델 ---
+# 스키마 버전: 1 = 자유 형식 dict (구버전), 2 = 슬롯 데이터클래스
+SCHEMA_VERSION = 2
+
+DEFAULT_CHECKLIST = [
+    {"구분": "결과보고서", "내용": "결과보고서 작성", "완료": False},
+    {"구분": "결과보고서", "내용": "집필자 성과 평가 작성", "완료": False},
+    {"구분": "결과보고서", "내용": "검토자 역량 평가", "완료": False},
+    {"구분": "약정서(집필자)", "내용": "집필약정서", "완료": False},
+    {"구분": "약정서(집필자)", "내용": "보안서약서", "완료": False},
+    {"구분": "약정서(집필자)", "내용": "수의계약체결제한여부확인서", "완료": False},
+    {"구분": "약정서(집필자)", "내용": "청렴계약이행서약서", "완료": False},
+    {"구분": "약정서(검토자)", "내용": "검토약정서", "완료": False},
+    {"구분": "약정서(검토자)", "내용": "보안서약서", "완료": False},
+    {"구분": "약정서(검토자)", "내용": "수의계약체결제한여부확인서", "완료": False},
+    {"구분": "약정서(검토자)", "내용": "청렴계약이행서약서", "완료": False},
+    {"구분": "회의록", "내용": "제작관련업체 사전협의회(인쇄협의체) 회의록", "완료": False},
+    {"구분": "회의록", "내용": "편집대행서 최종 점검 체크리스트", "완료": False},
+]
+
+DEV_COLUMNS = ["단원명", "집필자", "집필완료", "검토완료", "피드백완료", "디자인완료", "비고"]
+DEV_BOOL_COLUMNS = ["집필완료", "검토완료", "피드백완료", "디자인완료"]
+DEFAULT_REVIEW_ROLES = ["1차외부검토", "2차외부검토", "3차외부검토", "편집검토"]
+
+def default_author_standards():
+    return pd.DataFrame([
+        {"구분": "쪽당", "원고료": 35000, "검토료": 14000},
+        {"구분": "문항당", "원고료": 3000, "검토료": 1500}
+    ])
+
+def default_review_standards():
+    return pd.DataFrame([
+        {"구분": "1차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
+        {"구분": "2차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
+        {"구분": "3차외부검토", "단가(쪽)": 8000, "단가(문항)": 1000},
+        {"구분": "편집검토", "단가(쪽)": 6000, "단가(문항)": 500}
+    ])
+
+
+# [Mapping 호환] 기존 p['key'] / p.get('key') 코드가 그대로 동작하도록 dict 인터페이스 제공
+class Record:
+    __slots__ = ()
+    KEYS = {}  # 외부 키 -> 속성명 (하위 클래스 정의 후 채움)
+
+    def __getitem__(self, key):
+        attr = self.KEYS.get(key)
+        if attr is None: return self.extras[key]
+        return getattr(self, attr)
+
+    def __setitem__(self, key, value):
+        attr = self.KEYS.get(key)
+        if attr is None: self.extras[key] = value
+        else: setattr(self, attr, value)
+
+    def __contains__(self, key):
+        return key in self.KEYS or key in self.extras
+
+    def get(self, key, default=None):
+        try: return self[key]
+        except KeyError: return default
+
+    def keys(self):
+        return list(self.KEYS) + list(self.extras)
+
+    def to_dict(self):
+        return {k: self[k] for k in self.keys()}
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls): return data
+        data = dict(data or {})
+        known = {attr: data.pop(key) for key, attr in cls.KEYS.items() if key in data}
+        return cls(**known, extras=data)
+
+
+def _bind_keys(cls, key_map=None):
+    names = [f.name for f in fields(cls) if f.name != "extras"]
+    cls.KEYS = key_map if key_map is not None else {n: n for n in names}
+    return cls
+
+
+@dataclass(slots=True)
+class Person(Record):
+    name: str = ""
+    school: str = ""
+    affiliation: str = ""
+    subject: str = ""
+    role: str = ""
+    review_role: str = ""
+    match_info: str = ""
+    phone: str = ""
+    email: str = ""
+    zipcode: str = ""
+    address: str = ""
+    address_detail: str = ""
+    bank: str = ""
+    account: str = ""
+    rrn_front: str = ""
+    extras: dict = field(default_factory=dict)
+
+_bind_keys(Person, {
+    "이름": "name", "학교급": "school", "소속": "affiliation", "과목": "subject", "역할": "role",
+    "검토차수": "review_role", "매칭정보": "match_info", "연락처": "phone", "이메일": "email",
+    "우편번호": "zipcode", "주소": "address", "상세주소": "address_detail",
+    "은행명": "bank", "계좌번호": "account", "주민번호(앞)": "rrn_front",
+})
+
+
+@dataclass(slots=True)
+class BookSpecs(Record):
+    format: str = ""
+    colors_main: list = field(default_factory=lambda: ["1도"])
+    colors_sol: str = "1도"
+    is_ebook: bool = False
+    is_answer_view: bool = False
+    is_answer_pdf: bool = False
+    extras: dict = field(default_factory=dict)
+
+_bind_keys(BookSpecs)
+
+
+@dataclass(slots=True)
+class ContractStatus(Record):
+    target_label: str = ""
+    name: str = ""
+    role: str = ""
+    status: str = ""
+    final_fee: int = 0
+    start_date: object = None
+    end_date: object = None
+    special_note: str = ""
+    contract_date: object = None
+    dept_head: str = ""
+    link_token: str = ""
+    extras: dict = field(default_factory=dict)
+
+_bind_keys(ContractStatus)
+
+
+@dataclass(slots=True, eq=False)
+class Project(Record):
+    id: str = ""
+    year: str = ""
+    level: str = ""
+    subject: str = ""
+    series: str = ""
+    title: str = ""
+    schedule_data: pd.DataFrame = field(default_factory=pd.DataFrame)
+    planning_data: pd.DataFrame = field(default_factory=pd.DataFrame)
+    dev_data: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=DEV_COLUMNS))
+    author_list: list = field(default_factory=list)
+    reviewer_list: list = field(default_factory=list)
+    partner_list: list = field(default_factory=list)  # 업체 정보는 dict 그대로 유지
+    issues: list = field(default_factory=list)
+    book_specs: BookSpecs = field(default_factory=lambda: BookSpecs())
+    report_checklist: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(DEFAULT_CHECKLIST))
+    author_standards: pd.DataFrame = field(default_factory=default_author_standards)
+    review_standards: pd.DataFrame = field(default_factory=default_review_standards)
+    penalties: dict = field(default_factory=dict)
+    target_date_val: object = field(default_factory=datetime.today)
+    created_at: datetime = field(default_factory=datetime.now)
+    settlement_list: list = field(default_factory=list)
+    settlement_overrides: dict = field(default_factory=dict)
+    contract_status: dict = field(default_factory=dict)
+    schema_version: int = SCHEMA_VERSION
+    extras: dict = field(default_factory=dict)
+
+_bind_keys(Project)
+
+
+# --- 스키마 마이그레이션 (로드 시 1회) ---
+def _upgrade_author_standards(std):
+    if '원고료_단가(쪽)' in std.columns:
+        old_row = std.iloc[0]
+        return pd.DataFrame([
+            {"구분": "쪽당", "원고료": old_row.get('원고료_단가(쪽)', 35000), "검토료": old_row.get('검토료_단가(쪽)', 14000)},
+            {"구분": "문항당", "원고료": old_row.get('원고료_단가(문항)', 3000), "검토료": old_row.get('검토료_단가(문항)', 1500)}
+        ])
+    if '원고료_단가' in std.columns:
+        old_row = std.iloc[0]
+        return pd.DataFrame([
+            {"구분": "쪽당", "원고료": old_row.get('원고료_단가', 35000), "검토료": old_row.get('검토료_단가', 14000)},
+            {"구분": "문항당", "원고료": 3000, "검토료": 1500}
+        ])
+    return std
+
+def _upgrade_dev_data(dev_df):
+    if dev_df is None or dev_df.empty:
+        return pd.DataFrame(columns=DEV_COLUMNS)
+    dev_df = dev_df.rename(columns={c: normalize_string(c) for c in dev_df.columns})
+    dev_df = dev_df.rename(columns={"1차검토자": "1차외부검토", "2차검토자": "2차외부검토", "3차검토자": "3차외부검토"})
+    for col in DEV_BOOL_COLUMNS:
+        if col not in dev_df.columns: dev_df[col] = False
+        else: dev_df[col] = dev_df[col].astype(bool)
+    return dev_df
+
+def ensure_review_roles(p):
+    # 검토 차수별 단가 행과 배정 매트릭스 열을 보장
+    active_roles = set(DEFAULT_REVIEW_ROLES)
+    for r in p.reviewer_list:
+        role = r.get('검토차수')
+        if role: active_roles.add(normalize_string(role))
+
+    rev_std = p.review_standards
+    existing_std = set(rev_std['구분'].apply(normalize_string).tolist())
+    new_std_rows = [{"구분": role, "단가(쪽)": 0, "단가(문항)": 0} for role in sorted(active_roles) if role not in existing_std]
+    if new_std_rows:
+        p.review_standards = pd.concat([rev_std, pd.DataFrame(new_std_rows)], ignore_index=True)
+
+    for role in sorted(active_roles):
+        if role not in p.dev_data.columns: p.dev_data[role] = "-"
+    return p
+
+def _migrate_v1(raw):
+    data = dict(raw)
+    for key in ("author_list", "reviewer_list", "partner_list", "settlement_list", "settlement_overrides", "contract_status"):
+        if data.get(key) is None: data.pop(key, None)
+
+    if 'author_standards' in data:
+        data['author_standards'] = _upgrade_author_standards(data['author_standards'])
+    if 'report_checklist' in data and len(data['report_checklist']) < 3:
+        data.pop('report_checklist')
+    if 'review_standards' in data:
+        rev_std = data['review_standards']
+        if '단가(문항)' not in rev_std.columns:
+            rev_std = rev_std.copy()
+            rev_std['단가(문항)'] = 1000
+            if '단가' in rev_std.columns: rev_std = rev_std.rename(columns={'단가': '단가(쪽)'})
+        data['review_standards'] = rev_std.drop(columns=['구분_clean'], errors='ignore')
+    if 'dev_data' in data:
+        data['dev_data'] = _upgrade_dev_data(data['dev_data'])
+
+    data['author_list'] = [Person.from_dict(a) for a in data.get('author_list', [])]
+    data['reviewer_list'] = [Person.from_dict(r) for r in data.get('reviewer_list', [])]
+    data['book_specs'] = BookSpecs.from_dict(data.get('book_specs') or {})
+    data['contract_status'] = {k: ContractStatus.from_dict(v) for k, v in data.get('contract_status', {}).items()}
+    data['schema_version'] = SCHEMA_VERSION
+    return ensure_review_roles(Project.from_dict(data))
+
+def migrate_project(raw):
+    if isinstance(raw, Project):
+        # 향후 스키마 변경 시 버전별 단계를 여기에 추가
+        raw.schema_version = SCHEMA_VERSION
+        return raw
+    return _migrate_v1(raw)
+
+def migrate_projects(raw_list):
+    return [migrate_project(p) for p in (raw_list or [])]
+
+def new_project(**header):
+    return ensure_review_roles(Project(**header))
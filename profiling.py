@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# --- 성능 계측 (opt-in) ---
+# EBS_PROFILE=1 또는 URL ?profile=1 로 활성화. EBS_PROFILE_DIR 지정 시 rerun마다 JSON 트레이스 저장.
+PROFILE_ENV = "EBS_PROFILE"
+PROFILE_DIR_ENV = "EBS_PROFILE_DIR"
+
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ("name", "start", "elapsed", "size", "_profiler")
+
+    def __init__(self, name, profiler=None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.elapsed = None
+        self.size = None
+        self._profiler = profiler
+
+    def stop(self):
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.start
+            if self._profiler is not None: self._profiler.record(self)
+        return self
+
+
+class Profiler:
+    def __init__(self, label=""):
+        self.label = label
+        self.started_at = datetime.now()
+        self.t0 = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        with self._lock:
+            self.events.append({
+                "name": span.name,
+                "offset_ms": round((span.start - self.t0) * 1000, 3),
+                "ms": round(span.elapsed * 1000, 3),
+                "bytes": span.size,
+            })
+
+    def summary(self):
+        stats = {}
+        for e in self.events:
+            s = stats.setdefault(e['name'], {"name": e['name'], "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0})
+            s['calls'] += 1
+            s['total_ms'] += e['ms']
+            s['max_ms'] = max(s['max_ms'], e['ms'])
+            if e['bytes']: s['bytes'] += e['bytes']
+        return sorted(stats.values(), key=lambda s: s['total_ms'], reverse=True)
+
+    def to_json(self):
+        return json.dumps({
+            "label": self.label,
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": round((time.perf_counter() - self.t0) * 1000, 3),
+            "summary": self.summary(),
+            "events": self.events,
+        }, ensure_ascii=False, indent=2)
+
+    def dump(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{self.started_at.strftime('%Y%m%d_%H%M%S_%f')}.json")
+        with open(path, "w", encoding="utf-8") as f: f.write(self.to_json())
+        return path
+
+
+def env_enabled():
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+def begin(enabled, label=""):
+    # 현재 스레드(=세션 스크립트 실행)의 계측기를 교체
+    _local.profiler = Profiler(label) if enabled else None
+    return _local.profiler
+
+def current():
+    return getattr(_local, "profiler", None)
+
+def start_span(name):
+    return Span(name, current())
+
+@contextmanager
+def span(name):
+    s = start_span(name)
+    try: yield s
+    finally: s.stop()
+
+def timed(name=None):
+    def decorator(func):
+        label = name or func.__name__
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if current() is None: return func(*args, **kwargs)
+            with span(label): return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from concurrency import field_digest
+
+# --- 교재별 진행 현황 (일 단위 캐시) ---
+# 진행률/현재 단계/지연 작업을 일정표 전체에 대한 벡터 연산으로 한 번에 계산하고,
+# (교재 id, 오늘 날짜, 일정/개발 현황 digest) 를 키로 캐시한다.
+# 공유 스냅샷의 교재는 스냅샷에 이미 계산된 digest를 쓰므로 다시 실행해도 비용이 없다.
+#   진행률: '최종 플루토 OK' 이전 단계 중 종료일이 지난 단계의 비율 (기존 진행 상황 탭과 같은 기준)
+#   지연: 종료일이 지났는데 개발 현황의 해당 완료 체크가 모두 되지 않은 단계
+PLUTO = "최종 플루토 OK"
+ALERT_DAYS = 3
+CACHE_SIZE = 1024
+STAGE_FLAGS = [  # (일정 구분에 포함된 문구, 개발 현황 완료 열)
+    ("집필 (본문 개발)", "집필완료"),
+    ("외부/교차 검토", "검토완료"),
+    ("집필자 반영", "피드백완료"),
+    ("조판", "디자인완료"),
+]
+DONE, ONGOING, WAITING = "✅ 완료", "🏃 진행중", "⚪ 대기"
+
+EMPTY = {"percent": 0.0, "completed": 0, "total": 0, "stage": "-", "overdue": [], "impending": 0,
+         "pluto": None, "pluto_done": False, "statuses": None}
+
+
+def _stage_name(name):
+    return str(name).replace("🔴 ", "")
+
+@profiling.timed("progress.compute")
+def compute(schedule_df, dev_df=None, today=None):
+    today = pd.Timestamp(today or datetime.now().date())
+    if schedule_df is None or schedule_df.empty: return dict(EMPTY)
+    names = schedule_df['구분'].astype(str).to_numpy(dtype=str)
+    start = pd.to_datetime(schedule_df['시작일'], errors='coerce').to_numpy()
+    end = pd.to_datetime(schedule_df['종료일'], errors='coerce').to_numpy()
+    now = today.to_datetime64()
+    has_end = ~np.isnat(end)
+    done = has_end & (end < now)
+    ongoing = has_end & ~done & ~np.isnat(start) & (start <= now)
+    is_pluto = np.char.find(names, PLUTO) >= 0
+
+    total = int((~is_pluto).sum())
+    completed = int((done & ~is_pluto).sum())
+    days_left = (end - now) / np.timedelta64(1, "D")
+    impending = int((has_end & (days_left >= 0) & (days_left <= ALERT_DAYS)).sum())
+
+    # 현재 단계: 진행 중 단계(시작일 순) -> 없으면 다음 예정 단계
+    order = np.argsort(start, kind="stable")  # NaT는 뒤로
+    stage = "-"
+    current = [i for i in order if ongoing[i]]
+    upcoming = [i for i in order if not done[i] and not ongoing[i] and not np.isnat(start[i])]
+    if current: stage = _stage_name(names[current[0]])
+    elif upcoming: stage = f"대기: {_stage_name(names[upcoming[0]])}"
+    elif total and completed == total: stage = "완료"
+
+    pluto = None
+    plu = np.char.find(names, "플루토") >= 0
+    if plu.any() and has_end[plu][-1]: pluto = pd.Timestamp(end[plu][-1])  # get_schedule_date와 같은 기준
+
+    overdue = []
+    if dev_df is not None and not dev_df.empty:
+        for keyword, flag in STAGE_FLAGS:
+            if flag not in dev_df.columns: continue
+            remaining = int((~dev_df[flag].fillna(False).astype(bool)).sum())
+            if not remaining: continue
+            hit = done & (np.char.find(names, keyword) >= 0)
+            for i in np.flatnonzero(hit):
+                overdue.append({"task": _stage_name(names[i]), "end": pd.Timestamp(end[i]).date(), "remaining": remaining, "flag": flag})
+
+    status = np.where(done, DONE, np.where(ongoing, ONGOING, WAITING))
+    statuses = schedule_df.assign(상태=status).iloc[order].reset_index(drop=True)
+    return {
+        "percent": completed / total if total else 0.0, "completed": completed, "total": total,
+        "stage": stage, "overdue": overdue, "impending": impending,
+        "pluto": pluto, "pluto_done": pluto is not None and pluto < today, "statuses": statuses,
+    }
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def metrics(project, today=None, digests=None):
+    # digests: 공유 스냅샷의 필드 digest (없으면 직접 계산 - 편집 중인 교재)
+    today = today or datetime.now().date()
+    sch, dev = project.get('schedule_data'), project.get('dev_data')
+    if digests:
+        key = (project['id'], today, digests.get('schedule_data'), digests.get('dev_data'))
+    else:
+        key = (project['id'], today, field_digest(sch), field_digest(dev))
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    result = compute(sch, dev, today)
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE: _cache.popitem(last=False)
+    return result
+
+def portfolio(view, today=None):
+    # {교재 id: 진행 현황} - view는 store.ProjectView
+    return {p['id']: metrics(p, today, view.shared_digests(p['id'])) for p in view}
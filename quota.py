@@ -0,0 +1,186 @@
+import os
+import random
+import threading
+import time
+
+import profiling
+
+# --- 구글 시트 요청 스케줄러 ---
+# 프로세스의 모든 시트 요청(모든 세션)을 한 곳에서 내보낸다.
+#   속도 제한: 토큰 버킷 (분당 QPM개, 최대 BURST개까지 몰아서) - 토큰이 없으면 기다렸다가 보냄
+#   재시도: 429(쿼터 초과)/5xx/네트워크 오류는 지수 백오프(+무작위 지연)로 MAX_RETRIES번까지
+#   합치기: 같은 읽기 요청(예: 여러 세션의 B1 메타 확인)이 진행 중이면 새로 보내지 않고 그 결과를 같이 받음
+#     (저장 전 리비전 확인처럼 최신 값이 필요한 읽기는 uncoalesced()로 합치지 않음)
+# 워크시트는 wrap()으로 감싸서 쓰면 storage/store/concurrency 코드는 그대로 스케줄러를 거친다.
+QPM = float(os.environ.get("EBS_SHEETS_QPM", 60))   # 구글 시트 기본 쿼터: 사용자당 분당 60회
+BURST = int(os.environ.get("EBS_SHEETS_BURST", 20))
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 32.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+READS = {"col_values", "get", "batch_get"}
+WRITES = {"update", "batch_update", "clear", "batch_clear"}
+
+
+def status_of(error):
+    # gspread.exceptions.APIError / fake_sheets.FakeAPIError 의 HTTP 상태 코드
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) or getattr(error, "code", None)
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try: return float(headers.get("Retry-After"))
+    except (TypeError, ValueError): return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # 반환: 기다린 시간(초)
+        if self.rate <= 0: return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class RequestScheduler:
+    def __init__(self, per_minute=QPM, burst=BURST, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, sleep=time.sleep):
+        self.bucket = TokenBucket(per_minute, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._rng = random.Random()
+        self.stats = {"requests": 0, "sent": 0, "retries": 0, "failures": 0, "coalesced": 0,
+                      "throttled": 0, "throttle_wait_s": 0.0, "backoff_s": 0.0, "by_status": {}}
+
+    def _count(self, key, n=1):
+        with self._lock: self.stats[key] += n
+
+    def _backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None: delay = min(BACKOFF_MAX, self.backoff_base * (2 ** attempt)) * (0.5 + self._rng.random() / 2)
+        self._count("backoff_s", delay)
+        self._sleep(delay)
+
+    def _send(self, fn, args, kwargs):
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            if waited:
+                with self._lock:
+                    self.stats["throttled"] += 1
+                    self.stats["throttle_wait_s"] += waited
+            self._count("sent")
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = status_of(e)
+                if status is not None:
+                    with self._lock: self.stats["by_status"][status] = self.stats["by_status"].get(status, 0) + 1
+                retryable = status in RETRY_STATUS or (status is None and isinstance(e, OSError))  # 연결 끊김/시간 초과
+                if not retryable or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._backoff(attempt, e)
+                attempt += 1
+
+    def call(self, fn, *args, coalesce_key=None, **kwargs):
+        # coalesce_key가 같은 요청이 진행 중이면 그 결과를 공유 (읽기 전용 요청에만 사용)
+        self._count("requests")
+        if coalesce_key is None:
+            with profiling.span("sheets.request"):
+                return self._send(fn, args, kwargs)
+        with self._lock:
+            flight = self._flights.get(coalesce_key)
+            leader = flight is None
+            if leader: flight = self._flights[coalesce_key] = _Flight()
+            else: self.stats["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.result
+        try:
+            with profiling.span("sheets.request"):
+                flight.result = self._send(fn, args, kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock: self._flights.pop(coalesce_key, None)
+            flight.done.set()
+
+    def snapshot(self):
+        with self._lock: return {**self.stats, "by_status": dict(self.stats["by_status"])}
+
+
+def _sheet_key(sheet):
+    # gspread는 연결할 때마다 Worksheet 객체를 새로 만듦 -> 객체가 아니라 스프레드시트/시트 id로 구분
+    # (vars 사용: RemoteWorksheet는 없는 속성도 원격 호출로 위임하므로 getattr 불가)
+    v = vars(sheet)
+    return (type(sheet).__name__, v.get("spreadsheet_id"), (v.get("_properties") or {}).get("sheetId"), v.get("url"), v.get("title"))
+
+
+class ScheduledWorksheet:
+    # gspread Worksheet 호환 래퍼: 읽기/쓰기 API를 스케줄러로 보내고, 나머지 속성은 그대로 위임
+    # coalesce=False: 읽기도 합치지 않음 (uncoalesced 참고)
+    def __init__(self, sheet, scheduler, coalesce=True):
+        self.sheet = sheet
+        self.scheduler = scheduler
+        self.coalesce = coalesce
+        self.key = _sheet_key(sheet)
+
+    def __getattr__(self, name):
+        attr = getattr(self.sheet, name)
+        if name in READS and self.coalesce:
+            # 합치기 키: 같은 시트 + 같은 메서드/인자
+            return lambda *a, **kw: self.scheduler.call(attr, *a, coalesce_key=(self.key, name, repr(a), repr(sorted(kw.items()))), **kw)
+        if name in WRITES:
+            return lambda *a, **kw: self.scheduler.call(attr, *a, **kw)
+        return attr
+
+
+_default = None
+_default_lock = threading.Lock()
+
+def default():
+    global _default
+    with _default_lock:
+        if _default is None: _default = RequestScheduler()
+        return _default
+
+def wrap(sheet, scheduler=None):
+    if sheet is None or isinstance(sheet, ScheduledWorksheet): return sheet
+    return ScheduledWorksheet(sheet, scheduler or default())
+
+def uncoalesced(sheet):
+    # 저장 직전 리비전 확인처럼 "호출한 뒤에 보낸" 읽기 결과가 필요한 경우:
+    # 진행 중인 같은 읽기에 합류하면 그 전에 시작된 요청의 (직전 전환 이전) 값을 받을 수 있음
+    if not isinstance(sheet, ScheduledWorksheet) or not sheet.coalesce: return sheet
+    return ScheduledWorksheet(sheet.sheet, sheet.scheduler, coalesce=False)
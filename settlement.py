@@ -0,0 +1,292 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import edits
+import profiling
+from core import normalize_string, get_sort_rank
+from export import add_supply_amount
+
+# --- 정산 내역 자동 산출 (단원 단위 증분 계산) ---
+# 자동 산출 행은 출처 키(_key)를 가진다:
+#   집필|이름|쪽       <- 기획표 행(집필자, 쪽수/문항수) + 집필료 기준(쪽당/문항당)
+#   검토|이름|차수|쪽   <- 개발 현황 행의 검토 칸(이름 목록) + 해당 단원 쪽수/문항수 + 검토료 기준(차수)
+# 단원(기획표 행, 개발 현황 행)마다 입력값 서명과 기여분을 기억해 두고, 서명이 바뀐 단원만 다시 계산한다.
+# 단가는 기준표에서 행을 만들 때 붙이므로 기준 단가 수정은 수량 계산 없이 반영된다.
+# 사용자가 자동 산출 행을 고친 값은 settlement_overrides[_key] = {열: 값} 으로 보관해 재계산 후에도 유지
+# ({"_deleted": True} 는 삭제한 행). _key가 없는 행은 직접 입력 행으로 그대로 둔다.
+KEY = "_key"
+DELETED = "_deleted"
+EMPTY_NAMES = ('-', '', 'nan', 'None')
+NUMERIC_FIELDS = ["수량", "단가", "집필단가", "검토단가"]
+TEXT_FIELDS = ["이름", "내용", "지급기준", "비고"]
+ROW_COLUMNS = ["구분", "이름", "내용", "지급기준", "수량", "단가", "집필단가", "검토단가", "비고"]
+UNIT_LABEL = {"쪽": ("쪽", "쪽당"), "문항": ("문항", "문항당")}
+STATE_CACHE_SIZE = 256
+
+
+def _num(v):
+    try:
+        v = float(str(v).replace(',', ''))
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if v != v else v  # NaN -> 0
+
+def _text(v):
+    if v is None: return ""
+    try:
+        if pd.isna(v): return ""
+    except (TypeError, ValueError): pass
+    return str(v)
+
+
+# --- 단원 -> 서명 ---
+# 서명만으로 기여분을 계산할 수 있게 필요한 값을 모두 담는다
+def _col(df, name, default=None):
+    return df[name].tolist() if name in df.columns else [default] * len(df)
+
+def _plan_units(plan_df):
+    if plan_df is None or plan_df.empty: return {}, {}
+    units, stats = {}, {}
+    rows = zip(_col(plan_df, '집필자'), _col(plan_df, '쪽수', 0), _col(plan_df, '문항수', 0),
+               _col(plan_df, '분권', ''), _col(plan_df, '대단원', ''), _col(plan_df, '중단원', ''))
+    for i, (name, page, item, vol, big, mid) in enumerate(rows):
+        page, item = _num(page), _num(item)
+        units[("plan", i)] = (None if pd.isna(name) else str(name), page, item)
+        stats[f"[{vol}] {big} > {mid}"] = (page, item)
+    return units, stats
+
+def _dev_units(dev_df, stats, roles):
+    if dev_df is None or dev_df.empty: return {}
+    cols = [(c, roles[normalize_string(c)]) for c in dev_df.columns if normalize_string(c) in roles]
+    cells_iter = zip(*(dev_df[c].tolist() for c, _ in cols)) if cols else [()] * len(dev_df)
+    units = {}
+    for i, (uname, cells) in enumerate(zip(_col(dev_df, '단원명', ""), cells_iter)):
+        page, item = stats.get(str(uname), (0, 0))
+        units[("dev", i)] = (page, item, tuple((role, str(cell)) for (_, role), cell in zip(cols, cells)))
+    return units
+
+def _contribution(uid, sig):
+    out = {}
+    if uid[0] == "plan":
+        name, page, item = sig
+        if name is None or name in EMPTY_NAMES: return out
+        for unit, qty in (("쪽", page), ("문항", item)):
+            if qty: out[f"집필|{name}|{unit}"] = qty
+        return out
+    page, item, cells = sig
+    for role, cell in cells:
+        if cell in EMPTY_NAMES: continue
+        for person in (x.strip() for x in cell.split(',')):
+            if not person: continue
+            for unit, qty in (("쪽", page), ("문항", item)):
+                key = f"검토|{person}|{role}|{unit}"
+                out[key] = out.get(key, 0) + qty
+    return out
+
+
+class Derivation:
+    # 교재 한 권의 단원별 서명/기여분과 출처 키별 합계
+    __slots__ = ("sigs", "contrib", "by_key", "totals", "lock")
+
+    def __init__(self):
+        self.sigs, self.contrib, self.by_key, self.totals = {}, {}, {}, {}
+        self.lock = threading.Lock()
+
+    def update(self, units):
+        # 반환: 다시 계산한 단원 수
+        touched, count = set(), 0
+        for uid in [u for u in self.sigs if u not in units]:
+            touched.update(self._drop(uid))
+            del self.sigs[uid]
+        for uid, sig in units.items():
+            if self.sigs.get(uid) == sig: continue
+            touched.update(self._drop(uid))
+            self.sigs[uid] = sig
+            self.contrib[uid] = _contribution(uid, sig)
+            for key, qty in self.contrib[uid].items():
+                self.by_key.setdefault(key, {})[uid] = qty
+                touched.add(key)
+            count += 1
+        for key in touched:
+            # 합계는 해당 키의 기여분만 다시 더함 (빼기 누적으로 인한 오차 없음)
+            parts = self.by_key.get(key)
+            if parts: self.totals[key] = sum(parts.values())
+            else:
+                self.by_key.pop(key, None)
+                self.totals.pop(key, None)
+        return count
+
+    def _drop(self, uid):
+        old = self.contrib.pop(uid, {})
+        for key in old: self.by_key.get(key, {}).pop(uid, None)
+        return old.keys()
+
+    def sources(self, key):
+        return sorted(self.by_key.get(key, {}))
+
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+def _state(pid):
+    with _states_lock:
+        state = _states.get(pid)
+        if state is None:
+            state = _states[pid] = Derivation()
+            while len(_states) > STATE_CACHE_SIZE: _states.popitem(last=False)
+        _states.move_to_end(pid)
+        return state
+
+
+# --- 기준 단가 ---
+def _author_prices(project):
+    out = {}
+    std = project.get('author_standards')
+    if std is None or std.empty: return out
+    for kind, w, r in zip(_col(std, '구분', ''), _col(std, '원고료', 0), _col(std, '검토료', 0)):
+        out[str(kind)] = (int(_num(w)), int(_num(r)))
+    return out
+
+def _review_roles(project):
+    # 정규화된 구분 -> (원래 구분, 쪽 단가, 문항 단가)
+    out = {}
+    std = project.get('review_standards')
+    if std is None or std.empty: return out
+    for kind, page, item in zip(_col(std, '구분'), _col(std, '단가(쪽)', 0), _col(std, '단가(문항)', 0)):
+        if pd.isna(kind): continue
+        out[normalize_string(kind)] = (kind, page, item)
+    return out
+
+
+@profiling.timed("settlement.derive")
+def derive_rows(project):
+    # 자동 산출 행 (보정 적용 전). 집필은 이름순, 검토는 차수 순서 -> 이름순
+    roles = _review_roles(project)
+    plan_units, stats = _plan_units(project.get('planning_data'))
+    units = {**plan_units, **_dev_units(project.get('dev_data'), stats, {k: v[0] for k, v in roles.items()})}
+    state = _state(project['id'])
+    with state.lock:
+        state.update(units)
+        totals = dict(state.totals)
+    auth = _author_prices(project)
+    role_order = {v[0]: i for i, v in enumerate(roles.values())}
+    write, review = [], []
+    for key, qty in totals.items():
+        if qty <= 0: continue
+        parts = key.split("|")
+        if parts[0] == "집필":
+            _, name, unit = parts
+            label, basis = UNIT_LABEL[unit]
+            w_price, r_price = auth.get(basis, (0, 0))
+            write.append({KEY: key, "구분": "집필", "이름": name, "내용": f"원고 집필 ({label})", "지급기준": basis,
+                          "수량": qty, "집필단가": w_price, "검토단가": r_price, "비고": ""})
+        else:
+            _, name, role, unit = parts
+            label, basis = UNIT_LABEL[unit]
+            prices = roles.get(normalize_string(role), (role, 0, 0))
+            review.append({KEY: key, "구분": "검토", "이름": name, "내용": f"{role} ({label})", "지급기준": basis,
+                           "수량": qty, "단가": prices[1 if unit == "쪽" else 2], "비고": ""})
+    write.sort(key=lambda r: (r['이름'], r[KEY]))
+    review.sort(key=lambda r: (role_order.get(r[KEY].split("|")[2], len(role_order)), r['이름'], r[KEY]))
+    return write + review
+
+def sources(project, key):
+    # 출처 키 -> 기여한 단원 (("plan", 기획표 행 번호) / ("dev", 개발 현황 행 번호))
+    state = _state(project['id'])
+    with state.lock: return state.sources(key)
+
+
+# --- 보정(수동 수정) 적용 ---
+def is_auto(settlement_list):
+    return any(isinstance(r.get(KEY), str) for r in settlement_list or [])
+
+def manual_rows(settlement_list):
+    return [r for r in settlement_list or [] if not isinstance(r.get(KEY), str)]
+
+def compose(derived, overrides, manual):
+    rows = []
+    for row in derived:
+        ov = overrides.get(row[KEY])
+        if ov and ov.get(DELETED): continue
+        rows.append({**row, **ov} if ov else row)
+    return rows + list(manual)
+
+def refresh(project):
+    # 자동 산출로 만든 정산 내역이면 현재 기획/개발/기준 값으로 갱신. 반환: 바뀌었는지
+    current = project.get('settlement_list') or []
+    if not is_auto(current): return False
+    rows = compose(derive_rows(project), project.get('settlement_overrides') or {}, manual_rows(current))
+    if rows == current: return False
+    project['settlement_list'] = rows
+    return True
+
+def _on_dev_edit(project, changes):
+    # 검토자 배정/단원 변경 -> 정산 탭을 열지 않아도 정산 내역(원장, 내보내기, 약정서 검토료)에 바로 반영
+    refresh(project)
+
+edits.subscribe("dev_data", _on_dev_edit)
+
+def reset(project):
+    # 자동 산출 다시 실행 (수동 보정 초기화)
+    project['settlement_overrides'] = {}
+    project['settlement_list'] = derive_rows(project)
+
+def _differs(field, a, b):
+    if field in NUMERIC_FIELDS: return _num(a) != _num(b)
+    return _text(a) != _text(b)
+
+def _clean(row):
+    return {c: _num(row.get(c)) if c in NUMERIC_FIELDS else _text(row.get(c)) for c in ROW_COLUMNS}
+
+def record_edits(project, rows):
+    # 편집기에서 돌아온 전체 행 -> 자동 산출 행은 기준값과 다른 열만 보정으로 저장, 나머지는 직접 입력 행
+    if not is_auto(project.get('settlement_list')):
+        project['settlement_list'] = [_clean(r) for r in rows]
+        return
+    derived = {r[KEY]: r for r in derive_rows(project)}
+    old = project.get('settlement_overrides') or {}
+    overrides = {k: v for k, v in old.items() if k not in derived}  # 지금은 산출되지 않는 키의 보정은 유지
+    manual, seen = [], set()
+    for row in rows:
+        key = row.get(KEY)
+        base = derived.get(key) if isinstance(key, str) else None
+        if base is None:
+            manual.append(_clean(row))
+            continue
+        seen.add(key)
+        ov = {c: (_num(row.get(c)) if c in NUMERIC_FIELDS else _text(row.get(c)))
+              for c in NUMERIC_FIELDS + TEXT_FIELDS if c in row and _differs(c, row.get(c), base.get(c))}
+        if ov: overrides[key] = ov
+    for key in derived:
+        if key not in seen: overrides[key] = {DELETED: True}
+    project['settlement_overrides'] = overrides
+    project['settlement_list'] = compose(list(derived.values()), overrides, manual)
+
+
+# --- 정산 탭 표 ---
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+def frame(project):
+    # 정산 내역 -> 공급가액 포함 표. 같은 목록 객체면 다시 만들지 않음 (반환값은 수정하지 말 것)
+    rows = project.get('settlement_list') or []
+    with _frames_lock:
+        hit = _frames.get(project['id'])
+        if hit is not None and hit[0] is rows:
+            _frames.move_to_end(project['id'])
+            return hit[1]
+    df = pd.DataFrame(rows)
+    if df.empty: df = pd.DataFrame(columns=["구분", "이름", "내용", "지급기준", "수량", "단가", "비고"])
+    df = add_supply_amount(df)
+    if KEY not in df.columns: df[KEY] = None
+    if not df.empty:
+        # 검토 행은 차수 순서로 (정렬 순서를 미리 계산해 둠)
+        df['_rank'] = [get_sort_rank(c) if g == '검토' else 0 for g, c in zip(df['구분'], df['내용'])]
+    else:
+        df['_rank'] = pd.Series(dtype=int)
+    with _frames_lock:
+        _frames[project['id']] = (rows, df)
+        while len(_frames) > STATE_CACHE_SIZE: _frames.popitem(last=False)
+    return df
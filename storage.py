@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+import pickle
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import profiling
+import quota
+
+# --- 구글 시트 저장 포맷 ---
+# 각 셀에 base64(pickle(projects)) 문자열을 CHUNK_SIZE 단위로 나누어 저장
+# CHUNK_SIZE는 4의 배수 -> 셀마다 따로 base64 해제 가능 (해제 후 셀당 CHUNK_SIZE * 3 / 4 바이트)
+# [Double Buffer] 데이터 칸(slot)은 A열/C열 두 벌. 저장은 비활성 열에 쓰고 다 쓴 뒤 B1 메타의 "slot"만 바꾼다
+# -> 읽는 쪽은 저장 도중에도 메타가 가리키는 열(직전 저장본)을 그대로 읽음. 메타가 없는 구버전 저장은 A열.
+CHUNK_SIZE = 45000
+SLOTS = ("A", "C")
+READ_BATCH_ROWS = 40   # 범위 요청 1회에 읽을 최대 셀 수 (약 1.8MB)
+READ_WORKERS = 6
+UPLOAD_BATCH_ROWS = 40  # 쓰기 요청 1회에 올릴 셀 수 (요청당 약 1.8MB - 구글 권장 2MB 이하)
+UPLOAD_WORKERS = 4
+
+
+class CorruptData(ValueError):
+    # 메타의 체크섬과 읽은 데이터가 다름 (같은 열을 다른 저장이 덮어쓰는 중 등)
+    pass
+
+
+def _col_index(slot):
+    return ord(slot) - ord("A") + 1
+
+def _check(binary, meta):
+    crc = (meta or {}).get("crc")
+    if crc is not None and zlib.crc32(binary) != crc: raise CorruptData("체크섬 불일치")
+
+def encode_chunks(data):
+    # 반환: (조각 목록, {bytes, crc})
+    with profiling.span("sheets.save.encode") as sp:
+        binary_data = pickle.dumps(data)
+        b64_str = base64.b64encode(binary_data).decode('utf-8')
+        sp.size = len(b64_str)
+    return [b64_str[i:i+CHUNK_SIZE] for i in range(0, len(b64_str), CHUNK_SIZE)], {"bytes": len(binary_data), "crc": zlib.crc32(binary_data)}
+
+def decode_chunks(col_values, meta=None):
+    with profiling.span("sheets.load.decode") as sp:
+        full_b64_str = "".join(col_values)
+        sp.size = len(full_b64_str)
+        binary_data = base64.b64decode(full_b64_str)
+        _check(binary_data, meta)
+        return pickle.loads(binary_data)
+
+def _layout_ok(meta):
+    return bool(meta) and meta.get("chunks", 0) > 0 and meta.get("chunk_size") == CHUNK_SIZE and meta.get("bytes", 0) > 0
+
+def _read_batched(sheet, meta, workers):
+    # 셀 범위를 나누어 병렬로 받고, 받은 스레드에서 바로 미리 잡아 둔 버퍼의 제 위치에 해제
+    # -> 전체 base64 문자열/조각 목록을 동시에 들고 있지 않음 (최대 메모리 = 버퍼 + 진행 중인 범위)
+    n, total, slot = meta["chunks"], meta["bytes"], meta.get("slot", SLOTS[0])
+    step = CHUNK_SIZE // 4 * 3
+    buf = bytearray(total)
+
+    def fetch(r1, r2):
+        rows = sheet.get(f"{slot}{r1}:{slot}{r2}")
+        if len(rows) != r2 - r1 + 1: raise ValueError(f"{slot}{r1}:{slot}{r2} 조각 누락")
+        filled = chars = 0
+        for row_no, row in enumerate(rows, r1):
+            cell = row[0] if row else ""
+            if row_no < n and len(cell) != CHUNK_SIZE: raise ValueError(f"{slot}{row_no} 조각 길이 불일치")
+            part = binascii.a2b_base64(cell)
+            start = (row_no - 1) * step
+            if start + len(part) > total: raise ValueError(f"{slot}{row_no} 메타 크기 초과")
+            buf[start:start + len(part)] = part
+            filled += len(part)
+            chars += len(cell)
+        return filled, chars
+
+    rows_per = max(1, min(READ_BATCH_ROWS, -(-n // max(1, workers))))  # 작은 DB도 작업자 수만큼 나눠 한 번에 요청
+    ranges = [(r, min(r + rows_per - 1, n)) for r in range(1, n + 1, rows_per)]
+    with profiling.span("sheets.load.fetch") as sp, ThreadPoolExecutor(max_workers=max(1, min(workers, len(ranges)))) as pool:
+        done = [f.result() for f in [pool.submit(fetch, r1, r2) for r1, r2 in ranges]]
+        sp.size = sum(c for _, c in done)
+    if sum(f for f, _ in done) != total: raise ValueError("메타 크기 불일치")
+    with profiling.span("sheets.load.decode") as sp:
+        sp.size = total
+        _check(buf, meta)
+        return pickle.loads(buf)
+
+@profiling.timed("sheets.load")
+def read_projects(sheet, meta=None, workers=READ_WORKERS):
+    # meta: B1 메타 (또는 write_projects 반환값) - 조각 수/크기가 있으면 범위 병렬 읽기, 없으면(구버전 저장) 열 전체
+    # 체크섬이 맞지 않으면 CorruptData (부분적으로 덮어쓴 데이터를 돌려주지 않음)
+    if _layout_ok(meta):
+        try:
+            return _read_batched(sheet, meta, workers)
+        except CorruptData:
+            raise
+        except (ValueError, binascii.Error, pickle.UnpicklingError, EOFError):
+            pass  # 메타와 열 내용이 어긋난 경우 -> 열 전체 읽기
+    with profiling.span("sheets.load.fetch") as sp:
+        col_values = sheet.col_values(_col_index((meta or {}).get("slot", SLOTS[0])))
+        sp.size = sum(len(v) for v in col_values)  # stop() 전에 기록해야 이벤트에 남음
+    if not col_values: return []
+    return decode_chunks(col_values, meta)
+
+@profiling.timed("sheets.save")
+def write_projects(sheet, data, workers=UPLOAD_WORKERS, slot=SLOTS[0]):
+    # slot 열만 지우고 다시 씀 (다른 열/메타는 그대로). 반환: 조각 배치 정보 - B1 메타에 함께 기록
+    # 조각을 UPLOAD_BATCH_ROWS개씩 나누어 최대 workers개까지 동시에 올림 (요청 크기 제한/재시도 단위 축소)
+    chunks, info = encode_chunks(data)
+    with profiling.span("sheets.save.upload") as sp:
+        sheet.batch_clear([f"{slot}:{slot}"])
+        batches = [(i + 1, chunks[i:i + UPLOAD_BATCH_ROWS]) for i in range(0, len(chunks), UPLOAD_BATCH_ROWS)]
+        def upload(batch):
+            r1, part = batch
+            return sheet.update(range_name=f'{slot}{r1}:{slot}{r1 + len(part) - 1}', values=[[chunk] for chunk in part])
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+            list(pool.map(upload, batches))
+        sp.size = sum(len(c) for c in chunks)
+    return {"slot": slot, "chunks": len(chunks), "chunk_size": CHUNK_SIZE, **info}
+
+# --- 리비전 메타 (B1 셀, JSON) ---
+# {"rev": 증가 번호, "stamp": 고유 리비전 값, "saved_at": 저장 시각,
+#  "slot": 현재 데이터 열, "chunks"/"chunk_size"/"bytes"/"crc": 그 열의 조각 배치와 체크섬}
+META_CELL = "B1"
+
+class RevisionConflict(Exception):
+    pass
+
+def read_meta(sheet, fresh=False):
+    # fresh: 진행 중인 같은 읽기에 합류하지 않음 (저장 전 리비전 확인용)
+    rows = (quota.uncoalesced(sheet) if fresh else sheet).get(META_CELL)
+    if not rows or not rows[0] or not rows[0][0]:
+        return {"rev": 0, "stamp": None}
+    try: return json.loads(rows[0][0])
+    except ValueError: return {"rev": 0, "stamp": None}
+
+def write_meta(sheet, rev, layout=None):
+    meta = {"rev": rev, "stamp": uuid.uuid4().hex[:12], "saved_at": datetime.now().isoformat(timespec="seconds"), **(layout or {})}
+    sheet.update(range_name=META_CELL, values=[[json.dumps(meta)]])
+    return meta
+
+def inactive_slot(meta):
+    return SLOTS[1] if (meta or {}).get("slot", SLOTS[0]) == SLOTS[0] else SLOTS[0]
+
+
+# --- 저장 권한 (B2 셀, JSON) ---
+# 시트에는 원자적 compare-and-swap이 없으므로 저장 전체(리비전 확인 ~ 업로드 ~ 메타 전환)를 권한으로 감싼다.
+#   1) B2가 비었거나 만료됐으면 {"token", "expires"}를 쓴다
+#   2) CLAIM_SETTLE(또는 확인~쓰기에 걸린 시간의 2배) 동안 기다린 뒤 다시 읽어 내 토큰이면 권한 획득
+#      -> 같은 때 비어 있는 걸 보고 쓴 다른 저장은 그 사이에 덮어쓰므로 마지막에 쓴 쪽만 남는다
+#   3) 메타 전환 직전에 B2가 아직 내 토큰인지 다시 확인, 끝나면 비운다
+# 저장 도중 프로세스가 죽으면 CLAIM_LEASE 초 뒤 다른 저장이 가져간다.
+LOCK_CELL = "B2"
+CLAIM_SETTLE = 0.5
+CLAIM_LEASE = 300
+CLAIM_WAIT = 120
+CLAIM_POLL = 1.0
+
+class SaveInProgress(RevisionConflict):
+    # 다른 저장이 권한을 가진 채 CLAIM_WAIT 초가 지남 / 저장 도중 권한을 잃음
+    pass
+
+def read_lock(sheet):
+    rows = quota.uncoalesced(sheet).get(LOCK_CELL)
+    try: return json.loads(rows[0][0]) if rows and rows[0] and rows[0][0] else None
+    except ValueError: return None
+
+def _holds(sheet, token):
+    return (read_lock(sheet) or {}).get("token") == token
+
+def claim(sheet, wait=CLAIM_WAIT, sleep=time.sleep):
+    # 반환: 토큰. wait 초 안에 못 얻으면 SaveInProgress
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while True:
+        t0 = time.monotonic()
+        held = read_lock(sheet)
+        if held is None or held.get("expires", 0) < time.time():
+            sheet.update(range_name=LOCK_CELL, values=[[json.dumps({"token": token, "expires": time.time() + CLAIM_LEASE})]])
+            sleep(max(CLAIM_SETTLE, 2 * (time.monotonic() - t0)))
+            if _holds(sheet, token): return token
+        if time.monotonic() > deadline: raise SaveInProgress("다른 사용자가 저장 중입니다. 잠시 후 다시 저장하세요.")
+        sleep(CLAIM_POLL)
+
+def release(sheet, token):
+    if _holds(sheet, token): sheet.update(range_name=LOCK_CELL, values=[[""]])
+
+def write_projects_cas(sheet, data, expected_stamp):
+    # 권한을 얻은 뒤 리비전 확인 -> 읽은 시점 이후 다른 저장이 있었다면 RevisionConflict(최신 메타)
+    # 비활성 열에 다 쓴 뒤 메타(B1) 한 칸만 바꿔 전환 (권한이 있는 저장만 데이터 열에 씀)
+    token = claim(sheet)
+    try:
+        meta = read_meta(sheet, fresh=True)
+        if meta.get("stamp") != expected_stamp:
+            raise RevisionConflict(meta)
+        layout = write_projects(sheet, data, slot=inactive_slot(meta))
+        if not _holds(sheet, token): raise SaveInProgress("저장 도중 권한이 만료되었습니다. 다시 저장하세요.")
+        return write_meta(sheet, int(meta.get("rev", 0)) + 1, layout)
+    finally:
+        try: release(sheet, token)
+        except Exception: pass  # 못 비우면 CLAIM_LEASE 뒤 만료
@@ -0,0 +1,270 @@
+import pickle
+import threading
+import time
+import weakref
+from collections import deque
+
+import concurrency
+import storage
+from models import migrate_projects
+
+# --- 세션 간 공유 데이터 저장소 ---
+# 프로세스당 역직렬화된 DB 한 벌(Snapshot)을 모든 세션이 공유하고,
+# 세션은 편집하는 교재만 깊은 복사해 따로 가진다(copy-on-write, ProjectView).
+# 세션이 하나도 남지 않으면(참조 수 0) 스냅샷을 해제한다.
+# 스냅샷이 바뀔 때마다 (version, 변경된 교재 id) 를 변경 로그에 남겨 세션이 바뀐 교재만 반영한다.
+CHANGE_LOG_SIZE = 256
+
+class Snapshot:
+    # 불변으로 취급: 세션은 여기 들어 있는 교재 객체를 직접 수정하지 않는다
+    __slots__ = ("projects", "index", "digests", "stamp", "rev", "source", "version", "__weakref__")
+
+    def __init__(self, projects, meta=None, source=None, digests=None, version=0):
+        meta = meta or {}
+        self.version = version
+        self.projects = list(projects)
+        self.index = {p['id']: p for p in self.projects}
+        self.digests = digests if digests is not None else concurrency.snapshot_digests(self.projects)
+        self.stamp = meta.get("stamp")
+        self.rev = meta.get("rev", 0)
+        self.source = source
+
+
+class Lease:
+    # 세션 상태에 보관 -> 세션이 사라져 GC되면 finalize로 참조 반납
+    __slots__ = ("store", "__weakref__")
+
+    def __init__(self, store):
+        self.store = store
+
+
+class SharedStore:
+    def __init__(self, loader):
+        # loader() -> (projects, meta, source)
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._refs = 0
+        self._version = 0
+        self._log = deque(maxlen=CHANGE_LOG_SIZE)  # (version, frozenset(changed ids))
+        self._poll_lock = threading.Lock()
+        self._last_poll = 0.0
+        self.stats = {"loads": 0, "publishes": 0, "acquired": 0, "released": 0, "polls": 0, "remote_updates": 0}
+
+    @property
+    def refs(self):
+        return self._refs
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+            self.stats["acquired"] += 1
+        lease = Lease(self)
+        weakref.finalize(lease, self._release)
+        return lease
+
+    def _release(self):
+        with self._lock:
+            self._refs -= 1
+            self.stats["released"] += 1
+            if self._refs <= 0:
+                self._refs = 0
+                self._snapshot = None
+                self._log.clear()
+
+    def snapshot(self):
+        # 첫 세션만 시트에서 읽고 나머지는 같은 스냅샷을 받는다
+        with self._lock:
+            if self._snapshot is None: self._load()
+            return self._snapshot
+
+    def reload(self):
+        with self._lock:
+            self._load()
+            return self._snapshot
+
+    def _load(self):
+        projects, meta, source = self._loader()
+        self._install(projects, meta, source)
+        self.stats["loads"] += 1
+
+    def _install(self, projects, meta, source, digests=None):
+        # 새 스냅샷 설치 + 변경 로그 기록. 내용이 같은 교재는 기존 객체를 재사용해 메모리를 공유
+        prev = self._snapshot
+        if prev is not None and digests is None:
+            digests, reused = {}, []
+            for p in projects:
+                pid, d = p['id'], concurrency.project_digests(p)
+                same = prev.digests.get(pid) == d
+                reused.append(prev.index[pid] if same else p)
+                digests[pid] = d
+            projects = reused
+        self._version += 1
+        snap = Snapshot(projects, meta, source, digests, self._version)
+        if prev is not None:
+            self._log.append((snap.version, frozenset(diff_ids(prev, snap))))
+        self._snapshot = snap
+        return snap
+
+    def publish(self, projects, meta, base=None):
+        # 저장 성공 후 호출: 더 새로운 리비전일 때만 공유 스냅샷 교체
+        # base 스냅샷과 같은 객체인 교재는 digest를 다시 계산하지 않는다
+        digests = None
+        if base is not None:
+            digests = {}
+            for p in projects:
+                pid = p['id']
+                digests[pid] = base.digests[pid] if base.index.get(pid) is p else concurrency.project_digests(p)
+        with self._lock:
+            if self._snapshot is not None and meta.get("rev", 0) < self._snapshot.rev:
+                return Snapshot(projects, meta, "save", digests)  # version 0 -> 다음 확인 때 digest 비교로 따라잡음
+            self.stats["publishes"] += 1
+            return self._install(projects, meta, "save", digests)
+
+    # --- 변경 알림 ---
+    def changes_since(self, snapshot):
+        # 세션이 보고 있는 스냅샷 이후 바뀐 교재 id -> (최신 스냅샷, id 집합)
+        with self._lock:
+            latest = self._snapshot
+            if latest is None or latest is snapshot or latest.version == snapshot.version: return latest, set()
+            if self._log and self._log[0][0] <= snapshot.version + 1:
+                ids = set()
+                for version, changed in self._log:
+                    if version > snapshot.version: ids |= changed
+                return latest, ids
+        # 로그가 잘린 경우 digest 비교로 대체
+        return latest, diff_ids(snapshot, latest)
+
+    def poll_remote(self, connect, interval):
+        # 다른 프로세스의 저장 감지: interval 초마다 한 세션만 B1 메타(리비전)를 확인
+        now = time.monotonic()
+        if now - self._last_poll < interval or not self._poll_lock.acquire(blocking=False): return False
+        try:
+            self._last_poll = now
+            self.stats["polls"] += 1
+            sheet = connect()
+            if sheet is None or self._snapshot is None: return False
+            meta = storage.read_meta(sheet)
+            if meta.get("stamp") is None or meta.get("stamp") == self._snapshot.stamp: return False
+            try:
+                projects = migrate_projects(storage.read_projects(sheet, meta))
+            except storage.CorruptData:
+                return False  # 읽는 사이 그 열을 다음 저장이 덮어씀 -> 다음 확인 때 다시 읽음
+            with self._lock:
+                if self._snapshot is None or meta.get("rev", 0) < self._snapshot.rev: return False
+                self._install(projects, meta, "sheet")
+                self.stats["remote_updates"] += 1
+            return True
+        finally:
+            self._poll_lock.release()
+
+
+def clone(project):
+    # 세션 전용 복사본: deepcopy는 DataFrame 내부 객체 공유 구조를 바꿔 pickle digest가 달라지므로
+    # pickle 왕복으로 복사해 "복사만 하고 안 고친" 교재가 변경으로 잡히지 않게 한다
+    return pickle.loads(pickle.dumps(project))
+
+def diff_ids(old, new):
+    return {pid for pid in old.digests.keys() | new.digests.keys() if old.digests.get(pid) != new.digests.get(pid)}
+
+
+class ProjectView:
+    # 세션별 보기: 공유 스냅샷 + 수정한 교재(overrides) + 추가/삭제 목록
+    def __init__(self, snapshot):
+        self.rebase(snapshot)
+
+    def rebase(self, snapshot):
+        self.snapshot = snapshot
+        self.overrides = {}
+        self.added = []
+        self.deleted = set()
+
+    def __iter__(self):
+        overrides, deleted = self.overrides, self.deleted
+        for p in self.snapshot.projects:
+            pid = p['id']
+            if pid in deleted: continue
+            yield overrides.get(pid, p)
+        yield from self.added
+
+    def __len__(self):
+        return len(self.snapshot.projects) - len(self.deleted) + len(self.added)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def to_list(self):
+        return list(self)
+
+    def peek(self, pid):
+        # 읽기 전용 조회 (복사하지 않음)
+        if pid is None or pid in self.deleted: return None
+        if pid in self.overrides: return self.overrides[pid]
+        for p in self.added:
+            if p['id'] == pid: return p
+        return self.snapshot.index.get(pid)
+
+    def shared_digests(self, pid):
+        # 공유본 그대로인 교재의 필드 digest (세션 복사본/새 교재는 None)
+        if pid in self.overrides or pid in self.deleted: return None
+        return self.snapshot.digests.get(pid)
+
+    def checkout(self, pid):
+        # 편집용 조회: 처음 접근할 때 복사
+        p = self.peek(pid)
+        if p is None or pid in self.overrides or p in self.added: return p
+        p = clone(p)
+        self.overrides[pid] = p
+        return p
+
+    def release(self, pid):
+        # 변경 없이 체크아웃만 한 교재는 공유본으로 되돌려 메모리 반환
+        p = self.overrides.get(pid)
+        if p is not None and concurrency.project_digests(p) == self.snapshot.digests.get(pid):
+            del self.overrides[pid]
+
+    def refresh(self, latest, changed_ids):
+        # 다른 세션의 변경을 바뀐 교재만 반영. 내가 고친 교재는 필드 단위 3-way 병합 (같은 필드는 내 변경 우선)
+        old, conflicts = self.snapshot, []
+        for pid in changed_ids:
+            mine = self.overrides.pop(pid, None)
+            if mine is None or concurrency.project_digests(mine) == old.digests.get(pid): continue
+            remote = latest.index.get(pid)
+            if remote is None:
+                self.added.append(mine)
+                conflicts.append({"id": pid, "title": mine['title'], "fields": ["(원격 삭제됨)"]})
+                continue
+            merged, clashes = concurrency.merge_projects({pid: old.digests.get(pid, {})}, [mine], [remote])
+            conflicts.extend(clashes)
+            if merged and merged[0] is not remote:
+                # 병합 결과에 섞인 공유 객체를 세션 전용으로 복사
+                self.overrides[pid] = merged[0] if merged[0] is mine else clone(merged[0])
+        self.deleted &= latest.index.keys()
+        self.snapshot = latest
+        return conflicts
+
+    def append(self, project):
+        self.added.append(project)
+
+    def remove(self, ids):
+        ids = set(ids)
+        self.added = [p for p in self.added if p['id'] not in ids]
+        for pid in ids:
+            self.overrides.pop(pid, None)
+            if pid in self.snapshot.index: self.deleted.add(pid)
+
+    def replace_all(self, projects):
+        # 전체 교체 (백업 복원): 스냅샷에 있는 교재는 세션 복사본으로, 없는 교재는 새 교재로, 목록에 없는 교재는 삭제
+        incoming = {p['id'] for p in projects}
+        self.overrides, self.added = {}, []
+        for p in projects:
+            if p['id'] in self.snapshot.index: self.overrides[p['id']] = p
+            else: self.added.append(p)
+        self.deleted = {pid for pid in self.snapshot.index if pid not in incoming}
+
+    def changed_ids(self):
+        digests = self.snapshot.digests
+        return [pid for pid, p in self.overrides.items() if concurrency.project_digests(p) != digests.get(pid)]
+
+    def has_changes(self):
+        return bool(self.added or self.deleted or self.changed_ids())
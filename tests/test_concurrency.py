@@ -0,0 +1,85 @@
+import functools
+import json
+import threading
+import time
+
+import pytest
+
+import concurrency
+import fake_sheets
+import storage
+import store
+from benchmarks.synthetic import generate_portfolio
+
+
+@pytest.fixture(autouse=True)
+def fast_claim(monkeypatch):
+    # 권한 대기/확인 간격을 줄여 테스트 시간 단축 (순서 보장 규칙은 그대로)
+    monkeypatch.setattr(storage, "CLAIM_SETTLE", 0.05)
+    monkeypatch.setattr(storage, "CLAIM_POLL", 0.02)
+
+def _sheet(seed):
+    ws = fake_sheets.FakeWorksheet(config=fake_sheets.FakeConfig(latency_ms=20, jitter_ms=20, seed=seed))
+    base = generate_portfolio(4, seed=0)
+    first = concurrency.save_projects(ws, base, None, {})
+    return ws, base, store.Snapshot(base, first.meta), first.meta['rev']
+
+
+# --- 같은 스탬프에서 동시에 저장 ---
+@pytest.mark.parametrize("seed", range(3))
+def test_concurrent_saves_keep_every_edit(seed):
+    ws, base, snap, rev0 = _sheet(seed)
+    results = {}
+    def edit(i):
+        local = [store.clone(p) for p in base]
+        local[i]['title'] = f"수정-{i}"
+        try: results[i] = concurrency.save_projects(ws, local, snap.stamp, snap.digests)
+        except Exception as e: results[i] = e
+    threads = [threading.Thread(target=edit, args=(i,)) for i in range(3)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    errors = {i: r for i, r in results.items() if isinstance(r, Exception)}
+    assert not errors
+    assert sorted(r.meta['rev'] for r in results.values()) == [rev0 + 1, rev0 + 2, rev0 + 3]
+    assert sum(not r.merged for r in results.values()) == 1  # 첫 저장만 병합 없이 통과
+    meta = storage.read_meta(ws, fresh=True)
+    assert meta['rev'] == rev0 + 3
+    final = storage.read_projects(ws, meta)
+    assert [p['title'] for p in final[:3]] == ["수정-0", "수정-1", "수정-2"]
+    assert storage.read_lock(ws) is None
+
+
+# --- 다른 저장이 권한을 가진 경우: 병합하지 않고 SaveInProgress ---
+def _no_merge(monkeypatch):
+    def fail(*args, **kwargs): raise AssertionError("SaveInProgress인데 병합을 시도함")
+    monkeypatch.setattr(storage, "read_projects", fail)
+    monkeypatch.setattr(concurrency, "merge_projects", fail)
+
+def test_save_in_progress_propagates_without_merge(monkeypatch):
+    ws, base, snap, rev0 = _sheet(0)
+    foreign = {"token": "다른-저장", "expires": time.time() + storage.CLAIM_LEASE}
+    ws.update(range_name=storage.LOCK_CELL, values=[[json.dumps(foreign)]])
+    monkeypatch.setattr(storage, "claim", functools.partial(storage.claim, wait=0.2))
+    _no_merge(monkeypatch)
+    local = [store.clone(p) for p in base]
+    local[0]['title'] = "수정"
+    with pytest.raises(storage.SaveInProgress):
+        concurrency.save_projects(ws, local, snap.stamp, snap.digests)
+    assert storage.read_meta(ws, fresh=True)['rev'] == rev0
+    assert storage.read_lock(ws) == foreign  # 남의 권한은 건드리지 않음
+
+def test_lease_lost_during_upload_propagates_without_merge(monkeypatch):
+    ws, base, snap, rev0 = _sheet(0)
+    upload = storage.write_projects
+    def upload_then_lose(sheet, *args, **kwargs):
+        layout = upload(sheet, *args, **kwargs)
+        sheet.update(range_name=storage.LOCK_CELL, values=[[json.dumps({"token": "다른-저장", "expires": time.time() + 60})]])
+        return layout
+    monkeypatch.setattr(storage, "write_projects", upload_then_lose)
+    _no_merge(monkeypatch)
+    local = [store.clone(p) for p in base]
+    local[0]['title'] = "수정"
+    with pytest.raises(storage.SaveInProgress):
+        concurrency.save_projects(ws, local, snap.stamp, snap.digests)
+    assert storage.read_meta(ws, fresh=True)['rev'] == rev0
@@ -0,0 +1,51 @@
+import pytest
+
+import ledger
+from ledger import BUSINESS_INCOME, OTHER_INCOME
+
+
+# --- 원천징수 (지급액, 소득구분) -> (소득세, 지방소득세) ---
+@pytest.mark.parametrize("gross, income_type, income_tax, local_tax", [
+    # 기타소득 과세최저한: 기타소득금액(지급액의 40%) 5만원 이하 비과세
+    (125000, OTHER_INCOME, 0, 0),
+    (125010, OTHER_INCOME, 10000, 1000),     # 50,004 x 20% = 10,000.8 -> 10,000
+    (130000, OTHER_INCOME, 10400, 1040),
+    (333333, OTHER_INCOME, 26660, 2660),     # 26,666.64 -> 26,660 / 2,666 -> 2,660
+    (1000000, OTHER_INCOME, 80000, 8000),
+    # 사업소득 3%, 10원 미만 절사
+    (100000, BUSINESS_INCOME, 3000, 300),
+    (123456, BUSINESS_INCOME, 3700, 370),    # 3,703.68 -> 3,700
+    # 소액부징수: 절사 후 소득세 1,000원 미만이면 0
+    (33000, BUSINESS_INCOME, 0, 0),          # 990
+    (33330, BUSINESS_INCOME, 0, 0),          # 999.9 -> 990
+    (33340, BUSINESS_INCOME, 1000, 100),     # 1,000.2 -> 1,000
+    (0, BUSINESS_INCOME, 0, 0),
+])
+def test_withholding(gross, income_type, income_tax, local_tax):
+    tax, local = ledger.withholding([gross], [income_type])
+    assert (tax[0], local[0]) == (income_tax, local_tax)
+
+def test_withholding_vectorized_mixed_types():
+    tax, local = ledger.withholding([125010, 33340, 125000], [OTHER_INCOME, BUSINESS_INCOME, OTHER_INCOME])
+    assert list(tax) == [10000, 1000, 0]
+    assert list(local) == [1000, 100, 0]
+
+
+# --- 소득구분 개별 지정 ---
+def _book(pid, title, name, amount):
+    return {"id": pid, "year": "2025", "level": "고교", "subject": "국어", "series": "수능특강", "title": title,
+            "settlement_list": [{"구분": "검토", "이름": name, "내용": "1차 검토", "수량": 1, "단가": amount}],
+            "author_list": [], "reviewer_list": [{"이름": name, "은행명": "국민", "계좌번호": f"{pid}-01"}]}
+
+def test_income_type_override_is_per_payment():
+    # 다른 교재의 동명이인은 개별 지정의 영향을 받지 않는다
+    books = [_book("b1", "문학", "김민수", 500000), _book("b2", "독서", "김민수", 500000)]
+    led = ledger.build_ledger(books)
+    keys = ledger.payment_keys(led)
+    assert keys == {("김민수", "b2"): "김민수 · [수능특강] 독서", ("김민수", "b1"): "김민수 · [수능특강] 문학"}
+    pay = ledger.payments(led, books, {("김민수", "b2"): BUSINESS_INCOME}).set_index("교재명")
+    assert pay.at["문학", "소득구분"] == OTHER_INCOME and pay.at["문학", "소득세"] == 40000
+    assert pay.at["독서", "소득구분"] == BUSINESS_INCOME and pay.at["독서", "소득세"] == 15000
+    assert pay.at["독서", "계좌번호"] == "b2-01"
+    summary = ledger.payee_summary(pay.reset_index())
+    assert sorted(summary["소득구분"]) == sorted([OTHER_INCOME, BUSINESS_INCOME])
@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from concurrency import field_digest
+
+# --- 전체 교재 일정 타임라인 (열 단위 구간 저장소) ---
+# 교재 x 일정 단계를 (교재 번호, 단계명, 시작일, 종료일, 중요 여부) 배열로 모아 두고,
+# 화면 구간(viewport)에 걸치는 구간만 골라 그린다. 막대가 MAX_BARS를 넘으면 교재별로
+# 가까운 구간(병합 단위 일수 이내)을 한 막대로 합쳐 브라우저로 보내는 행 수를 제한한다.
+# 교재별 배열은 (교재 id, 일정 digest) 단위로 캐시.
+MAX_BARS = 1500
+CACHE_SIZE = 1024
+CRITICAL = "🔴"
+
+
+def _day(values):
+    return pd.to_datetime(values, errors='coerce').to_numpy().astype("datetime64[D]")
+
+
+class IntervalStore:
+    __slots__ = ("books", "book", "task", "start", "end", "critical")
+
+    def __init__(self, books, parts):
+        # books: [(교재 id, 표시 이름)], parts: 교재 순서대로 (단계명, 시작, 종료, 중요) 배열 묶음
+        self.books = books
+        self.book = np.concatenate([np.full(len(p[0]), i, dtype=np.int32) for i, p in enumerate(parts)]) if parts else np.empty(0, np.int32)
+        self.task = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, object)
+        self.start = np.concatenate([p[1] for p in parts]) if parts else np.empty(0, "datetime64[D]")
+        self.end = np.concatenate([p[2] for p in parts]) if parts else np.empty(0, "datetime64[D]")
+        self.critical = np.concatenate([p[3] for p in parts]) if parts else np.empty(0, bool)
+
+    def __len__(self):
+        return len(self.book)
+
+    def span(self):
+        if not len(self): return None
+        return self.start.min().astype(object), self.end.max().astype(object)
+
+    def milestones(self, pid):
+        # 교재 한 권의 주요(🔴) 일정: [(날짜, 단계명)]
+        ids = [b[0] for b in self.books]
+        if pid not in ids: return []
+        mask = (self.book == ids.index(pid)) & self.critical
+        return [(s.astype(object), str(t).replace(f"{CRITICAL} ", "")) for s, t in zip(self.start[mask], self.task[mask])]
+
+    @profiling.timed("timeline.view")
+    def view(self, lo, hi, pids=None, max_bars=MAX_BARS):
+        # 반환: (막대 DataFrame[교재, 단계, 시작, 종료, 끝, 건수, 중요], 병합 단위 일수 - 0이면 병합 없음)
+        # pids: 표시할 교재 id (None이면 전체)
+        lo, hi = np.datetime64(lo, "D"), np.datetime64(hi, "D")
+        mask = (self.start <= hi) & (self.end >= lo)
+        if pids is not None:
+            mask &= np.isin(self.book, [i for i, (pid, _) in enumerate(self.books) if pid in pids])
+        idx = np.flatnonzero(mask)
+        b, task, crit = self.book[idx], self.task[idx], self.critical[idx]
+        s = np.maximum(self.start[idx], lo).astype(np.int64)
+        e = np.minimum(self.end[idx], hi).astype(np.int64)
+        resolution = 0
+        if len(idx) > max_bars:
+            n_books = len(np.unique(b))
+            resolution = max(1, int(np.ceil((hi - lo).astype(int) * n_books / max_bars)))
+            order = np.lexsort((s, b))
+            b, task, crit, s, e = b[order], task[order], crit[order], s[order], e[order]
+            # 교재별 누적 최대 종료일보다 병합 단위 이상 떨어진 구간에서 새 막대 시작
+            reach = pd.Series(e).groupby(b).cummax().to_numpy()
+            new = np.ones(len(b), bool)
+            new[1:] = (b[1:] != b[:-1]) | (s[1:] > reach[:-1] + resolution)
+            first = np.flatnonzero(new)
+            count = np.diff(np.append(first, len(b)))
+            b, s, e = b[first], np.minimum.reduceat(s, first), np.maximum.reduceat(e, first)
+            crit = np.logical_or.reduceat(crit, first)
+            task = np.array([t if n == 1 else f"{t} 외 {n - 1}건" for t, n in zip(task[first], count)], dtype=object)
+        else:
+            count = np.ones(len(b), dtype=np.int64)
+        labels = np.array([label for _, label in self.books], dtype=object)
+        df = pd.DataFrame({
+            "교재": labels[b] if len(b) else np.empty(0, object),
+            "단계": [str(t).replace(f"{CRITICAL} ", "") for t in task],
+            "시작": s.astype("datetime64[D]"),
+            "종료": e.astype("datetime64[D]"),
+            "끝": (e + 1).astype("datetime64[D]"),  # 막대는 종료일 당일까지 칠하도록 하루 더함
+            "건수": count,
+            "중요": crit,
+        })
+        return df, resolution
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _intervals(project, digest=None):
+    sch = project.get('schedule_data')
+    key = (project['id'], digest or field_digest(sch))
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    if sch is None or sch.empty:
+        arrays = (np.empty(0, object), np.empty(0, "datetime64[D]"), np.empty(0, "datetime64[D]"), np.empty(0, bool))
+    else:
+        task = sch['구분'].astype(str).to_numpy(dtype=object)
+        start, end = _day(sch['시작일']), _day(sch['종료일'])
+        start = np.where(np.isnat(start), end, start)  # 하루짜리 일정은 한쪽 날짜만 있을 수 있음
+        end = np.where(np.isnat(end), start, end)
+        ok = ~np.isnat(start)
+        start, end = start[ok], np.maximum(end[ok], start[ok])
+        arrays = (task[ok], start, end, np.char.startswith(task[ok].astype(str), CRITICAL))
+    with _lock:
+        _cache[key] = arrays
+        while len(_cache) > CACHE_SIZE: _cache.popitem(last=False)
+    return arrays
+
+def build(projects, digests=None):
+    # digests: 교재 id -> 필드 digest (공유 스냅샷 값, 없으면 직접 계산)
+    books, parts = [], []
+    for p in projects:
+        d = (digests(p['id']) if digests else None) or {}
+        books.append((p['id'], f"[{p['series']}] {p['title']} ({p['year']})"))
+        parts.append(_intervals(p, d.get('schedule_data')))
+    return IntervalStore(books, parts)
+
+
+def chart(df, height_per_book=22):
+    import altair as alt  # 타임라인을 열 때만 필요
+    n_books = max(1, df['교재'].nunique())
+    return alt.Chart(df).mark_bar(cornerRadius=2).encode(
+        x=alt.X("시작:T", title=None),
+        x2="끝:T",
+        y=alt.Y("교재:N", sort=None, title=None),
+        color=alt.Color("중요:N", scale=alt.Scale(domain=[False, True], range=["#9db4d6", "#e4572e"]), legend=None),
+        tooltip=["교재", "단계", alt.Tooltip("시작:T", format="%Y-%m-%d"), alt.Tooltip("종료:T", format="%Y-%m-%d"), "건수"],
+    ).properties(height=min(40 + n_books * height_per_book, 2400)).interactive(bind_y=False)